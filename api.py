@@ -0,0 +1,44 @@
+# api.py
+# Ответы JSON API: быстрая сериализация (orjson, если установлен),
+# ETag/304 для GET и gzip для крупных ответов.
+import gzip
+import hashlib
+import json
+
+from flask import current_app, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ответы меньше этого размера не сжимаем — выигрыш меньше накладных расходов
+GZIP_MIN_SIZE = 1024
+
+
+def dumps(data):
+    """JSON в байтах, без пробелов; даты должны быть уже строками."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(data, status=200):
+    body = dumps(data)
+    response = current_app.response_class(body, status=status,
+                                          mimetype='application/json')
+    if request.method == 'GET' and status == 200:
+        # слабый ETag: одинаков для сжатого и несжатого вариантов
+        response.set_etag(hashlib.sha1(body).hexdigest()[:20], weak=True)
+        response.cache_control.no_cache = True
+        response.make_conditional(request)
+    response.vary.add('Accept-Encoding')
+    if (response.status_code == 200 and len(body) >= GZIP_MIN_SIZE
+            and request.accept_encodings['gzip']):
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def api_error(message, status):
+    return json_response({'error': message}, status)
@@ -1,23 +1,69 @@
-from flask import Flask, render_template, redirect, url_for, request, flash
+from flask import (
+    Blueprint, Flask, current_app, render_template, redirect, url_for, request, flash,
+    stream_template, g, has_app_context, has_request_context, send_file,
+    send_from_directory, session
+)
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import (
     LoginManager, login_user, login_required,
     logout_user, current_user, UserMixin
 )
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import UniqueConstraint
-import os, datetime
+from sqlalchemy import UniqueConstraint, event, select, func, update, case, union_all
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from sqlalchemy.orm.exc import StaleDataError
+import os, sys, csv, datetime, base64, sqlite3, json, mimetypes, secrets, time
+from collections import Counter
+from functools import wraps
+from markupsafe import Markup
+from werkzeug.datastructures import MultiDict
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.utils import safe_join
+import click
+
+from api import api_error, json_response
+import avatars
+from cache import IdentityCache, PageCache, StatsCache
+from config import DEV_SECRET_KEY, Config, engine_options
+import importer
+from metrics import Metrics
+from passwords import HasherBusy, PasswordHasher, RateLimiter
+import migrations
+import recommend
+from replicas import ReplicaRouter, RoutingSession, copy_sqlite, use_primary
+from search import JobSearch
+from tasks import TaskQueue
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'change-this-secret-key'  # поменяй на свой
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(BASE_DIR, 'time_jobs.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# маршруты, хуки и команды CLI; приложение собирает create_app()
+bp = Blueprint('main', __name__, cli_group=None)
+
+# расширения и сервисы модуля создаются без приложения, настройки
+# (config.py / окружение) получают в create_app() через init_app
+
+# чтение в страницах с @read_replica — с реплик (SQLALCHEMY_BINDS), см. replicas.py
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+# время ответов, SQL и шаблонов -> /metrics; медленные запросы -> лог tj.sql.slow
+metrics = Metrics()
+
+# хэши паролей считаются в отдельных процессах, попытки входа ограничены
+hasher = PasswordHasher()
+auth_limiter = RateLimiter()
 
-db = SQLAlchemy(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
+# фоновые задачи после commit (очередь в файле sqlite, переживает перезапуск)
+task_queue = TaskQueue()
+
+
+def reset_connections_after_fork(app):
+    # соединения пула, открытые до fork (gunicorn с WEB_PRELOAD и т.п.),
+    # остаются родителю: дочерний процесс открывает свои
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
 
 
 class User(db.Model, UserMixin):
@@ -32,6 +78,15 @@ class User(db.Model, UserMixin):
     avatar_url = db.Column(db.String(255))
     rating = db.Column(db.Float, default=0)
 
+    # денормализованные счётчики для страницы профиля
+    jobs_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # размещённые вакансии
+    applications_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # свои отклики
+    responses_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # отклики на свои вакансии
+
+    __table_args__ = (
+        db.Index('ix_user_role', 'role'),
+    )
+
 
 class Job(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -43,11 +98,31 @@ class Job(db.Model):
     wage = db.Column(db.Float, default=0)
     pay_type = db.Column(db.String(20), default='shift')  # shift, hourly
     duration_days = db.Column(db.Integer, default=1)
-    status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
+    status = db.Column(db.String(20), default='pending')  # pending, approved, rejected, expired
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    # растёт при каждом изменении; UPDATE через ORM проверяет, что строку
+    # с момента чтения никто не менял (иначе StaleDataError)
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    # отклики по статусам (bump_job_counts): сводка в manage без COUNT по application
+    applied_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    accepted_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rejected_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     employer = db.relationship('User', backref='jobs')
 
+    __mapper_args__ = {'version_id_col': version}
+
+    __table_args__ = (
+        # лента вакансий: WHERE status = ? ORDER BY created_at DESC, id DESC
+        db.Index('ix_job_status_created_id', 'status', 'created_at', 'id'),
+        # вакансии работодателя в manage
+        db.Index('ix_job_employer_created', 'employer_id', 'created_at'),
+        # фильтры ленты: город/специализация с той же сортировкой, диапазон оплаты
+        db.Index('ix_job_status_city_created', 'status', 'city', 'created_at', 'id'),
+        db.Index('ix_job_status_spec_created', 'status', 'specialization', 'created_at', 'id'),
+        db.Index('ix_job_status_wage', 'status', 'wage'),
+    )
+
 
 class Application(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -56,45 +131,569 @@ class Application(db.Model):
     note = db.Column(db.Text)
     status = db.Column(db.String(20), default='applied')  # applied, accepted, rejected
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    # ключ из формы/заголовка Idempotency-Key: повтор того же запроса
+    # отвечает как первый, а не «уже откликались»
+    idempotency_key = db.Column(db.String(64))
 
     job = db.relationship('Job', backref='applications')
     worker = db.relationship('User')
 
     __table_args__ = (
         UniqueConstraint('job_id', 'worker_id', name='uq_job_worker'),
+        # my_applications
+        db.Index('ix_application_worker_created', 'worker_id', 'created_at'),
+        # отклики на вакансию в manage: фильтр по статусу, новые сверху
+        db.Index('ix_application_job_status_created', 'job_id', 'status', 'created_at', 'id'),
+    )
+
+
+class JobFacet(db.Model):
+    """Число опубликованных вакансий по городу/специализации для фильтров.
+    Поддерживается инкрементально (update_facets) при смене статусов."""
+    facet = db.Column(db.String(20), primary_key=True)  # city, specialization
+    value = db.Column(db.String(120), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class JobArchive(db.Model):
+    """Старые снятые вакансии (archive_jobs): вынесены из job, чтобы горячая
+    таблица и её индексы не росли вместе с историей."""
+    id = db.Column(db.Integer, primary_key=True)
+    employer_id = db.Column(db.Integer, nullable=False, index=True)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    city = db.Column(db.String(120))
+    specialization = db.Column(db.String(120))
+    wage = db.Column(db.Float)
+    pay_type = db.Column(db.String(20))
+    duration_days = db.Column(db.Integer)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    version = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+
+class ApplicationArchive(db.Model):
+    """Отклики на вакансии из job_archive."""
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, nullable=False, index=True)
+    worker_id = db.Column(db.Integer, nullable=False, index=True)
+    note = db.Column(db.Text)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+
+class Recommendation(db.Model):
+    """Готовый список рекомендованных соискателю вакансий (recommend.py):
+    страница читает одну строку по ключу, а не считает подбор."""
+    worker_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    items = db.Column(db.Text, nullable=False)  # JSON [[job_id, оценка], ...] по убыванию
+    # оценка последней вакансии полного списка (RECOMMEND_TOP_N): новая
+    # вакансия попадает в список, только если она лучше; NULL — список неполный
+    min_score = db.Column(db.Float)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+
+class ReplicaHeartbeat(db.Model):
+    """Пульс для проверки отставания реплик (replicas.py): одна строка,
+    время последнего обновления на основной базе."""
+    id = db.Column(db.Integer, primary_key=True)
+    at = db.Column(db.Float, nullable=False)
+
+
+# полнотекстовый поиск по опубликованным вакансиям (FTS5, либо ILIKE)
+job_search = JobSearch(db, Job)
+
+# реплики для чтения: выбор живой, проверка отставания в фоновом потоке
+replica_router = ReplicaRouter(db, ReplicaHeartbeat.__table__)
+
+
+# --- запросы страниц (общие для view и проверки индексов) ---
+
+def approved_jobs_query():
+    return Job.query.filter_by(status='approved')
+
+
+def latest_jobs_query(limit=6):
+    return approved_jobs_query().order_by(Job.created_at.desc(), Job.id.desc()).limit(limit)
+
+
+def employer_jobs_query(employer_id):
+    return Job.query.filter_by(employer_id=employer_id) \
+                    .order_by(Job.created_at.desc(), Job.id.desc())
+
+
+def pending_jobs_query():
+    return Job.query.filter_by(status='pending').order_by(Job.created_at.desc(), Job.id.desc())
+
+
+def worker_applications_query(worker_id):
+    return Application.query.filter_by(worker_id=worker_id) \
+                            .order_by(Application.created_at.desc())
+
+
+# сортировки откликов на вакансию: ключ и как разобрать его из курсора
+APPLICANT_SORTS = {
+    'date': (Application.created_at, datetime.datetime.fromisoformat),
+    'rating': (func.coalesce(User.rating, 0), float),
+    'experience': (func.coalesce(User.exp_years, 0), int),
+}
+
+
+def job_applicants_query(job_id, status=None, sort='date'):
+    """Отклики на вакансию вместе с соискателями (одним JOIN), по убыванию
+    ключа сортировки и id — для постраничного просмотра по ключу."""
+    key = APPLICANT_SORTS[sort][0]
+    query = Application.query.join(Application.worker) \
+        .options(contains_eager(Application.worker)) \
+        .filter(Application.job_id == job_id)
+    if status:
+        query = query.filter(Application.status == status)
+    return query.order_by(key.desc(), Application.id.desc())
+
+
+# параметры ленты вакансий, которые переносятся в ссылку на следующую страницу
+JOB_FILTER_ARGS = ('search', 'city', 'specialization', 'pay_type',
+                   'min_wage', 'max_wage', 'max_days')
+
+
+def apply_job_filters(query, args):
+    """Фильтры ленты из query-string: city, specialization, pay_type,
+    min_wage/max_wage и max_days (не длиннее N дней)."""
+    for name in ('city', 'specialization', 'pay_type'):
+        value = args.get(name, '').strip()
+        if value:
+            query = query.filter(getattr(Job, name) == value)
+    min_wage = args.get('min_wage', type=float)
+    if min_wage is not None:
+        query = query.filter(Job.wage >= min_wage)
+    max_wage = args.get('max_wage', type=float)
+    if max_wage is not None:
+        query = query.filter(Job.wage <= max_wage)
+    max_days = args.get('max_days', type=int)
+    if max_days is not None:
+        query = query.filter(Job.duration_days <= max_days)
+    return query
+
+
+def load_facets(limit=30):
+    """{'city': [(значение, число), ...], 'specialization': [...]} по убыванию."""
+    facets = {'city': [], 'specialization': []}
+    rows = db.session.execute(
+        select(JobFacet.facet, JobFacet.value, JobFacet.count)
+        .where(JobFacet.count > 0)
+        .order_by(JobFacet.facet, JobFacet.count.desc(), JobFacet.value)
     )
+    for facet, value, count in rows:
+        if facet in facets and len(facets[facet]) < limit:
+            facets[facet].append((value, count))
+    return facets
+
+
+def load_home_stats():
+    # с основной базы: к этим числам потом прибавляются инкременты
+    with use_primary():
+        return dict(
+            active_jobs=approved_jobs_query().count(),
+            workers=User.query.filter_by(role='worker').count(),
+            employers=User.query.filter_by(role='employer').count(),
+        )
+
+
+# счётчики главной страницы; обновляются из register() и смены статуса вакансии
+stats_cache = StatsCache(loader=load_home_stats)
+
+# страницы для анонимов и карточки вакансий; сбрасываются при правке вакансий
+page_cache = PageCache()
+
+
+def cache_metrics():
+    lines = ['# HELP tj_cache_requests_total Обращения к кэшам приложения',
+             '# TYPE tj_cache_requests_total counter']
+    for name, cache in (('stats', stats_cache), ('page', page_cache)):
+        info = cache.info()
+        lines.append(f'tj_cache_requests_total{{cache="{name}",result="hit"}} {info["hits"]}')
+        lines.append(f'tj_cache_requests_total{{cache="{name}",result="miss"}} {info["misses"]}')
+    return lines
+
+
+metrics.add_collector(cache_metrics)
+
+
+def task_metrics():
+    stats = task_queue.stats()
+    return ['# HELP tj_tasks Задачи в очереди фоновых задач',
+            '# TYPE tj_tasks gauge',
+            f'tj_tasks{{state="queued"}} {stats["queued"]}',
+            f'tj_tasks{{state="dead"}} {stats["dead"]}']
+
+
+metrics.add_collector(task_metrics)
+
+
+def page_version():
+    # одна версия на весь запрос, а не обращение к кэшу на каждую карточку
+    if 'page_version' not in g:
+        g.page_version = page_cache.version()
+    return g.page_version
+
+
+def jobs_changed():
+    """Вызывать после commit любой правки вакансий."""
+    page_cache.jobs_changed()
+    g.pop('page_version', None)
+
+
+def cached_page(vary=None):
+    """Кэш целой страницы для анонимов: ключ — путь с query-string
+    (и vary(), если страница зависит ещё от чего-то), ETag и Last-Modified —
+    из версии вакансий, на условный запрос отвечаем 304."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config['PAGE_CACHE_TTL'] or current_user.is_authenticated \
+                    or '_flashes' in session:
+                return view(*args, **kwargs)
+            version = page_version()
+            key = 'anon:' + request.full_path
+            if vary is not None:
+                key += ':' + repr(vary())
+            cached = page_cache.get(version, key)
+            if cached is None:
+                # страница в кэше живёт под новой версией — рендерим её
+                # с основной базы, а не с отстающей реплики
+                with use_primary():
+                    response = current_app.make_response(view(*args, **kwargs))
+                # редиректы, потоковые ответы и всё, что трогало сессию, не кэшируем
+                if response.status_code != 200 or response.is_streamed or session.modified:
+                    return response
+                page_cache.set(version, key, [response.get_data(as_text=True),
+                                              response.mimetype])
+            else:
+                response = current_app.response_class(cached[0], mimetype=cached[1])
+            response.set_etag(page_cache.etag(version, key))
+            response.last_modified = page_cache.modified_at(version)
+            # браузер хранит копию, но каждый раз сверяет её по ETag
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+@bp.app_template_global()
+def job_card(job, template):
+    """Карточка вакансии из кэша фрагментов (общего для всех пользователей)."""
+    version = page_version()
+    key = f'card:{template}:{job.id}'
+    html = page_cache.get(version, key)
+    if html is None:
+        html = current_app.jinja_env.get_template(template).render(job=job)
+        # job прочитан с реплики — может быть старше версии, не кэшируем
+        if g.get('db_replica') is None:
+            page_cache.set(version, key, html)
+    return Markup(html)
+
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    # движок открывает соединения в контексте приложения; вне его — значения по умолчанию
+    pragmas = current_app.config['SQLITE_PRAGMAS'] if has_app_context() else Config.SQLITE_PRAGMAS
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    # считаем SQL-запросы в рамках текущего HTTP-запроса
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def read_replica(view):
+    """GET-страница читает с живой реплики. Пользователь, недавно писавший
+    в базу (primary_until в сессии), и все остальные методы — с основной."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method in ('GET', 'HEAD') and session.get('primary_until', 0) < time.time():
+            g.db_replica = replica_router.choose()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@bp.after_app_request
+def pin_to_primary(response):
+    # запрос что-то записал (RoutingSession) — следующие несколько секунд
+    # этот пользователь читает с основной базы и видит свои изменения
+    if g.get('db_wrote') and replica_router.keys:
+        session['primary_until'] = time.time() + current_app.config['REPLICA_PIN_SECONDS']
+    return response
+
+
+@bp.after_app_request
+def add_query_count_header(response):
+    if current_app.config['QUERY_COUNT_HEADER']:
+        response.headers['X-Query-Count'] = str(g.get('query_count', 0))
+    return response
+
+
+class SessionUser(UserMixin):
+    """То, что лежит в current_user: снимок строки user без password_hash.
+
+    Не привязан к сессии SQLAlchemy — чтобы изменить пользователя, его нужно
+    загрузить заново (db.session.get(User, current_user.id)).
+    """
+
+    def __init__(self, data):
+        self.__dict__.update(data)
+
+
+SESSION_USER_COLUMNS = [c for c in User.__table__.columns if c.name != 'password_hash']
+
+# кэш current_user (IDENTITY_CACHE_TTL, с CACHE_URL — общий для воркеров)
+identity_cache = IdentityCache()
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    data = identity_cache.get(user_id)
+    if data is None:
+        row = db.session.execute(
+            select(*SESSION_USER_COLUMNS).where(User.id == user_id)
+        ).mappings().first()
+        if row is None:
+            return None
+        data = dict(row)
+        identity_cache.set(user_id, data)
+    return SessionUser(data)
 
 
-@app.context_processor
-def inject_globals():
-    import urllib.parse
-    def default_avatar(name):
-        n = urllib.parse.quote_plus(name or "U")
-        return f"https://ui-avatars.com/api/?background=4CFA00&color=fff&name={n}"
-    return dict(current_user=current_user, default_avatar=default_avatar)
+def forget_user(user_id):
+    """Сбросить кэш current_user после commit текущей транзакции."""
+    db.session.info.setdefault('forget_users', set()).add(user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def flush_forgotten_users(session):
+    identity_cache.forget(*session.info.pop('forget_users', ()))
+
+
+@event.listens_for(Session, 'after_rollback')
+def drop_forgotten_users(session):
+    session.info.pop('forget_users', None)
+
+
+def defer_task(fn, *args, **kwargs):
+    """Поставить задачу в очередь после commit текущей транзакции
+    (при откате — не ставить). Аргументы должны сериализоваться в JSON."""
+    db.session.info.setdefault('deferred_tasks', []).append((fn, args, kwargs))
+
+
+@event.listens_for(Session, 'after_commit')
+def enqueue_deferred_tasks(session):
+    tasks = session.info.pop('deferred_tasks', None)
+    if tasks:
+        try:
+            task_queue.enqueue_many(tasks)
+        except sqlite3.Error:
+            # транзакция уже зафиксирована — задачи теряются, но не запрос
+            current_app.logger.exception('Не удалось поставить задачи в очередь: %r', tasks)
+
+
+@event.listens_for(Session, 'after_rollback')
+def drop_deferred_tasks(session):
+    session.info.pop('deferred_tasks', None)
+
+
+@bp.before_app_request
+def start_task_workers():
+    task_queue.start()
+    replica_router.start()
 
 
-@app.route('/')
+@bp.app_template_global()
+def idempotency_key():
+    """Ключ для формы, которая не должна срабатывать дважды (двойной клик)."""
+    return secrets.token_urlsafe(16)
+
+
+@bp.app_context_processor
+def inject_globals():
+    return dict(current_user=current_user)
+
+
+# ---------- статика, собранная build_assets.py ----------
+
+asset_manifest = None
+
+
+def load_asset_manifest():
+    try:
+        with open(current_app.config['ASSET_MANIFEST'], encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+@bp.app_template_global()
+def asset_url(filename):
+    """Ссылка на файл из static: версия с хэшем из манифеста сборки,
+    а если сборки нет (разработка) — обычный url_for('static')."""
+    global asset_manifest
+    if asset_manifest is None:
+        asset_manifest = load_asset_manifest()
+    hashed = asset_manifest.get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('main.dist_asset', filename=hashed)
+
+
+@bp.route('/static/dist/<path:filename>')
+def dist_asset(filename):
+    # имя содержит хэш содержимого, поэтому файл можно кэшировать навсегда;
+    # заранее сжатые .br/.gz отдаются, если клиент их принимает
+    directory = os.path.join(current_app.static_folder, 'dist')
+    max_age = current_app.config['ASSET_MAX_AGE']
+    for encoding, ext in (('br', '.br'), ('gzip', '.gz')):
+        path = safe_join(directory, filename + ext)
+        if request.accept_encodings[encoding] and path and os.path.isfile(path):
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(directory, filename + ext,
+                                           mimetype=mimetype, max_age=max_age)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(directory, filename, max_age=max_age)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+# ---------- аватары ----------
+# Инициалы рисуются на сервере (SVG, PNG — если есть Pillow), загруженные
+# фото уменьшаются до размеров AVATAR_SIZES; результат лежит в дисковом
+# кэше. Ссылка из avatar_src() содержит версию (хэш имени и фото), поэтому
+# браузер кэширует картинку надолго, а после смены имени или фото получает
+# новую ссылку.
+
+avatar_cache = avatars.DiskCache()
+
+
+def avatar_size(size):
+    """Ближайший не меньший размер из AVATAR_SIZES (или самый большой)."""
+    sizes = current_app.config['AVATAR_SIZES']
+    return next((s for s in sizes if s >= (size or 0)), sizes[-1])
+
+
+def avatar_upload(user):
+    """Имя загруженного фото пользователя или None (внешняя ссылка / нет фото)."""
+    filename = user.avatar_url
+    if not filename or '/' in filename or not filename.endswith(avatars.UPLOAD_EXTENSIONS):
+        return None
+    return filename
+
+
+def avatar_version(user):
+    return avatar_cache.digest(avatars.STYLE_VERSION, user.name, user.avatar_url)[:12]
+
+
+@bp.app_template_global()
+def avatar_src(user, size=64):
+    """Ссылка на аватар пользователя размера size (в CSS-пикселях — для
+    чётких экранов берётся вдвое больший). Гостю — аватар-заглушка."""
+    if not getattr(user, 'is_authenticated', True):
+        return url_for('main.avatar', user_id=0, ext='svg')
+    avatar_url = user.avatar_url or ''
+    if avatar_url.startswith(('http://', 'https://')):
+        return avatar_url
+    ext = 'png' if avatar_upload(user) else 'svg'
+    return url_for('main.avatar', user_id=user.id, ext=ext,
+                   s=avatar_size(size * 2), v=avatar_version(user))
+
+
+@bp.route('/avatar/<int:user_id>.<any(svg, png):ext>')
+def avatar(user_id, ext):
+    # 0 — гость: инициалы по умолчанию
+    user = load_user(user_id) if user_id else SessionUser(dict(name='', avatar_url=None))
+    if user is None:
+        return current_app.response_class('Не найдено', status=404, mimetype='text/plain')
+    size = avatar_size(request.args.get('s', type=int))
+    upload = avatar_upload(user) if ext == 'png' else None
+    if upload:
+        source = os.path.join(current_app.config['AVATAR_UPLOAD_DIR'], upload)
+        key = avatar_cache.digest('upload', upload, size)
+        render = lambda: avatars.thumbnail(source, size)  # noqa: E731
+    elif ext == 'png':
+        key = avatar_cache.digest('png', avatars.STYLE_VERSION, user.name, size)
+        render = lambda: avatars.render_png(user.name, size)  # noqa: E731
+    else:
+        key = avatar_cache.digest('svg', avatars.STYLE_VERSION, user.name, size)
+        render = lambda: avatars.render_svg(user.name, size)  # noqa: E731
+
+    path = avatar_cache.get(key)
+    if path is None:
+        try:
+            data = render()
+        except (OSError, ValueError):
+            # фото пропало или испорчено — показываем инициалы
+            current_app.logger.warning('Аватар %s: не удалось подготовить картинку', user_id,
+                                       exc_info=True)
+            data = None
+        if data is None:
+            # PNG без Pillow или без фото — та же картинка в SVG
+            return redirect(url_for('main.avatar', user_id=user_id, ext='svg', s=size,
+                                    v=request.args.get('v')))
+        path = avatar_cache.put(key, data)
+
+    versioned = request.args.get('v') == avatar_version(user)
+    response = send_file(path, mimetype='image/svg+xml' if ext == 'svg' else 'image/png',
+                         etag=key[:32], conditional=True,
+                         max_age=current_app.config['AVATAR_MAX_AGE'] if versioned else 300)
+    response.cache_control.public = True
+    if versioned:
+        # по этой ссылке картинка уже не изменится
+        response.cache_control.immutable = True
+    return response
+
+
+@bp.route('/healthz')
+def healthz():
+    """Процесс жив и отвечает (проверка балансировщика, ожидание запуска)."""
+    return 'ok', 200, {'Content-Type': 'text/plain; charset=utf-8',
+                       'Cache-Control': 'no-store'}
+
+
+@bp.route('/')
+@read_replica
+@cached_page(vary=lambda: stats_cache.get())
 def index():
-    active_jobs = Job.query.filter_by(status='approved').count()
-    workers = User.query.filter_by(role='worker').count()
-    employers = User.query.filter_by(role='employer').count()
-    stats = dict(active_jobs=active_jobs, workers=workers, employers=employers)
+    stats = stats_cache.get()
 
-    last_jobs = Job.query.filter_by(status='approved') \
-                         .order_by(Job.created_at.desc()).limit(6).all()
+    last_jobs = latest_jobs_query().all()
     return render_template('index.html', stats=stats, last_jobs=last_jobs)
 
 
-@app.route('/register', methods=['GET', 'POST'])
+def auth_throttled(email=None):
+    """True, если с этого IP (или для этой почты) слишком много попыток."""
+    allowed = auth_limiter.hit('ip:' + (request.remote_addr or ''),
+                               current_app.config['AUTH_LIMIT_PER_IP'])
+    if email:
+        allowed = auth_limiter.hit('email:' + email,
+                                   current_app.config['AUTH_LIMIT_PER_EMAIL']) and allowed
+    return not allowed
+
+
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     if request.method == 'POST':
         name = request.form.get('name', '').strip()
@@ -102,119 +701,226 @@ def register():
         password = request.form.get('password', '')
         role = request.form.get('role', 'worker')
 
+        if auth_throttled():
+            flash('Слишком много попыток, попробуйте через минуту', 'error')
+            return render_template('auth/register.html'), 429
+
         if not name or not email or not password:
             flash('Заполните все поля', 'error')
         else:
-            if User.query.filter_by(email=email).first():
+            exists = db.session.query(User.id).filter_by(email=email).first() is not None
+            # пока считается хэш, соединение из пула должно быть свободно
+            db.session.close()
+            if exists:
                 flash('Пользователь с такой почтой уже существует', 'error')
             else:
+                try:
+                    password_hash = hasher.hash(password)
+                except HasherBusy:
+                    flash('Сервер перегружен, попробуйте ещё раз', 'error')
+                    return render_template('auth/register.html'), 503
                 user = User(
                     name=name,
                     email=email,
-                    password_hash=generate_password_hash(password),
+                    password_hash=password_hash,
                     role=role if role in ['worker', 'employer', 'moderator'] else 'worker'
                 )
                 db.session.add(user)
+                db.session.flush()
+                if user.role == 'worker' and recommend.available():
+                    defer_task(recommend_for_workers, [user.id])
                 db.session.commit()
+                stats_cache.user_registered(user.role)
                 login_user(user)
                 flash('Вы успешно зарегистрированы', 'success')
-                return redirect(url_for('index'))
+                return redirect(url_for('main.index'))
 
     return render_template('auth/register.html')
 
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     if request.method == 'POST':
         email = request.form.get('email', '').strip().lower()
         password = request.form.get('password', '')
 
-        user = User.query.filter_by(email=email).first()
-        if user and check_password_hash(user.password_hash, password):
+        if auth_throttled(email):
+            flash('Слишком много попыток входа, попробуйте через минуту', 'error')
+            return render_template('auth/login.html'), 429
+
+        account = db.session.query(User.id, User.password_hash).filter_by(email=email).first()
+        # пока считается хэш, соединение из пула должно быть свободно
+        db.session.close()
+        new_hash = None
+        try:
+            ok = account is not None and hasher.verify(account.password_hash, password)
+            if ok and hasher.needs_rehash(account.password_hash):
+                # параметры хэширования поменялись — обновляем хэш, пока знаем пароль
+                new_hash = hasher.hash(password)
+        except HasherBusy:
+            flash('Сервер перегружен, попробуйте ещё раз', 'error')
+            return render_template('auth/login.html'), 503
+        if ok:
+            user = db.session.get(User, account.id)
+            if new_hash:
+                user.password_hash = new_hash
+                db.session.commit()
             login_user(user)
             flash('Вы вошли в аккаунт', 'success')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         else:
             flash('Неверная почта или пароль', 'error')
 
     return render_template('auth/login.html')
 
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('Вы вышли из аккаунта', 'success')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
+
+
+def encode_cursor(*parts):
+    raw = '|'.join(str(p) for p in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return raw.split('|')
+
+
+def paginate_jobs(query, cursor, ranked=False, per_page=None):
+    """Одна страница ленты вакансий и курсор следующей.
+
+    Лента без поиска листается по ключу (created_at, id) — каждая страница
+    это один проход по индексу ix_job_status_created_id, без OFFSET.
+    Выдача поиска отсортирована по релевантности, поэтому там курсор хранит
+    смещение. Подходит и для запросов по отдельным колонкам (Row вместо Job).
+    """
+    per_page = per_page or current_app.config['JOBS_PER_PAGE']
+    parts = decode_cursor(cursor) if cursor else None
+
+    if ranked:
+        max_offset = current_app.config['SEARCH_MAX_OFFSET']
+        offset = 0
+        # слишком длинное число int() не разберёт, а большое смещение
+        # база не примет — такой курсор считаем испорченным
+        if parts and len(parts) == 1 and parts[0].isdecimal() \
+                and len(parts[0]) <= len(str(max_offset)):
+            offset = int(parts[0])
+            if offset > max_offset:
+                offset = 0
+        jobs = query.offset(offset).limit(per_page + 1).all()
+        next_cursor = None
+        if offset + per_page <= max_offset:
+            next_cursor = encode_cursor(offset + per_page)
+    else:
+        if parts and len(parts) == 2:
+            try:
+                created_at = datetime.datetime.fromisoformat(parts[0])
+                job_id = int(parts[1])
+            except ValueError:
+                pass
+            else:
+                query = query.filter(
+                    db.tuple_(Job.created_at, Job.id) < (created_at, job_id)
+                )
+        jobs = query.limit(per_page + 1).all()
+        next_cursor = None
+        if len(jobs) > per_page:
+            last = jobs[per_page - 1]
+            next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
+
+    if len(jobs) <= per_page:
+        return jobs, None
+    return jobs[:per_page], next_cursor
 
 
-@app.route('/vacancies')
+@bp.route('/vacancies')
+@read_replica
+@cached_page()
 def vacancies():
     search = request.args.get('search', '').strip()
-    query = Job.query.filter_by(status='approved')
+    cursor = request.args.get('cursor', '')
+    query = apply_job_filters(approved_jobs_query(), request.args)
     if search:
-        like = f"%{search}%"
-        query = query.filter(
-            db.or_(
-                Job.title.ilike(like),
-                Job.city.ilike(like),
-                Job.specialization.ilike(like),
-                Job.description.ilike(like)
-            )
-        )
-    jobs = query.order_by(Job.created_at.desc()).all()
-    return render_template('vacancies/list.html', jobs=jobs)
-
-
-@app.route('/vacancies/<int:job_id>')
+        # сортировка по релевантности
+        query = job_search.filter(query, search)
+    else:
+        query = query.order_by(Job.created_at.desc(), Job.id.desc())
+    jobs, next_cursor = paginate_jobs(query, cursor, ranked=bool(search))
+
+    filters = {name: request.args[name].strip() for name in JOB_FILTER_ARGS
+               if request.args.get(name, '').strip()}
+    recommended = []
+    if current_user.is_authenticated and current_user.role == 'worker' \
+            and not (search or filters or cursor):
+        recommended = recommended_jobs(current_user.id, current_app.config['RECOMMEND_SHOW'])
+    context = dict(jobs=jobs, next_cursor=next_cursor, search=search,
+                   filters=filters, facets=load_facets(), recommended=recommended)
+    if current_app.config['STREAM_TEMPLATES']:
+        # stream_template сам держит контекст запроса на время генерации
+        return current_app.response_class(stream_template('vacancies/list.html', **context))
+    return render_template('vacancies/list.html', **context)
+
+
+@bp.route('/vacancies/<int:job_id>')
+@read_replica
+@cached_page()
 def vacancy_detail(job_id):
-    job = Job.query.get_or_404(job_id)
+    job = Job.query.options(joinedload(Job.employer)) \
+                   .filter_by(id=job_id).first_or_404()
     if job.status != 'approved':
         # показываем неопубликованную только её владельцу-работодателю
         if not (current_user.is_authenticated and
                 current_user.role == 'employer' and
                 job.employer_id == current_user.id):
             flash('Вакансия ещё не опубликована', 'error')
-            return redirect(url_for('vacancies'))
+            return redirect(url_for('main.vacancies'))
     return render_template('vacancies/detail.html', job=job)
 
 
-@app.route('/vacancies/<int:job_id>/apply', methods=['POST'])
+@bp.route('/vacancies/<int:job_id>/apply', methods=['POST'])
 @login_required
 def apply(job_id):
     if current_user.role != 'worker':
         flash('Только соискатели могут откликаться на вакансии', 'error')
-        return redirect(url_for('vacancy_detail', job_id=job_id))
+        return redirect(url_for('main.vacancy_detail', job_id=job_id))
 
     job = Job.query.get_or_404(job_id)
 
     # проверка: профиль должен быть заполнен (хотя бы телефон)
     if not current_user.phone:
         flash('Заполните профиль (укажите телефон), прежде чем откликаться', 'error')
-        return redirect(url_for('profile'))
-
-    # проверка на повторный отклик
-    if Application.query.filter_by(job_id=job.id, worker_id=current_user.id).first():
-        flash('Вы уже откликались на эту вакансию', 'error')
-        return redirect(url_for('vacancy_detail', job_id=job_id))
+        return redirect(url_for('main.profile'))
 
-    note = request.form.get('note', '').strip()
-    app_obj = Application(job_id=job.id, worker_id=current_user.id, note=note)
-    db.session.add(app_obj)
+    key = request.form.get('idempotency_key', '')[:64] or None
+    application, created = add_application(job, current_user.id,
+                                           request.form.get('note', '').strip(), key)
     db.session.commit()
-    flash('Отклик отправлен', 'success')
-    return redirect(url_for('vacancy_detail', job_id=job_id))
+    # двойной клик отправляет форму с тем же ключом — это тот же отклик
+    if created or (key and application.idempotency_key == key):
+        flash('Отклик отправлен', 'success')
+    else:
+        flash('Вы уже откликались на эту вакансию', 'error')
+    return redirect(url_for('main.vacancy_detail', job_id=job_id))
 
 
-@app.route('/vacancies/create', methods=['GET', 'POST'])
+@bp.route('/vacancies/create', methods=['GET', 'POST'])
 @login_required
 def create_vacancy():
     if current_user.role != 'employer':
         flash('Только компания может размещать вакансии', 'error')
-        return redirect(url_for('vacancies'))
+        return redirect(url_for('main.vacancies'))
 
     if request.method == 'POST':
         title = request.form.get('title', '').strip()
@@ -233,13 +939,46 @@ def create_vacancy():
                 status='pending'  # сначала на модерацию
             )
             db.session.add(job)
+            job_search.sync(job)
+            bump_counter(current_user.id, User.jobs_count)
             db.session.commit()
+            stats_cache.job_status_changed(None, job.status)
+            jobs_changed()
             flash('Вакансия отправлена на модерацию', 'success')
-            return redirect(url_for('vacancies'))
+            return redirect(url_for('main.vacancies'))
 
     return render_template('vacancies/create.html')
 
-@app.route('/post-job', methods=['GET', 'POST'])
+@bp.route('/vacancies/import', methods=['GET', 'POST'])
+@login_required
+def import_vacancies():
+    if current_user.role != 'employer':
+        flash('Только компания может размещать вакансии', 'error')
+        return redirect(url_for('main.vacancies'))
+
+    result = None
+    if request.method == 'POST':
+        limit = current_app.config['IMPORT_MAX_UPLOAD_BYTES']
+        # размер — до разбора формы, которую werkzeug пишет во временный файл
+        too_large = (request.content_length or 0) > limit
+        upload = None if too_large else request.files.get('file')
+        fmt = importer.detect_format(upload.filename if upload else None)
+        if too_large:
+            result = dict(created=0, errors=[
+                (0, f'Файл больше {limit // (1024 * 1024)} МБ — разбейте его на части')])
+        elif fmt is None:
+            result = dict(created=0, errors=[(0, 'Загрузите файл .csv или .jsonl')])
+        else:
+            created, errors = import_jobs(current_user.id,
+                                          importer.read_rows(upload.stream, fmt),
+                                          max_rows=current_app.config['IMPORT_MAX_ROWS'])
+            result = dict(created=created, errors=errors)
+    return render_template('vacancies/import.html', result=result,
+                           max_errors=current_app.config['IMPORT_MAX_ERRORS'],
+                           max_rows=current_app.config['IMPORT_MAX_ROWS'])
+
+
+@bp.route('/post-job', methods=['GET', 'POST'])
 @login_required
 def post_job():
     # используем ту же логику, что и в create_vacancy
@@ -247,37 +986,39 @@ def post_job():
     
 
     
-@app.route('/support')
+@bp.route('/support')
 @login_required
 def support():
     # доступ только модератору
     if current_user.role != 'moderator':
         flash('Страница доступна только модераторам', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     # пока заглушка — просто рендер страницы поддержки
     # позже сюда можно добавить список споров/депозитов и т.п.
     return render_template('support/index.html')
     
-@app.route('/manage')
+@bp.route('/manage')
 @login_required
 def manage():
     if current_user.role not in ('employer', 'moderator'):
         flash('Недостаточно прав', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     if current_user.role == 'employer':
-        jobs = Job.query.filter_by(employer_id=current_user.id) \
-                        .order_by(Job.created_at.desc()).all()
+        # сводка по откликам — из счётчиков в job; сами отклики — на странице
+        # вакансии (job_applications), постранично
+        jobs, next_cursor = paginate_jobs(employer_jobs_query(current_user.id),
+                                          request.args.get('cursor', ''))
     else:
-        # модератор видит все pending
-        jobs = Job.query.filter_by(status='pending') \
-                        .order_by(Job.created_at.desc()).all()
+        # очередь модерации — постранично, по ключу (created_at, id)
+        jobs, next_cursor = paginate_jobs(pending_jobs_query(), request.args.get('cursor', ''),
+                                          per_page=current_app.config['MODERATION_PAGE_SIZE'])
 
-    return render_template('manage.html', jobs=jobs)
+    return render_template('manage.html', jobs=jobs, next_cursor=next_cursor)
 
 
-@app.route('/manage/job/<int:job_id>/status/<string:action>', methods=['POST'])
+@bp.route('/manage/job/<int:job_id>/status/<string:action>', methods=['POST'])
 @login_required
 def change_job_status(job_id, action):
     job = Job.query.get_or_404(job_id)
@@ -285,67 +1026,214 @@ def change_job_status(job_id, action):
     if current_user.role == 'employer':
         if job.employer_id != current_user.id:
             flash('Вы не можете менять эту вакансию', 'error')
-            return redirect(url_for('manage'))
+            return redirect(url_for('main.manage'))
         if action == 'close':
-            job.status = 'rejected'
+            status = 'rejected'
         else:
             flash('Неверное действие', 'error')
-            return redirect(url_for('manage'))
+            return redirect(url_for('main.manage'))
 
     elif current_user.role == 'moderator':
         if action == 'approve':
-            job.status = 'approved'
+            status = 'approved'
         elif action == 'reject':
-            job.status = 'rejected'
+            status = 'rejected'
         else:
             flash('Неверное действие', 'error')
-            return redirect(url_for('manage'))
+            return redirect(url_for('main.manage'))
     else:
         flash('Недостаточно прав', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
+
+    # версия, которую видел пользователь; None — форма без неё
+    seen_version = request.form.get('version', type=int)
+    if seen_version is not None and seen_version != job.version:
+        flash('Вакансию уже изменили, пока страница была открыта', 'error')
+        return redirect(url_for('main.manage'))
+    try:
+        # UPDATE с проверкой версии уходит уже при autoflush внутри
+        # job_search.sync, а не только при commit
+        old_status = set_job_status(job, status)
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        flash('Вакансию уже изменили, пока страница была открыта', 'error')
+        return redirect(url_for('main.manage'))
+    job_statuses_committed([(old_status, status)])
+    flash('Статус вакансии обновлён', 'success')
+    return redirect(url_for('main.manage'))
+
 
+@bp.route('/manage/moderation', methods=['POST'])
+@login_required
+def moderate_jobs():
+    """Массовое одобрение/отклонение отмеченных в очереди вакансий."""
+    if current_user.role != 'moderator':
+        flash('Недостаточно прав', 'error')
+        return redirect(url_for('main.index'))
+    status = {'approve': 'approved', 'reject': 'rejected'}.get(request.form.get('action'))
+    # отмеченные вакансии приходят как "id:version"
+    seen = {}
+    for item in request.form.getlist('job'):
+        job_id, _, version = item.partition(':')
+        if job_id.isdigit() and version.isdigit():
+            seen[int(job_id)] = int(version)
+    if status is None or not seen:
+        flash('Отметьте вакансии и выберите действие', 'error')
+        return redirect(url_for('main.manage'))
+
+    rows = db.session.execute(
+        select(Job.id, Job.status, Job.version).where(Job.id.in_(list(seen)))
+    ).all()
+    # изменённые с момента открытия страницы (в т.ч. другим модератором) пропускаем
+    fresh = [row for row in rows if row.version == seen[row.id]]
+    updated = update_job_statuses(fresh, status, from_statuses=('pending',))
     db.session.commit()
-    flash('Статус вакансии обновлён', 'success')
-    return redirect(url_for('manage'))
+    if updated:
+        job_statuses_committed([(old, status) for old in updated.values()])
+
+    message = f'Обработано вакансий: {len(updated)}'
+    if len(updated) < len(seen):
+        message += f'; пропущено (уже изменены): {len(seen) - len(updated)}'
+    flash(message, 'success')
+    return redirect(url_for('main.manage', cursor=request.form.get('cursor') or None))
+
+
+def employer_job(job_id):
+    """Вакансия текущего работодателя или None (чужая, нет такой)."""
+    job = db.session.get(Job, job_id)
+    if job is None or current_user.role != 'employer' or job.employer_id != current_user.id:
+        return None
+    return job
 
 
-@app.route('/profile', methods=['GET', 'POST'])
+@bp.route('/manage/job/<int:job_id>/applications')
+@login_required
+def job_applications(job_id):
+    job = employer_job(job_id)
+    if job is None:
+        flash('Вакансия не найдена', 'error')
+        return redirect(url_for('main.manage'))
+    status = request.args.get('status', '')
+    status = status if status in APPLICATION_STATUSES else ''
+    sort = request.args.get('sort', '')
+    sort = sort if sort in APPLICANT_SORTS else 'date'
+    key, parse = APPLICANT_SORTS[sort]
+    per_page = current_app.config['APPLICANTS_PER_PAGE']
+
+    query = job_applicants_query(job.id, status, sort)
+    parts = decode_cursor(request.args.get('cursor', ''))
+    if parts and len(parts) == 2:
+        try:
+            after = (parse(parts[0]), int(parts[1]))
+        except ValueError:
+            pass
+        else:
+            query = query.filter(db.tuple_(key, Application.id) < after)
+    applications = query.limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(applications) > per_page:
+        applications = applications[:per_page]
+        last = applications[-1]
+        value = {'date': last.created_at.isoformat() if last.created_at else '',
+                 'rating': last.worker.rating or 0,
+                 'experience': last.worker.exp_years or 0}[sort]
+        next_cursor = encode_cursor(value, last.id)
+
+    return render_template('job_applications.html', job=job, applications=applications,
+                           status=status, sort=sort, next_cursor=next_cursor)
+
+
+@bp.route('/manage/job/<int:job_id>/applications', methods=['POST'])
+@login_required
+def update_applications(job_id):
+    """Принять/отклонить отмеченные отклики (или все необработанные)."""
+    job = employer_job(job_id)
+    if job is None:
+        flash('Вакансия не найдена', 'error')
+        return redirect(url_for('main.manage'))
+    status = {'accept': 'accepted', 'reject': 'rejected'}.get(request.form.get('action'))
+    ids = [int(i) for i in request.form.getlist('application') if i.isdigit()]
+    all_applied = request.form.get('scope') == 'applied'
+    back = redirect(url_for('main.job_applications', job_id=job.id,
+                            **{name: request.form[name] for name in ('status', 'sort', 'cursor')
+                               if request.form.get(name)}))
+    if status is None or not (ids or all_applied):
+        flash('Отметьте отклики и выберите действие', 'error')
+        return back
+    if all_applied:
+        changed = set_application_statuses(job.id, status, from_statuses=('applied',))
+    else:
+        changed = set_application_statuses(job.id, status, ids=ids[:API_BATCH_LIMIT])
+    db.session.commit()
+    flash(f'Обработано откликов: {changed}', 'success')
+    return back
+
+
+@bp.route('/manage/moderation/auto-approve', methods=['POST'])
+@login_required
+def auto_approve():
+    if current_user.role != 'moderator':
+        flash('Недостаточно прав', 'error')
+        return redirect(url_for('main.index'))
+    updated = auto_approve_pending()
+    flash(f'Автоматически одобрено вакансий: {len(updated)}', 'success')
+    return redirect(url_for('main.manage'))
+
+
+@bp.route('/profile', methods=['GET', 'POST'])
+@read_replica
 @login_required
 def profile():
     if request.method == 'POST':
-        current_user.phone = request.form.get('phone') or None
-        current_user.education = request.form.get('education') or None
-        current_user.exp_years = int(request.form.get('exp_years') or 0)
+        user = db.session.get(User, current_user.id)
+        user.phone = request.form.get('phone') or None
+        user.education = request.form.get('education') or None
+        user.exp_years = int(request.form.get('exp_years') or 0)
+
+        photo = request.files.get('avatar')
+        if photo and photo.filename:
+            try:
+                user.avatar_url = avatars.save_upload(
+                    photo.stream, current_app.config['AVATAR_UPLOAD_DIR'],
+                    current_app.config['AVATAR_MAX_UPLOAD_BYTES'])
+            except ValueError as e:
+                db.session.rollback()
+                flash(str(e), 'error')
+                return redirect(url_for('main.profile'))
+        elif request.form.get('remove_avatar'):
+            user.avatar_url = None
+
+        # образование и опыт участвуют в подборе вакансий
+        if user.role == 'worker' and recommend.available():
+            defer_task(recommend_for_workers, [user.id])
 
         # страховой взнос только для соискателя
-        if current_user.role == 'worker':
+        if user.role == 'worker':
             dep_raw = request.form.get('deposit')
             try:
-                current_user.deposit = float(dep_raw or 0)
+                user.deposit = float(dep_raw or 0)
             except (TypeError, ValueError):
-                current_user.deposit = 0
+                user.deposit = 0
 
+        forget_user(user.id)
         db.session.commit()
         flash('Профиль обновлён', 'success')
-        return redirect(url_for('profile'))
+        return redirect(url_for('main.profile'))
 
-    # --- Статистика профиля ---
+    # --- Статистика профиля (из счётчиков в user, без COUNT-запросов) ---
     rating = getattr(current_user, 'rating', 0) or 0
 
     if current_user.role == 'employer':
-        jobs_count = Job.query.filter_by(employer_id=current_user.id).count()
-        responses_count = (
-            Application.query
-            .join(Job, Application.job_id == Job.id)
-            .filter(Job.employer_id == current_user.id)
-            .count()
-        )
+        jobs_count = current_user.jobs_count
+        responses_count = current_user.responses_count
     elif current_user.role == 'worker':
         jobs_count = 0
-        responses_count = Application.query.filter_by(worker_id=current_user.id).count()
+        responses_count = current_user.applications_count
     else:
-        jobs_count = Job.query.filter_by(employer_id=current_user.id).count()
-        responses_count = Application.query.filter_by(worker_id=current_user.id).count()
+        jobs_count = current_user.jobs_count
+        responses_count = current_user.applications_count
 
     class Stats:
         def __init__(self, rating, jobs, responses):
@@ -355,36 +1243,986 @@ def profile():
 
     profile_stats = Stats(rating, jobs_count, responses_count)
 
-    return render_template('profile/index.html', profile_stats=profile_stats)
+    return render_template('profile/index.html', profile_stats=profile_stats,
+                           avatar_uploads=avatars.Image is not None)
 
 
-@app.route('/my-applications')
+@bp.route('/my-applications')
+@read_replica
 @login_required
 def my_applications():
     if current_user.role != 'worker':
         flash('Страница доступна только соискателям', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
-    apps = Application.query.filter_by(worker_id=current_user.id) \
-                            .order_by(Application.created_at.desc()).all()
+    apps = worker_applications_query(current_user.id) \
+        .options(joinedload(Application.job)).all()
     return render_template('my_applications.html', applications=apps)
 
 
+# ---------- JSON API v1 ----------
+# Для мобильного клиента и партнёров. Запросы выбирают только нужные
+# колонки (Row, а не объекты Job); авторизация — та же сессия Flask-Login.
+
+API_JOB_COLUMNS = (Job.id, Job.title, Job.city, Job.specialization, Job.wage,
+                   Job.pay_type, Job.duration_days, Job.created_at)
+API_PAGE_LIMIT = 100
+API_BATCH_LIMIT = 500
+
+
+def job_row(row):
+    data = row._asdict()
+    data['created_at'] = row.created_at.isoformat()
+    return data
+
+
+def api_login_required(*roles):
+    """Как login_required, но 401/403 в JSON вместо редиректа на /login."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_user.is_authenticated:
+                return api_error('Требуется вход', 401)
+            if roles and current_user.role not in roles:
+                return api_error('Недостаточно прав', 403)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@bp.route('/api/v1/vacancies')
+def api_vacancies():
+    search = request.args.get('search', '').strip()
+    limit = min(request.args.get('limit', current_app.config['JOBS_PER_PAGE'], type=int),
+                API_PAGE_LIMIT)
+    query = db.session.query(*API_JOB_COLUMNS).filter(Job.status == 'approved')
+    query = apply_job_filters(query, request.args)
+    if search:
+        query = job_search.filter(query, search)
+    else:
+        query = query.order_by(Job.created_at.desc(), Job.id.desc())
+    rows, next_cursor = paginate_jobs(query, request.args.get('cursor', ''),
+                                      ranked=bool(search), per_page=max(limit, 1))
+    return json_response({'items': [job_row(row) for row in rows],
+                          'next_cursor': next_cursor})
+
+
+@bp.route('/api/v1/vacancies/<int:job_id>')
+def api_vacancy(job_id):
+    row = db.session.query(*API_JOB_COLUMNS, Job.description, Job.status,
+                           Job.employer_id, User.name.label('employer_name')) \
+                    .join(User, User.id == Job.employer_id) \
+                    .filter(Job.id == job_id).first()
+    own = (current_user.is_authenticated and current_user.role == 'employer'
+           and row is not None and row.employer_id == current_user.id)
+    if row is None or (row.status != 'approved' and not own):
+        return api_error('Вакансия не найдена', 404)
+    return json_response(job_row(row))
+
+
+@bp.route('/api/v1/recommendations')
+@api_login_required('worker')
+def api_recommendations():
+    limit = min(request.args.get('limit', current_app.config['RECOMMEND_SHOW'], type=int),
+                current_app.config['RECOMMEND_TOP_N'])
+    query = db.session.query(*API_JOB_COLUMNS, Job.status)
+    rows = recommended_jobs(current_user.id, max(limit, 1), query)
+    return json_response({'items': [job_row(row) for row in rows]})
+
+
+@bp.route('/api/v1/vacancies/<int:job_id>/apply', methods=['POST'])
+@api_login_required('worker')
+def api_apply(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None or job.status != 'approved':
+        return api_error('Вакансия не найдена', 404)
+    if not current_user.phone:
+        return api_error('Заполните профиль (укажите телефон)', 422)
+
+    data = request.get_json(silent=True) or {}
+    key = request.headers.get('Idempotency-Key', '')[:64] or None
+    application, created = add_application(job, current_user.id,
+                                           str(data.get('note') or '').strip(), key)
+    db.session.commit()
+    # повтор с тем же Idempotency-Key получает тот же ответ, что и первый запрос
+    if not created and not (key and application.idempotency_key == key):
+        return api_error('Вы уже откликались на эту вакансию', 409)
+    return json_response({'id': application.id, 'job_id': job.id,
+                          'created_at': application.created_at.isoformat()}, 201)
+
+
+@bp.route('/api/v1/moderation/status', methods=['POST'])
+@api_login_required('moderator')
+def api_moderation_status():
+    """Пакетная смена статуса: {"ids": [1, 2, ...], "status": "approved"}."""
+    data = request.get_json(silent=True) or {}
+    status = data.get('status')
+    ids = data.get('ids')
+    if status not in ('approved', 'rejected'):
+        return api_error('status: approved или rejected', 400)
+    if not isinstance(ids, list) or not ids or len(ids) > API_BATCH_LIMIT \
+            or not all(isinstance(i, int) for i in ids):
+        return api_error(f'ids: список из 1..{API_BATCH_LIMIT} id', 400)
+
+    rows = db.session.execute(
+        select(Job.id, Job.status, Job.version).where(Job.id.in_(ids))
+    ).all()
+    # как и на странице модерации, решение принимается только по вакансиям
+    # на модерации: одобренную нельзя отклонить, истёкшую — вернуть в ленту
+    not_pending = [row.id for row in rows if row.status != 'pending']
+    if not_pending:
+        return json_response({'error': 'Статус меняется только у вакансий на модерации',
+                              'ids': not_pending}, 409)
+    updated = update_job_statuses(rows, status, from_statuses=('pending',))
+    db.session.commit()
+    if updated:
+        job_statuses_committed([(old, status) for old in updated.values()])
+    found = {row.id for row in rows}
+    return json_response({
+        'updated': list(updated),
+        # статус поменяли между чтением и UPDATE
+        'conflicts': [i for i in found if i not in updated],
+        'missing': [i for i in ids if i not in found],
+    })
+
+
+# ---------- общие операции над данными ----------
+
+def dialect_insert(model):
+    """INSERT с on_conflict_do_nothing/do_update для текущей СУБД."""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
+def add_application(job, worker_id, note='', key=None):
+    """Отклик вместе со счётчиками соискателя и работодателя (до commit).
+
+    Один INSERT ... ON CONFLICT (job_id, worker_id) DO NOTHING: одновременные
+    повторы не падают на uq_job_worker, счётчики сдвигает только тот, чья
+    строка вставилась. Возвращает (id, created_at, idempotency_key) отклика
+    и признак, что он создан сейчас, а не существовал раньше.
+    """
+    columns = (Application.id, Application.created_at, Application.idempotency_key)
+    stmt = dialect_insert(Application).values(
+        job_id=job.id, worker_id=worker_id, note=note, status='applied',
+        created_at=datetime.datetime.utcnow(), idempotency_key=key,
+    ).on_conflict_do_nothing(index_elements=['job_id', 'worker_id'])
+    if db.engine.dialect.insert_returning:
+        row = db.session.execute(stmt.returning(*columns)).first()
+    else:
+        row = None
+        if db.session.execute(stmt).rowcount:
+            row = db.session.execute(select(*columns).where(
+                Application.job_id == job.id, Application.worker_id == worker_id)).first()
+    if row is None:
+        return db.session.execute(select(*columns).where(
+            Application.job_id == job.id, Application.worker_id == worker_id)).first(), False
+    bump_counter(worker_id, User.applications_count)
+    bump_counter(job.employer_id, User.responses_count)
+    bump_job_counts(job.id, {'applied': 1})
+    return row, True
+
+
+def import_jobs(employer_id, rows, status='pending', max_rows=None):
+    """Массовая вставка вакансий из importer.read_rows(): проверенные строки
+    пишутся пачками по IMPORT_CHUNK_SIZE, каждая пачка — одним executemany
+    в своей транзакции. Возвращает (создано, [(номер строки, ошибка)])."""
+    chunk_size = current_app.config['IMPORT_CHUNK_SIZE']
+    created, errors, chunk = 0, [], []
+    try:
+        for count, (line_no, raw) in enumerate(rows, 1):
+            if max_rows and count > max_rows:
+                errors.append((line_no, f'В файле больше {max_rows} строк, остальные пропущены'))
+                break
+            try:
+                chunk.append((line_no, importer.clean_row(raw)))
+            except ValueError as e:
+                errors.append((line_no, str(e)))
+                continue
+            if len(chunk) >= chunk_size:
+                created += insert_job_chunk(employer_id, chunk, status, errors)
+                chunk = []
+    except UnicodeDecodeError:
+        errors.append((0, 'Файл не в кодировке UTF-8 (сохраните CSV как «CSV UTF-8»)'))
+    except csv.Error as e:
+        errors.append((0, f'Файл не разбирается как CSV: {e}'))
+    if chunk:
+        created += insert_job_chunk(employer_id, chunk, status, errors)
+    if created:
+        if status == 'approved':
+            stats_cache.incr('active_jobs', created)
+        jobs_changed()
+    return created, errors
+
+
+def insert_job_chunk(employer_id, chunk, status, errors):
+    now = datetime.datetime.utcnow()
+    values = [dict(row, employer_id=employer_id, status=status, created_at=now)
+              for _, row in chunk]
+    try:
+        ids = db.session.execute(
+            Job.__table__.insert().returning(Job.__table__.c.id), values
+        ).scalars().all()
+        if status == 'approved':
+            defer_task(reindex_jobs, ids)
+            if recommend.available():
+                defer_task(recommend_new_jobs, ids)
+            update_facets([(v['city'], v['specialization'], None, status) for v in values])
+        bump_counter(employer_id, User.jobs_count, len(ids))
+        db.session.commit()
+    except (DataError, IntegrityError, OverflowError) as e:
+        # база не приняла значение в какой-то строке: на PostgreSQL откатилась
+        # вся пачка — сохраняем её строки по одной, ошибка — только у виновной
+        db.session.rollback()
+        if len(chunk) > 1:
+            return sum(insert_job_chunk(employer_id, [item], status, errors) for item in chunk)
+        errors.append((chunk[0][0], f'Строка не сохранена: {e.__class__.__name__}'))
+        return 0
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        errors.append((chunk[0][0], f'Строки {chunk[0][0]}–{chunk[-1][0]} не сохранены: '
+                                    f'{e.__class__.__name__}'))
+        return 0
+    return len(ids)
+
+
+def set_job_status(job, status):
+    """Меняет статус вакансии и её запись в поисковом индексе; возвращает
+    прежний статус. После commit — job_statuses_committed()."""
+    old_status = job.status
+    job.status = status
+    job_search.sync(job)
+    update_facets([(job.city, job.specialization, old_status, status)])
+    if status == 'approved' and old_status != status and recommend.available():
+        defer_task(recommend_new_jobs, [job.id])
+    return old_status
+
+
+def job_statuses_committed(changes):
+    """Кэши после commit смены статусов; changes — пары (старый, новый)."""
+    for old_status, new_status in changes:
+        stats_cache.job_status_changed(old_status, new_status)
+    jobs_changed()
+
+
+def update_job_statuses(rows, status, from_statuses=None):
+    """Массовая смена статуса одним UPDATE ... WHERE (id, version) IN (...).
+
+    rows — (id, status, version), прочитанные до изменения. Строки, которые
+    с тех пор кто-то изменил (версия другая), UPDATE не затронет; при
+    from_statuses меняются только вакансии в одном из этих статусов.
+    Возвращает {id: прежний статус} обновлённых; commit и
+    job_statuses_committed() — на вызывающем.
+    """
+    targets = {row.id: row for row in rows if row.status != status
+               and (from_statuses is None or row.status in from_statuses)}
+    if not targets:
+        return {}
+    stmt = update(Job) \
+        .where(db.tuple_(Job.id, Job.version).in_([(r.id, r.version) for r in targets.values()])) \
+        .values(status=status, version=Job.version + 1) \
+        .execution_options(synchronize_session=False)
+    if from_statuses is not None:
+        stmt = stmt.where(Job.status.in_(from_statuses))
+    if db.engine.dialect.update_returning:
+        updated = db.session.execute(stmt.returning(Job.id)).scalars().all()
+    else:
+        db.session.execute(stmt)
+        updated = [row.id for row in db.session.execute(
+            select(Job.id, Job.version).where(Job.id.in_(list(targets)))
+        ) if row.version == targets[row.id].version + 1]
+    if updated:
+        # поисковый индекс для пачки — фоновой задачей после commit
+        defer_task(reindex_jobs, updated)
+        if status == 'approved' and recommend.available():
+            defer_task(recommend_new_jobs, updated)
+        update_facets([
+            (row.city, row.specialization, targets[row.id].status, status)
+            for row in db.session.execute(
+                select(Job.id, Job.city, Job.specialization).where(Job.id.in_(updated))
+            )
+        ])
+    return {job_id: targets[job_id].status for job_id in updated}
+
+
+@task_queue.task
+def reindex_jobs(ids):
+    """Приводит записи поискового индекса в соответствие со статусами вакансий
+    (идемпотентна: статусы перечитываются из базы)."""
+    job_search.sync_ids(ids)
+    db.session.commit()
+    # страницы поиска, закэшированные до переиндексации, больше не читаются
+    jobs_changed()
+
+
+def update_facets(changes):
+    """Сдвигает счётчики JobFacet; changes — (город, специализация,
+    старый статус, новый статус). Вызывается до commit, в той же транзакции."""
+    deltas = Counter()
+    for city, specialization, old_status, new_status in changes:
+        delta = (new_status == 'approved') - (old_status == 'approved')
+        if not delta:
+            continue
+        for facet, value in (('city', city), ('specialization', specialization)):
+            if value:
+                deltas[facet, value] += delta
+    for (facet, value), delta in deltas.items():
+        if not delta:
+            continue
+        stmt = dialect_insert(JobFacet).values(facet=facet, value=value, count=delta)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['facet', 'value'],
+            set_={'count': JobFacet.count + stmt.excluded['count']},
+        ))
+
+
+def rebuild_facets():
+    """Полный пересчёт JobFacet одним GROUP BY (после импорта, для проверки)."""
+    db.session.execute(JobFacet.__table__.delete())
+    for facet in ('city', 'specialization'):
+        column = getattr(Job, facet)
+        db.session.execute(JobFacet.__table__.insert().from_select(
+            ['facet', 'value', 'count'],
+            select(db.literal(facet), column, func.count())
+            .where(Job.status == 'approved', column.is_not(None), column != '')
+            .group_by(column)
+        ))
+    db.session.commit()
+
+
+def trusted_employers():
+    """Подзапрос: работодатели, чьи вакансии можно одобрять без модератора."""
+    min_approved = current_app.config['AUTO_APPROVE_MIN_APPROVED']
+    share = current_app.config['AUTO_APPROVE_MAX_REJECTED_SHARE']
+    # история работодателя — и в job, и в архиве; истёкшие были одобрены
+    past = union_all(select(Job.employer_id, Job.status),
+                     select(JobArchive.employer_id, JobArchive.status)).subquery()
+    approved = func.sum(case((past.c.status.in_(('approved', 'expired')), 1), else_=0))
+    rejected = func.sum(case((past.c.status == 'rejected', 1), else_=0))
+    return select(past.c.employer_id) \
+        .group_by(past.c.employer_id) \
+        .having(approved >= min_approved, rejected <= (approved + rejected) * share)
+
+
+def auto_approve_pending():
+    """Одобряет все ожидающие вакансии проверенных работодателей разом."""
+    if not current_app.config['AUTO_APPROVE_MIN_APPROVED']:
+        return {}
+    rows = db.session.execute(
+        select(Job.id, Job.status, Job.version)
+        .where(Job.status == 'pending', Job.employer_id.in_(trusted_employers()))
+    ).all()
+    updated = update_job_statuses(rows, 'approved')
+    db.session.commit()
+    if updated:
+        job_statuses_committed([(old, 'approved') for old in updated.values()])
+    return updated
+
+
+def expire_jobs(now=None):
+    """Переводит опубликованные вакансии с истёкшим сроком (created_at +
+    duration_days) в expired. Идёт по индексу (status, created_at, id)
+    пачками по SWEEP_BATCH_SIZE, каждая пачка — свой UPDATE и commit.
+    Возвращает число истёкших."""
+    now = now or datetime.datetime.utcnow()
+    batch_size = current_app.config['SWEEP_BATCH_SIZE']
+    # срок не меньше дня — более свежие вакансии даже не читаем
+    query = select(Job.id, Job.status, Job.version, Job.created_at, Job.duration_days) \
+        .where(Job.status == 'approved', Job.created_at < now - datetime.timedelta(days=1)) \
+        .order_by(Job.created_at, Job.id).limit(batch_size)
+    expired = 0
+    after = None
+    while True:
+        page = query if after is None else query.where(db.tuple_(Job.created_at, Job.id) > after)
+        rows = db.session.execute(page).all()
+        if not rows:
+            break
+        after = (rows[-1].created_at, rows[-1].id)
+        due = [row for row in rows
+               if row.created_at + datetime.timedelta(days=max(row.duration_days or 1, 1)) <= now]
+        updated = update_job_statuses(due, 'expired')
+        db.session.commit()
+        if updated:
+            job_statuses_committed([(old, 'expired') for old in updated.values()])
+        expired += len(updated)
+    return expired
+
+
+def archive_jobs(now=None):
+    """Переносит снятые вакансии (ARCHIVE_STATUSES) старше ARCHIVE_AFTER_DAYS
+    вместе с откликами в job_archive/application_archive. Пачками по
+    SWEEP_BATCH_SIZE: INSERT ... SELECT и DELETE в одной транзакции.
+    Возвращает число перенесённых вакансий."""
+    now = now or datetime.datetime.utcnow()
+    cutoff = now - datetime.timedelta(days=current_app.config['ARCHIVE_AFTER_DAYS'])
+    # колонки, которые есть и в горячей таблице, и в архиве
+    job_columns = [c for c in Job.__table__.columns if c.name in JobArchive.__table__.c]
+    application_columns = [c for c in Application.__table__.columns
+                           if c.name in ApplicationArchive.__table__.c]
+    # sqlite без AUTOINCREMENT отдаёт новой строке max(id) + 1, так что после
+    # удаления строки с наибольшим id он достался бы снова и столкнулся
+    # с архивом — такие вакансию и отклик оставляем в горячих таблицах
+    last_job = select(func.max(Job.id)).scalar_subquery()
+    last_application_job = select(Application.job_id).where(
+        Application.id == select(func.max(Application.id)).scalar_subquery()
+    ).scalar_subquery()
+    archived = 0
+    while True:
+        ids = db.session.scalars(
+            select(Job.id)
+            .where(Job.status.in_(current_app.config['ARCHIVE_STATUSES']), Job.created_at < cutoff,
+                   Job.id != last_job,
+                   Job.id != func.coalesce(last_application_job, 0))
+            .limit(current_app.config['SWEEP_BATCH_SIZE'])
+        ).all()
+        if not ids:
+            break
+        db.session.execute(JobArchive.__table__.insert().from_select(
+            [c.name for c in job_columns] + ['archived_at'],
+            select(*job_columns, db.literal(now)).where(Job.id.in_(ids))
+        ))
+        db.session.execute(ApplicationArchive.__table__.insert().from_select(
+            [c.name for c in application_columns] + ['archived_at'],
+            select(*application_columns, db.literal(now))
+            .where(Application.job_id.in_(ids))
+        ))
+        db.session.execute(Application.__table__.delete().where(Application.job_id.in_(ids)))
+        db.session.execute(Job.__table__.delete().where(Job.id.in_(ids)))
+        db.session.commit()
+        archived += len(ids)
+    if archived:
+        jobs_changed()
+    return archived
+
+
+# ---------- рекомендации ----------
+# flask recommend (по cron) пересчитывает списки всех соискателей и
+# сохраняет модель в RECOMMEND_MODEL_PATH; опубликованные с тех пор вакансии
+# добавляются в списки задачей recommend_new_jobs, новым соискателям и после
+# правки профиля список считает recommend_for_workers. Отклики, сделанные
+# после расчёта, влияют на подбор со следующего полного пересчёта.
+
+recommend_model = None  # (mtime файла, recommend.Model)
+
+
+def load_recommend_model():
+    """Модель последнего полного пересчёта (перечитывается, если файл новее)."""
+    global recommend_model
+    path = current_app.config['RECOMMEND_MODEL_PATH']
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if recommend_model is None or recommend_model[0] != mtime:
+        recommend_model = (mtime, recommend.Model.load(path))
+    return recommend_model[1]
+
+
+def recommendation_jobs(model, rows, now):
+    return model.jobs([r.id for r in rows], [r.city for r in rows],
+                      [r.specialization for r in rows], [r.pay_type for r in rows],
+                      [r.wage for r in rows],
+                      [(now - r.created_at).total_seconds() / 86400 for r in rows])
+
+
+def load_recommendation_data(worker_ids=None):
+    """Опубликованные вакансии, соискатели (id, образование, опыт, рейтинг)
+    и их отклики (worker_id, город, специализация, тип оплаты, job_id),
+    включая архивные."""
+    jobs = db.session.execute(
+        select(Job.id, Job.city, Job.specialization, Job.pay_type, Job.wage, Job.created_at)
+        .where(Job.status == 'approved')
+    ).all()
+    workers = select(User.id, User.education, User.exp_years, User.rating) \
+        .where(User.role == 'worker')
+    live = select(Application.worker_id, Job.city, Job.specialization, Job.pay_type,
+                  Application.job_id).join(Job, Job.id == Application.job_id)
+    archived = select(ApplicationArchive.worker_id, JobArchive.city, JobArchive.specialization,
+                      JobArchive.pay_type, ApplicationArchive.job_id) \
+        .join(JobArchive, JobArchive.id == ApplicationArchive.job_id)
+    if worker_ids is not None:
+        workers = workers.where(User.id.in_(worker_ids))
+        live = live.where(Application.worker_id.in_(worker_ids))
+        archived = archived.where(ApplicationArchive.worker_id.in_(worker_ids))
+    return (jobs, db.session.execute(workers).all(),
+            db.session.execute(union_all(live, archived)).all())
+
+
+def compute_recommendations(jobs, workers, history, now):
+    """Строит модель и top-N для каждого соискателя: (модель, строки Recommendation)."""
+    model = recommend.Model.build([r.city for r in jobs], [r.specialization for r in jobs],
+                                  [r.pay_type for r in jobs], [r.wage for r in jobs],
+                                  workers, history)
+    # на то, куда уже откликался, не рекомендуем
+    applied = {}
+    for row in history:
+        applied.setdefault(row[0], set()).add(row[4])
+    top_n = current_app.config['RECOMMEND_TOP_N']
+    rows = [recommendation_row(worker_id, list(zip(ids, scores)), now)
+            for worker_id, ids, scores in model.top_n(
+                recommendation_jobs(model, jobs, now), top_n, applied)]
+    return model, rows
+
+
+def recommendation_row(worker_id, items, now):
+    full = len(items) >= current_app.config['RECOMMEND_TOP_N']
+    return dict(worker_id=worker_id, items=json.dumps(items),
+                min_score=items[-1][1] if full else None, computed_at=now)
+
+
+def save_recommendations(rows):
+    """Записывает строки Recommendation (вставка или замена), до commit."""
+    for start in range(0, len(rows), current_app.config['IMPORT_CHUNK_SIZE']):
+        stmt = dialect_insert(Recommendation)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['worker_id'],
+            set_={name: stmt.excluded[name] for name in ('items', 'min_score', 'computed_at')},
+        ), rows[start:start + current_app.config['IMPORT_CHUNK_SIZE']])
+
+
+def rebuild_recommendations(now=None):
+    """Полный пересчёт рекомендаций всех соискателей; возвращает их число."""
+    now = now or datetime.datetime.utcnow()
+    model, rows = compute_recommendations(*load_recommendation_data(), now)
+    # расчёт — до первой записи, чтобы не держать блокировку базы
+    db.session.execute(Recommendation.__table__.delete())
+    save_recommendations(rows)
+    db.session.commit()
+    model.save(current_app.config['RECOMMEND_MODEL_PATH'])
+    return len(rows)
+
+
+@task_queue.task
+def recommend_for_workers(ids):
+    """Список для отдельных соискателей (новых или изменивших профиль)."""
+    if not recommend.available():
+        return
+    now = datetime.datetime.utcnow()
+    _, rows = compute_recommendations(*load_recommendation_data(ids), now)
+    save_recommendations(rows)
+    db.session.commit()
+
+
+@task_queue.task
+def recommend_new_jobs(ids):
+    """Добавляет опубликованные вакансии в списки тех соискателей, кому они
+    подходят лучше последней рекомендованной. Идемпотентна: повтор лишь
+    заново сливает те же вакансии."""
+    model = load_recommend_model() if recommend.available() else None
+    if model is None:
+        return
+    now = datetime.datetime.utcnow()
+    rows = db.session.execute(
+        select(Job.id, Job.city, Job.specialization, Job.pay_type, Job.wage, Job.created_at)
+        .where(Job.id.in_(ids), Job.status == 'approved')
+    ).all()
+    if not rows:
+        return
+    thresholds = dict(db.session.execute(
+        select(Recommendation.worker_id, Recommendation.min_score)).all())
+    better = model.better_than(recommendation_jobs(model, rows, now), thresholds)
+    top_n = current_app.config['RECOMMEND_TOP_N']
+    worker_ids = list(better)
+    for start in range(0, len(worker_ids), current_app.config['SWEEP_BATCH_SIZE']):
+        chunk = worker_ids[start:start + current_app.config['SWEEP_BATCH_SIZE']]
+        current = dict(db.session.execute(
+            select(Recommendation.worker_id, Recommendation.items)
+            .where(Recommendation.worker_id.in_(chunk))).all())
+        save_recommendations([
+            recommendation_row(worker_id, recommend.merge(
+                json.loads(current.get(worker_id, '[]')), better[worker_id], top_n), now)
+            for worker_id in chunk
+        ])
+        db.session.commit()
+
+
+def recommended_jobs(worker_id, limit, query=None):
+    """Рекомендованные соискателю опубликованные вакансии, на которые он ещё
+    не откликался: строка Recommendation по ключу и вакансии по id.
+    query — откуда выбирать, с колонкой status (по умолчанию Job.query).
+
+    Статус проверяется после выборки: с условием status = ? sqlite берёт
+    индекс по статусу и просматривает все опубликованные вакансии, а не
+    ищет несколько штук по первичному ключу."""
+    items = db.session.scalar(
+        select(Recommendation.items).where(Recommendation.worker_id == worker_id))
+    if not items:
+        return []
+    ids = [job_id for job_id, _ in json.loads(items)]
+    query = Job.query if query is None else query
+    found = {row.id: row for row in query.filter(
+        Job.id.in_(ids),
+        Job.id.not_in(select(Application.job_id).where(
+            Application.worker_id == worker_id, Application.job_id.in_(ids))),
+    ) if row.status == 'approved'}
+    return [found[job_id] for job_id in ids if job_id in found][:limit]
+
+
+def bump_counter(user_id, column, delta=1):
+    """Атомарно сдвигает счётчик пользователя в текущей транзакции."""
+    db.session.execute(
+        update(User).where(User.id == user_id).values({column: column + delta})
+    )
+    forget_user(user_id)
+
+
+APPLICATION_STATUSES = ('applied', 'accepted', 'rejected')
+
+
+def bump_job_counts(job_id, deltas):
+    """Сдвигает счётчики откликов вакансии ({статус: дельта}) в текущей
+    транзакции. UPDATE по таблице, а не через модель: версию вакансии
+    (оптимистичная блокировка) отклики не меняют."""
+    table = Job.__table__
+    values = {table.c[f'{status}_count']: table.c[f'{status}_count'] + delta
+              for status, delta in deltas.items() if delta}
+    if values:
+        db.session.execute(table.update().where(table.c.id == job_id).values(values))
+
+
+def set_application_statuses(job_id, status, ids=None, from_statuses=APPLICATION_STATUSES):
+    """Переводит отклики на вакансию в status: отмеченные (ids) или все
+    с прежним статусом из from_statuses. По одному UPDATE на прежний статус —
+    его rowcount и есть сдвиг счётчиков, без чтения строк. До commit;
+    возвращает число изменённых откликов."""
+    changed = 0
+    for old_status in from_statuses:
+        if old_status == status:
+            continue
+        stmt = Application.__table__.update() \
+            .where(Application.job_id == job_id, Application.status == old_status)
+        if ids is not None:
+            stmt = stmt.where(Application.id.in_(ids))
+        count = db.session.execute(stmt.values(status=status)).rowcount
+        if count:
+            bump_job_counts(job_id, {old_status: -count, status: count})
+            changed += count
+    return changed
+
+
+def job_counter_sources():
+    """Счётчики откликов вакансий, посчитанные по application."""
+    return {
+        getattr(Job, f'{status}_count'): select(func.count(Application.id))
+            .where(Application.job_id == Job.id, Application.status == status)
+            .scalar_subquery()
+        for status in APPLICATION_STATUSES
+    }
+
+
+def recount_job_counters():
+    """Пересчитывает счётчики откликов всех вакансий одним UPDATE."""
+    db.session.execute(Job.__table__.update().values(
+        {column.name: source for column, source in job_counter_sources().items()}))
+    db.session.commit()
+
+
+def find_job_counter_mismatches():
+    """Вакансии, у которых счётчики откликов разошлись с application."""
+    sources = job_counter_sources()
+    columns = [Job.id]
+    for column, source in sources.items():
+        columns += [column, source]
+    query = select(*columns).where(db.or_(*[c != s for c, s in sources.items()]))
+    return db.session.execute(query).all()
+
+
+def user_counter_sources():
+    """Значения счётчиков, посчитанные по исходным таблицам (вместе с архивом)."""
+    return {
+        User.jobs_count: select(func.count(Job.id))
+            .where(Job.employer_id == User.id).scalar_subquery()
+            + select(func.count(JobArchive.id))
+            .where(JobArchive.employer_id == User.id).scalar_subquery(),
+        User.applications_count: select(func.count(Application.id))
+            .where(Application.worker_id == User.id).scalar_subquery()
+            + select(func.count(ApplicationArchive.id))
+            .where(ApplicationArchive.worker_id == User.id).scalar_subquery(),
+        User.responses_count: select(func.count(Application.id))
+            .join(Job, Application.job_id == Job.id)
+            .where(Job.employer_id == User.id).scalar_subquery()
+            + select(func.count(ApplicationArchive.id))
+            .join(JobArchive, ApplicationArchive.job_id == JobArchive.id)
+            .where(JobArchive.employer_id == User.id).scalar_subquery(),
+    }
+
+
+def recount_user_counters():
+    """Пересчитывает счётчики всех пользователей одним UPDATE."""
+    db.session.execute(update(User).values(user_counter_sources()))
+    db.session.commit()
+
+
+def find_counter_mismatches():
+    """Пользователи, у которых счётчики разошлись с исходными таблицами."""
+    sources = user_counter_sources()
+    columns = [User.id]
+    for column, source in sources.items():
+        columns += [column, source]
+    query = select(*columns).where(db.or_(*[c != s for c, s in sources.items()]))
+    return db.session.execute(query).all()
+
+
 def init_db():
-    db.create_all()
+    # схема и индексы — через миграции (migrations.py)
+    for version, description in migrations.upgrade(db):
+        print(f'Миграция {version}: {description}')
+    job_search.create_index()
     # создаём модератора по умолчанию
     if not User.query.filter_by(email='admin@tj.local').first():
         admin = User(
             name='Модератор',
             email='admin@tj.local',
-            password_hash=generate_password_hash('admin'),
+            password_hash=hasher.hash('admin'),
             role='moderator'
         )
         db.session.add(admin)
         db.session.commit()
 
 
+@bp.cli.command('migrate')
+def migrate():
+    """Применяет недостающие миграции схемы."""
+    init_db()
+    for version, description, applied in migrations.status(db):
+        print(f'{version:>3} {"+" if applied else "-"} {description}')
+
+
+def explain_view_queries():
+    """План выполнения основных запросов страниц (только sqlite).
+
+    Возвращает [(страница, план, ok)], где ok=False, если таблица читается
+    полным сканированием без индекса.
+    """
+    checks = {
+        'index: последние вакансии': latest_jobs_query(),
+        'index: число вакансий': approved_jobs_query().with_entities(func.count()),
+        'index: число соискателей': User.query.filter_by(role='worker')
+                                          .with_entities(func.count()),
+        'vacancies': approved_jobs_query()
+            .order_by(Job.created_at.desc(), Job.id.desc()).limit(31),
+        'vacancies: следующая страница': approved_jobs_query()
+            .filter(db.tuple_(Job.created_at, Job.id) < (datetime.datetime.utcnow(), 0))
+            .order_by(Job.created_at.desc(), Job.id.desc()).limit(31),
+        'vacancies: фильтр по городу':
+            apply_job_filters(approved_jobs_query(), MultiDict({'city': 'Казань'}))
+            .order_by(Job.created_at.desc(), Job.id.desc()).limit(31),
+        'vacancies: фильтр по оплате':
+            apply_job_filters(approved_jobs_query(), MultiDict({'min_wage': '1500'}))
+            .order_by(Job.created_at.desc(), Job.id.desc()).limit(31),
+        'vacancy_detail': Job.query.options(joinedload(Job.employer)).filter_by(id=1),
+        'manage: работодатель': employer_jobs_query(1),
+        'manage: модератор': pending_jobs_query(),
+        'manage: отклики на вакансию': job_applicants_query(1).limit(51),
+        'manage: отклики по статусу': job_applicants_query(1, 'applied').limit(51),
+        'my_applications': worker_applications_query(1)
+            .options(joinedload(Application.job)),
+    }
+    result = []
+    for name, query in checks.items():
+        compiled = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+        rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {compiled}')).all()
+        plan = [row[-1] for row in rows]
+        ok = not any(step.startswith('SCAN') and 'INDEX' not in step for step in plan)
+        result.append((name, plan, ok))
+    return result
+
+
+@bp.cli.command('check-indexes')
+def check_indexes():
+    """Проверяет, что запросы страниц используют индексы."""
+    if db.engine.dialect.name != 'sqlite':
+        print('Проверка поддерживается только для sqlite')
+        return
+    failed = 0
+    for name, plan, ok in explain_view_queries():
+        print(f'{"ok " if ok else "FAIL"} {name}')
+        for step in plan:
+            print(f'      {step}')
+        failed += not ok
+    if failed:
+        sys.exit(1)
+
+
+@bp.cli.command('recount-users')
+def recount_users():
+    """Пересчитывает счётчики пользователей и откликов по вакансиям."""
+    recount_user_counters()
+    recount_job_counters()
+    print('Счётчики пересчитаны')
+
+
+@bp.cli.command('check-counters')
+def check_counters():
+    """Проверяет, что счётчики пользователей и вакансий совпадают с данными."""
+    mismatches = find_counter_mismatches()
+    for row in mismatches:
+        print(f'user {row[0]}: jobs {row[1]}≠{row[2]}, '
+              f'applications {row[3]}≠{row[4]}, responses {row[5]}≠{row[6]}')
+    job_mismatches = find_job_counter_mismatches()
+    for row in job_mismatches:
+        print(f'job {row[0]}: applied {row[1]}≠{row[2]}, '
+              f'accepted {row[3]}≠{row[4]}, rejected {row[5]}≠{row[6]}')
+    if mismatches or job_mismatches:
+        print(f'Расхождений: {len(mismatches) + len(job_mismatches)}. '
+              f'Исправить: flask recount-users')
+        sys.exit(1)
+    print('Счётчики в порядке')
+
+
+@bp.cli.command('auto-approve')
+def auto_approve_command():
+    """Одобряет ожидающие вакансии проверенных работодателей (для cron)."""
+    print(f'Автоматически одобрено вакансий: {len(auto_approve_pending())}')
+    task_queue.run_pending()
+
+
+@bp.cli.command('import-jobs')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--employer', 'email', required=True, help='email работодателя')
+@click.option('--format', 'fmt', type=click.Choice(importer.FORMATS),
+              help='по умолчанию — по расширению файла')
+@click.option('--approve', is_flag=True, help='публиковать сразу, без модерации')
+def import_jobs_command(path, email, fmt, approve):
+    """Импортирует вакансии из CSV или JSON Lines."""
+    employer = User.query.filter_by(email=email, role='employer').first()
+    if employer is None:
+        raise click.ClickException(f'Нет работодателя {email}')
+    fmt = fmt or importer.detect_format(path)
+    if fmt is None:
+        raise click.ClickException('Не удалось определить формат, укажите --format')
+    with open(path, 'rb') as f:
+        created, errors = import_jobs(employer.id, importer.read_rows(f, fmt),
+                                      status='approved' if approve else 'pending')
+    task_queue.run_pending()
+    for line_no, message in errors:
+        print(f'строка {line_no}: {message}')
+    print(f'Создано вакансий: {created}, ошибок: {len(errors)}')
+
+
+@bp.cli.command('sweep-jobs')
+@click.option('--no-archive', is_flag=True, help='только пометить истёкшие')
+def sweep_jobs(no_archive):
+    """Снимает вакансии с истёкшим сроком и архивирует старые (для cron)."""
+    print(f'Истекло вакансий: {expire_jobs()}')
+    if not no_archive:
+        print(f'Перенесено в архив: {archive_jobs()}')
+    task_queue.run_pending()
+
+
+@bp.cli.command('recommend')
+def recommend_command():
+    """Пересчитывает рекомендации вакансий для всех соискателей (для cron)."""
+    if not recommend.available():
+        raise click.ClickException('Для рекомендаций нужен NumPy (pip install numpy)')
+    started = datetime.datetime.utcnow()
+    count = rebuild_recommendations(started)
+    seconds = (datetime.datetime.utcnow() - started).total_seconds()
+    print(f'Рекомендации пересчитаны для {count} соискателей за {seconds:.1f} с')
+
+
+@bp.cli.command('run-tasks')
+@click.option('--once', is_flag=True, help='выполнить готовые задачи и выйти')
+@click.option('--retry-dead', is_flag=True, help='вернуть в очередь упавшие задачи')
+def run_tasks(once, retry_dead):
+    """Разбирает очередь фоновых задач в этом процессе."""
+    if retry_dead:
+        print(f'Возвращено в очередь: {task_queue.retry_dead()}')
+    if once:
+        print(f'Выполнено задач: {task_queue.run_pending()}')
+    else:
+        task_queue.work()
+    print('В очереди: {queued}, не выполнено: {dead}'.format(**task_queue.stats()))
+
+
+@bp.cli.command('rebuild-facets')
+def rebuild_facets_command():
+    """Пересчитывает счётчики фильтров по городам и специализациям."""
+    rebuild_facets()
+    print(f'Значений в фильтрах: {JobFacet.query.count()}')
+
+
+@bp.cli.command('reindex-search')
+def reindex_search():
+    """Полностью перестраивает поисковый индекс вакансий."""
+    if not job_search.create_index():
+        print('FTS5 недоступен, используется поиск через ILIKE')
+        return
+    print(f'Проиндексировано вакансий: {job_search.rebuild()}')
+
+
+@bp.cli.command('replica-copy')
+@click.argument('path')
+def replica_copy(path):
+    """Снимок основной базы sqlite в PATH — реплика для стенда и проверок
+    (DATABASE_REPLICA_URLS=sqlite:///PATH); повторный запуск догоняет её."""
+    if db.engine.url.get_backend_name() != 'sqlite':
+        raise click.ClickException('Только для sqlite; у PostgreSQL — потоковая реплика')
+    replica_router.beat(time.time())
+    copy_sqlite(db.engine.url.database, path)
+    print(f'Основная база скопирована в {path}')
+
+
+@bp.cli.command('replica-status')
+def replica_status():
+    """Отставание каждой реплики от основной базы."""
+    if not replica_router.keys:
+        print('Реплики не настроены (DATABASE_REPLICA_URLS)')
+        return
+    for key, lag in replica_router.check().items():
+        state = 'нет ответа' if lag is None else f'отставание {lag:.1f} с'
+        ok = lag is not None and lag <= replica_router.max_lag
+        print(f'{key:<10} {db.engines[key].url.render_as_string()}: {state}'
+              f'{"" if ok else " — чтение с основной базы"}')
+
+
+def create_app(config=None):
+    """Собирает приложение: настройки из config.Config (окружение, .env),
+    поверх них — словарь config (тесты, скрипты); расширения и сервисы
+    модуля, маршруты и команды CLI из bp. Схему не трогает: миграции —
+    flask migrate (один раз до запуска воркеров, хуки в gunicorn.conf.py).
+
+    Сервисы модуля (кэши, очередь задач, пул хэширования) — одни на процесс:
+    их настраивает последнее собранное приложение."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+        if 'SQLALCHEMY_DATABASE_URI' in config and 'SQLALCHEMY_ENGINE_OPTIONS' not in config:
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(config['SQLALCHEMY_DATABASE_URI'])
+
+    db.init_app(app)
+    login_manager.init_app(app)
+    metrics.init_app(app)
+    for service in (hasher, auth_limiter, task_queue, replica_router,
+                    stats_cache, page_cache, identity_cache, avatar_cache):
+        service.init_app(app)
+    app.register_blueprint(bp)
+
+    hops = app.config['PROXY_FIX_X_FOR']
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: reset_connections_after_fork(app))
+    return app
+
+
+def check_production_config(app):
+    """Для боевого WSGI-сервера (wsgi.py): с ключом по умолчанию не запускаемся."""
+    if app.config['SECRET_KEY'] == DEV_SECRET_KEY:
+        raise RuntimeError('Задайте SECRET_KEY: ключ по умолчанию — только для разработки')
+    return app
+
+
 if __name__ == '__main__':
-    with app.app_context():
-        init_db()
+    # сервер разработки: отладчик и перезапуск при изменении кода.
+    # В продакшене — python serve.py (gunicorn, см. gunicorn.conf.py)
+    app = create_app()
+    if not os.environ.get('WERKZEUG_RUN_MAIN'):
+        # миграции — один раз в наблюдающем процессе, не при каждом перезапуске
+        with app.app_context():
+            init_db()
     app.run(debug=True)
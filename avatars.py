@@ -0,0 +1,195 @@
+# avatars.py
+# Аватары без внешних сервисов: инициалы на цветном круге (SVG, или PNG
+# через Pillow) и уменьшенные копии загруженных картинок — всё через
+# дисковый кэш с адресацией по содержимому и вытеснением давно не
+# читавшихся файлов (LRU по времени изменения).
+import hashlib
+import html
+import io
+import os
+import tempfile
+import threading
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, ImageOps
+except ImportError:
+    Image = None
+
+# меняется при любом изменении внешнего вида — старые записи кэша
+# перестают читаться и со временем вытесняются
+STYLE_VERSION = '1'
+COLORS = ('#4CFA00', '#0EA5E9', '#F97316', '#A855F7', '#EC4899', '#14B8A6',
+          '#EAB308', '#6366F1')
+UPLOAD_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
+# загруженные картинки с большим числом пикселей не принимаем
+MAX_UPLOAD_PIXELS = 4096 * 4096
+
+
+def initials(name):
+    words = [w for w in (name or '').replace('-', ' ').split() if w[0].isalnum()]
+    if not words:
+        return 'U'
+    return ''.join(w[0] for w in words[:2]).upper()
+
+
+def color_for(name):
+    digest = hashlib.md5((name or '').encode('utf-8')).digest()
+    return COLORS[digest[0] % len(COLORS)]
+
+
+def render_svg(name, size):
+    letters = html.escape(initials(name))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 100 100"><circle cx="50" cy="50" r="50" fill="{color_for(name)}"/>'
+        f'<text x="50" y="50" dy=".35em" text-anchor="middle" fill="#fff" '
+        f'font-family="Inter,Arial,sans-serif" font-size="40" font-weight="600">'
+        f'{letters}</text></svg>'
+    ).encode('utf-8')
+
+
+def render_png(name, size):
+    """PNG с инициалами; None, если Pillow не установлен."""
+    if Image is None:
+        return None
+    scale = 4  # рисуем крупнее и уменьшаем — сглаженные края круга
+    big = size * scale
+    img = Image.new('RGBA', (big, big), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((0, 0, big - 1, big - 1), fill=color_for(name))
+    try:
+        font = ImageFont.truetype('DejaVuSans-Bold.ttf', int(big * 0.4))
+    except OSError:
+        font = ImageFont.load_default()
+    draw.text((big / 2, big / 2), initials(name), fill='#fff', font=font, anchor='mm')
+    img = img.resize((size, size), Image.LANCZOS)
+    out = io.BytesIO()
+    img.save(out, 'PNG', optimize=True)
+    return out.getvalue()
+
+
+def thumbnail(path, size):
+    """Квадратная уменьшенная копия загруженной картинки в PNG; None, если
+    Pillow не установлен (фото загружено, пока он был)."""
+    if Image is None:
+        return None
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img).convert('RGBA')
+        img = ImageOps.fit(img, (size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, 'PNG', optimize=True)
+        return out.getvalue()
+
+
+def save_upload(stream, directory, max_bytes):
+    """Проверяет загруженную картинку и кладёт её в directory под именем
+    <sha256>.<ext>. Возвращает имя файла; ValueError — не картинка."""
+    if Image is None:
+        raise ValueError('Загрузка аватаров недоступна (не установлен Pillow)')
+    data = stream.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ValueError(f'Файл больше {max_bytes // (1024 * 1024)} МБ')
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width * img.height > MAX_UPLOAD_PIXELS:
+                raise ValueError('Слишком большая картинка')
+            img.verify()
+            ext = '.' + (img.format or '').lower().replace('jpeg', 'jpg')
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValueError('Файл не похож на картинку') from None
+    if ext not in UPLOAD_EXTENSIONS:
+        raise ValueError('Поддерживаются PNG, JPEG, WebP и GIF')
+    filename = hashlib.sha256(data).hexdigest() + ext
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, filename)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+    return filename
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class DiskCache:
+    """Готовые картинки на диске. Имя файла — хэш ключа (описания того, из
+    чего картинка получена), так что одинаковые аватары хранятся один раз,
+    а изменённые получают новое имя. Чтение обновляет mtime; при
+    превышении max_bytes удаляются файлы с самым старым mtime."""
+
+    def __init__(self, directory=None, max_bytes=0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None  # примерный занятый объём, считается при первой записи
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.directory = app.config['AVATAR_CACHE_DIR']
+        self.max_bytes = app.config['AVATAR_CACHE_MAX_BYTES']
+        self._size = None
+
+    @staticmethod
+    def digest(*parts):
+        return hashlib.sha256('\0'.join(map(str, parts)).encode('utf-8')).hexdigest()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, digest):
+        path = self._path(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, digest, data):
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, data)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+        return path
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.startswith('.tmp-'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._files())
+
+    def _evict(self):
+        # до 90% предела, чтобы не чистить на каждой записи
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
@@ -0,0 +1,198 @@
+# bench/apply_race.py
+# Одновременные отклики: сотни соискателей жмут «Откликнуться» в один момент,
+# каждый по несколько раз (двойной клик — с тем же ключом идемпотентности,
+# повтор — без ключа). Печатает задержки под нагрузкой и для контроля
+# сверяет строки и счётчики; сама гонка проверяется в tests/test_apply_race.py.
+#
+#   python bench/apply_race.py --workers 200 --repeats 3
+#   python bench/apply_race.py --api      # через POST /api/v1/vacancies/<id>/apply
+#
+# Приложение поднимается на временной sqlite-базе в многопоточном сервере
+# werkzeug, все запросы стартуют одновременно (threading.Barrier).
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+tmp = tempfile.mkdtemp(prefix='tj-apply-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'apply.db')
+os.environ['TASK_QUEUE_PATH'] = os.path.join(tmp, 'tasks.db')
+# сотни входов перед замером: дешёвый хэш, считать в потоке запроса
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from werkzeug.serving import ThreadedWSGIServer, make_server  # noqa: E402
+
+import app as tj  # noqa: E402
+
+app = tj.create_app()
+
+PASSWORD = 'secret'
+
+
+def seed(workers, jobs):
+    with app.app_context():
+        tj.init_db()
+        password_hash = tj.hasher.hash(PASSWORD)
+        tj.db.session.execute(insert(tj.User), [
+            dict(name='Компания', email='employer@bench.local', role='employer',
+                 password_hash=password_hash)
+        ] + [
+            dict(name=f'Соискатель {i}', email=f'worker{i}@bench.local', role='worker',
+                 password_hash=password_hash, phone=f'+7900{i:07d}')
+            for i in range(workers)
+        ])
+        employer_id = tj.db.session.scalar(
+            select(tj.User.id).where(tj.User.role == 'employer'))
+        tj.db.session.execute(insert(tj.Job), [
+            dict(employer_id=employer_id, title=f'Смена {i}', city='Москва',
+                 description='Описание', status='approved')
+            for i in range(jobs)
+        ])
+        tj.db.session.commit()
+        tj.recount_user_counters()
+        tj.recount_job_counters()
+        return employer_id, tj.db.session.scalars(select(tj.Job.id)).all()
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def client(base, email):
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect)
+    body = urllib.parse.urlencode({'email': email, 'password': PASSWORD}).encode()
+    try:
+        opener.open(base + '/login', body, timeout=60)
+    except urllib.error.HTTPError as e:
+        if e.code != 302:
+            raise
+    return opener
+
+
+def post(opener, url, body, headers):
+    req = urllib.request.Request(url, body, headers)
+    t0 = time.perf_counter()
+    try:
+        with opener.open(req, timeout=120) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    return status, (time.perf_counter() - t0) * 1000
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=200, help='соискателей')
+    parser.add_argument('--jobs', type=int, default=2, help='вакансий, на которые откликаются все')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='отправок одного отклика (первые две — с одним ключом)')
+    parser.add_argument('--api', action='store_true', help='через JSON API')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    # все входы идут с одного адреса — лимит попыток тут не нужен
+    app.config['AUTH_LIMIT_PER_IP'] = 10 ** 9
+    employer_id, job_ids = seed(args.workers, args.jobs)
+    # все соединения приходят разом — очередь accept() длиннее стандартной
+    ThreadedWSGIServer.request_queue_size = 1024
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+
+    t0 = time.perf_counter()
+    openers = [client(base, f'worker{i}@bench.local') for i in range(args.workers)]
+    print(f'Вход {args.workers} соискателей: {time.perf_counter() - t0:.1f} с')
+
+    requests = []
+    for opener in openers:
+        for job_id in job_ids:
+            key = secrets.token_urlsafe(16)
+            for n in range(args.repeats):
+                # двойной клик — тот же ключ; дальше — повтор без ключа
+                request_key = key if n < 2 else None
+                if args.api:
+                    headers = {'Content-Type': 'application/json'}
+                    if request_key:
+                        headers['Idempotency-Key'] = request_key
+                    requests.append((opener, f'{base}/api/v1/vacancies/{job_id}/apply',
+                                     json.dumps({'note': 'Готов'}).encode(), headers))
+                else:
+                    form = {'note': 'Готов'}
+                    if request_key:
+                        form['idempotency_key'] = request_key
+                    requests.append((opener, f'{base}/vacancies/{job_id}/apply',
+                                     urllib.parse.urlencode(form).encode(), {}))
+
+    barrier = threading.Barrier(len(requests))
+    results = []
+    lock = threading.Lock()
+
+    def fire(item):
+        barrier.wait()
+        result = post(*item)
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=fire, args=(item,)) for item in requests]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    server.shutdown()
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = [ms for _, ms in results]
+    print(f'Запросов: {len(results)} за {wall:.2f} с; ответы: '
+          + ', '.join(f'{k}: {v}' for k, v in sorted(statuses.items())))
+    print(f'задержка, мс: p50 {percentile(latencies, 0.5):.1f}  '
+          f'p95 {percentile(latencies, 0.95):.1f}  p99 {percentile(latencies, 0.99):.1f}  '
+          f'max {max(latencies):.1f}')
+
+    with app.app_context():
+        rows = tj.db.session.scalar(select(func.count(tj.Application.id)))
+        duplicates = tj.db.session.execute(
+            select(tj.Application.job_id, tj.Application.worker_id)
+            .group_by(tj.Application.job_id, tj.Application.worker_id)
+            .having(func.count() > 1)).all()
+        responses = tj.db.session.get(tj.User, employer_id).responses_count
+        mismatches = tj.find_counter_mismatches() + tj.find_job_counter_mismatches()
+    expected = args.workers * args.jobs
+    ok = (rows == expected and not duplicates and responses == expected and not mismatches
+          and not any(status >= 500 for status in statuses))
+    print(f'Откликов: {rows} (ожидалось {expected}), дублей: {len(duplicates)}, '
+          f'responses_count: {responses}, расхождений счётчиков: {len(mismatches)}')
+    for row in mismatches:
+        print('  расхождение:', tuple(row))
+    print('OK' if ok else 'ОШИБКА')
+    tj.hasher.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
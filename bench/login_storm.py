@@ -0,0 +1,125 @@
+# bench/login_storm.py
+# Задержка обычной страницы (/vacancies) во время шквала попыток входа.
+#
+#   python bench/login_storm.py --threads 32 --seconds 10
+#
+# Поднимает приложение на временной sqlite-базе в многопоточном сервере
+# werkzeug и прогоняет режимы: без нагрузки, хэширование в потоке запроса,
+# хэширование в пуле процессов, пул + лимиты попыток.
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(
+    tempfile.mkdtemp(prefix='tj-storm-'), 'storm.db')
+
+from werkzeug.serving import make_server  # noqa: E402
+
+import app as tj  # noqa: E402
+
+app = tj.create_app()
+
+
+def seed():
+    with app.app_context():
+        tj.init_db()
+        worker = tj.User(name='Storm', email='storm@tj.local', role='worker',
+                         password_hash=tj.hasher.hash('secret'))
+        tj.db.session.add(worker)
+        tj.db.session.flush()
+        for i in range(30):
+            tj.db.session.add(tj.Job(employer_id=worker.id, title=f'Смена {i}',
+                                     city='Москва', description='Описание ' * 20,
+                                     status='approved'))
+        tj.db.session.commit()
+
+
+def request(url, data=None):
+    t0 = time.perf_counter()
+    body = urllib.parse.urlencode(data).encode() if data else None
+    try:
+        with urllib.request.urlopen(url, body, timeout=60) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, (time.perf_counter() - t0) * 1000
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0
+
+
+def run_mode(base, name, threads, seconds):
+    stop = threading.Event()
+    statuses = {}
+    lock = threading.Lock()
+
+    def storm():
+        while not stop.is_set():
+            status, _ = request(base + '/login',
+                                {'email': 'storm@tj.local', 'password': 'wrong'})
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+
+    workers = [threading.Thread(target=storm, daemon=True) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        latencies.append(request(base + '/vacancies')[1])
+        time.sleep(0.05)
+    stop.set()
+    for w in workers:
+        w.join()
+    logins = ', '.join(f'{k}: {v}' for k, v in sorted(statuses.items())) or '-'
+    print(f'{name:<34}{percentile(latencies, 0.5):>9.1f}{percentile(latencies, 0.95):>9.1f}'
+          f'{percentile(latencies, 0.99):>9.1f}   {logins}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--pool', type=int, default=1, help='процессов в пуле хэширования')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    seed()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    unlimited = 10 ** 9
+
+    print(f'{"режим":<34}{"p50, мс":>9}{"p95":>9}{"p99":>9}   ответы /login')
+    modes = [
+        ('без нагрузки', 0, 0, unlimited),
+        ('хэш в потоке запроса', args.threads, 0, unlimited),
+        (f'пул из {args.pool} процессов', args.threads, args.pool, unlimited),
+        (f'пул из {args.pool} + лимиты попыток', args.threads, args.pool, None),
+    ]
+    for name, threads, pool, limit in modes:
+        tj.hasher.shutdown()
+        tj.hasher.workers = pool
+        tj.auth_limiter.reset()
+        app.config['AUTH_LIMIT_PER_IP'] = limit or tj.Config.AUTH_LIMIT_PER_IP
+        app.config['AUTH_LIMIT_PER_EMAIL'] = limit or tj.Config.AUTH_LIMIT_PER_EMAIL
+        run_mode(base, name, threads, args.seconds)
+
+    server.shutdown()
+    tj.hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
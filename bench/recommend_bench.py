@@ -0,0 +1,219 @@
+# bench/recommend_bench.py
+# Рекомендации на большом объёме: полный пересчёт (загрузка, расчёт, запись),
+# добавление только что опубликованных вакансий и выдача списка на странице.
+#
+#   python bench/recommend_bench.py                          # 100k x 100k
+#   python bench/recommend_bench.py --workers 10000 --jobs 10000
+#   python bench/recommend_bench.py --db /tmp/tj-rec.db      # переиспользовать засев
+#
+# Данные синтетические: у соискателя «домашний» город и одна-две любимые
+# специализации, большая часть откликов — туда, остальные случайные.
+import argparse
+import datetime
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+CITIES = ['Москва', 'Санкт-Петербург', 'Казань', 'Новосибирск', 'Екатеринбург',
+          'Нижний Новгород', 'Самара', 'Омск', 'Ростов-на-Дону', 'Уфа', 'Пермь',
+          'Воронеж', 'Волгоград', 'Краснодар', 'Тюмень', 'Иркутск', 'Томск', 'Тула']
+SPECS = ['отделка', 'электромонтаж', 'сантехника', 'кладка', 'кровля', 'сварка',
+         'демонтаж', 'благоустройство', 'фасадные работы', 'погрузка', 'уборка',
+         'склад', 'курьер', 'общепит', 'монтаж', 'охрана']
+EDUCATION = ['Сварщик 4 разряда', 'электромонтаж, допуск III группы', 'кровля и фасадные работы',
+             'Колледж, сантехника', '', 'Опыт на складе и погрузке', 'отделка квартир']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=100000, help='соискателей')
+    parser.add_argument('--jobs', type=int, default=100000, help='опубликованных вакансий')
+    parser.add_argument('--applications', type=int, default=500000)
+    parser.add_argument('--new-jobs', type=int, default=20,
+                        help='вакансий, публикуемых после пересчёта')
+    parser.add_argument('--requests', type=int, default=2000, help='выдач списка для замера')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='файл sqlite (по умолчанию — временный)')
+    return parser.parse_args()
+
+
+args = parse_args()
+tmp = tempfile.mkdtemp(prefix='tj-rec-')
+db_path = args.db or os.path.join(tmp, 'rec.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(db_path)
+os.environ['TASK_QUEUE_PATH'] = os.path.join(tmp, 'tasks.db')
+os.environ['TASK_WORKERS'] = '0'
+os.environ['RECOMMEND_MODEL_PATH'] = os.path.join(tmp, 'recommend.npz')
+
+from sqlalchemy import event, insert, select  # noqa: E402
+
+import app as tj  # noqa: E402
+import recommend  # noqa: E402
+
+app = tj.create_app()
+
+SCALE = {key: getattr(args, key) for key in ('workers', 'jobs', 'applications', 'seed')}
+
+
+def seed(batch=10000):
+    rnd = random.Random(args.seed)
+    now = datetime.datetime.utcnow()
+    users = [dict(name='Компания', email='employer@bench.local', role='employer',
+                  password_hash='-')]
+    for i in range(args.workers):
+        users.append(dict(name=f'Соискатель {i}', email=f'worker{i}@bench.local',
+                          role='worker', password_hash='-', education=rnd.choice(EDUCATION),
+                          exp_years=rnd.randint(0, 15), rating=round(rnd.random() * 5, 1)))
+    for start in range(0, len(users), batch):
+        tj.db.session.execute(insert(tj.User), users[start:start + batch])
+    employer_id = tj.db.session.scalar(select(tj.User.id).where(tj.User.role == 'employer'))
+    worker_ids = tj.db.session.scalars(
+        select(tj.User.id).where(tj.User.role == 'worker').order_by(tj.User.id)).all()
+
+    rows = []
+    for i in range(args.jobs):
+        pay_type = rnd.choice(['shift', 'hourly'])
+        rows.append(dict(
+            employer_id=employer_id, title=f'Смена {i}', city=rnd.choice(CITIES),
+            specialization=rnd.choice(SPECS), status='approved', pay_type=pay_type,
+            wage=rnd.randrange(1500, 6000, 100) if pay_type == 'shift' else rnd.randrange(200, 800, 10),
+            created_at=now - datetime.timedelta(minutes=rnd.randint(0, 60 * 24 * 60)),
+        ))
+        if len(rows) >= batch:
+            tj.db.session.execute(insert(tj.Job), rows)
+            rows = []
+    if rows:
+        tj.db.session.execute(insert(tj.Job), rows)
+    jobs = tj.db.session.execute(select(tj.Job.id, tj.Job.city, tj.Job.specialization)).all()
+    by_key = {}
+    for job in jobs:
+        by_key.setdefault((job.city, job.specialization), []).append(job.id)
+    job_ids = [job.id for job in jobs]
+
+    per_worker = args.applications // max(len(worker_ids), 1)
+    rows = []
+    for worker_id in worker_ids:
+        city = rnd.choice(CITIES)
+        specs = rnd.sample(SPECS, 2)
+        chosen = set()
+        for _ in range(per_worker):
+            if rnd.random() < 0.7:
+                chosen.add(rnd.choice(by_key.get((city, rnd.choice(specs)), job_ids)))
+            else:
+                chosen.add(rnd.choice(job_ids))
+        rows.extend(dict(job_id=job_id, worker_id=worker_id, status='applied', created_at=now)
+                    for job_id in chosen)
+        if len(rows) >= batch:
+            tj.db.session.execute(insert(tj.Application), rows)
+            rows = []
+    if rows:
+        tj.db.session.execute(insert(tj.Application), rows)
+    tj.db.session.commit()
+    return employer_id
+
+
+def prepare():
+    meta_path = db_path + '.json'
+    with app.app_context():
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                if json.load(f) == SCALE:
+                    print(f'База {db_path}: данные уже засеяны')
+                    tj.init_db()
+                    return tj.db.session.scalar(
+                        select(tj.User.id).where(tj.User.role == 'employer'))
+        for path in (db_path, db_path + '-wal', db_path + '-shm', meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        t0 = time.perf_counter()
+        tj.init_db()
+        employer_id = seed()
+        print(f'Засев: {args.workers} соискателей, {args.jobs} вакансий, '
+              f'{args.applications} откликов за {time.perf_counter() - t0:.1f} с')
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(SCALE, f)
+    return employer_id
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0
+
+
+def main():
+    if not recommend.available():
+        sys.exit('Нужен NumPy: pip install numpy')
+    # засев и пересчёт — заведомо долгие запросы, в журнал медленных не пишем
+    logging.getLogger('tj.sql.slow').setLevel(logging.ERROR)
+    employer_id = prepare()
+    with app.app_context():
+        now = datetime.datetime.utcnow()
+        timings = {}
+        t0 = time.perf_counter()
+        data = tj.load_recommendation_data()
+        timings['загрузка'] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        model, rows = tj.compute_recommendations(*data, now)
+        timings['расчёт'] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        tj.db.session.execute(tj.Recommendation.__table__.delete())
+        tj.save_recommendations(rows)
+        tj.db.session.commit()
+        model.save(app.config['RECOMMEND_MODEL_PATH'])
+        timings['запись'] = time.perf_counter() - t0
+        print(f'Полный пересчёт: {len(model)} соискателей x {len(data[0])} вакансий, '
+              f'{len(data[2])} откликов в истории')
+        for name, seconds in timings.items():
+            print(f'  {name:<9} {seconds:7.2f} с')
+        print(f'  всего     {sum(timings.values()):7.2f} с; '
+              f'пик памяти {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} МБ')
+        del data, rows
+
+        # публикация новых вакансий: задача recommend_new_jobs
+        rnd = random.Random(args.seed + 1)
+        new = [tj.Job(employer_id=employer_id, title=f'Новая {i}', city=rnd.choice(CITIES),
+                      specialization=rnd.choice(SPECS), wage=rnd.randrange(3000, 8000, 100),
+                      pay_type='shift', status='pending') for i in range(args.new_jobs)]
+        tj.db.session.add_all(new)
+        tj.db.session.commit()
+        pending = tj.db.session.execute(select(tj.Job.id, tj.Job.status, tj.Job.version)
+                                        .where(tj.Job.id.in_([j.id for j in new]))).all()
+        tj.update_job_statuses(pending, 'approved')
+        tj.db.session.commit()
+        tj.reindex_jobs([j.id for j in new])  # чтобы в замер попала только своя задача
+        t0 = time.perf_counter()
+        tj.recommend_new_jobs([j.id for j in new])
+        print(f'Публикация {args.new_jobs} вакансий: списки обновлены за '
+              f'{time.perf_counter() - t0:.2f} с')
+        tj.task_queue.run_pending()
+
+        # выдача: одна строка по ключу и вакансии по id
+        worker_ids = tj.db.session.scalars(
+            select(tj.User.id).where(tj.User.role == 'worker')).all()
+        queries = []
+        event.listen(tj.db.engine, 'before_cursor_execute',
+                     lambda *a: queries.append(1))
+        latencies, shown = [], 0
+        for _ in range(args.requests):
+            worker_id = rnd.choice(worker_ids)
+            t0 = time.perf_counter()
+            shown += len(tj.recommended_jobs(worker_id, app.config['RECOMMEND_SHOW']))
+            latencies.append((time.perf_counter() - t0) * 1000)
+            tj.db.session.remove()
+        print(f'Выдача ({args.requests} раз): p50 {percentile(latencies, 0.5):.2f} мс, '
+              f'p95 {percentile(latencies, 0.95):.2f} мс, p99 {percentile(latencies, 0.99):.2f} мс; '
+              f'SQL на выдачу {len(queries) / args.requests:.1f}, '
+              f'вакансий в среднем {shown / args.requests:.1f}')
+    tj.hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,495 @@
+# bench/routes_bench.py
+# Нагрузочный прогон основных страниц на синтетических данных:
+# задержка p50/p95/p99, пропускная способность и SQL-запросов на запрос.
+#
+#   python bench/routes_bench.py                                # быстрый прогон
+#   python bench/routes_bench.py --jobs 100000 --applications 1000000 \
+#       --workers 50000 --employers 5000 --db /tmp/tj-100k.db   # большой объём
+#   python bench/routes_bench.py --server --concurrency 8       # через WSGI-сервер
+#   python bench/routes_bench.py --db X --url http://127.0.0.1:8000  # уже запущенный
+#   python bench/routes_bench.py --routes index vacancies_search
+#
+# По умолчанию запросы идут через test_client (без сети, по одному);
+# с --server — в многопоточный сервер werkzeug на localhost; с --url — в
+# сервер, запущенный отдельно на той же --db (сравнение серверов —
+# bench/serve_bench.py). SQL/req в режиме --url не считается.
+#
+# Результат пишется в bench/results/routes-<время>-<коммит>.json и
+# сравнивается с последним прошлым прогоном на том же объёме данных
+# (или с файлом из --compare). --fail-on-regression — код выхода 1, если
+# p95 или число запросов выросли больше чем на --threshold процентов.
+#
+# Засеянную базу можно переиспользовать: --db путь; если объём данных
+# совпадает с прошлым засевом, база не пересоздаётся.
+import argparse
+import datetime
+import glob
+import http.cookiejar
+import itertools
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(ROOT, 'bench', 'results')
+sys.path.insert(0, ROOT)
+
+TITLES = ['Разнорабочий', 'Маляр-штукатур', 'Укладчик плитки', 'Электрик', 'Сантехник',
+          'Каменщик', 'Плотник', 'Кровельщик', 'Сварщик', 'Монтажник гипсокартона',
+          'Бетонщик', 'Грузчик', 'Отделочник', 'Фасадчик', 'Арматурщик']
+CITIES = ['Москва', 'Санкт-Петербург', 'Казань', 'Новосибирск', 'Екатеринбург',
+          'Нижний Новгород', 'Самара', 'Омск', 'Ростов-на-Дону', 'Уфа']
+SPECS = ['отделка', 'электромонтаж', 'сантехника', 'кладка', 'кровля', 'сварка',
+         'демонтаж', 'благоустройство', 'фасадные работы', 'погрузка']
+WORDS = ('требуется опытный специалист работа на строительном объекте ответственность '
+         'пунктуальность оплата ежедневно инструмент предоставляется питание проживание '
+         'возможна подработка выходные новостройка коттедж ремонт квартиры бригада '
+         'график сменный срочно без опыта обучение спецодежда').split()
+QUERIES = ['плиточник', 'Казань', 'сварщик кровля', 'электромонтаж Москва', 'проживание',
+           'штукатур', 'грузчик срочно', 'сантехника']
+
+PASSWORD = 'secret'
+SCALE_KEYS = ('jobs', 'applications', 'workers', 'employers', 'seed')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, default=10000)
+    parser.add_argument('--applications', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=5000, help='соискателей')
+    parser.add_argument('--employers', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42, help='зерно генератора данных')
+    parser.add_argument('--db', help='файл sqlite (по умолчанию — временный)')
+    parser.add_argument('--requests', type=int, default=200, help='запросов на маршрут')
+    parser.add_argument('--warmup', type=int, default=10, help='прогревочных запросов')
+    parser.add_argument('--routes', nargs='+', help='только эти маршруты')
+    parser.add_argument('--server', action='store_true', help='через WSGI-сервер')
+    parser.add_argument('--url', help='адрес сервера, запущенного отдельно на той же --db')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='потоков на маршрут (только с --server и --url)')
+    parser.add_argument('--seed-only', action='store_true', help='только засеять базу')
+    parser.add_argument('--no-page-cache', action='store_true',
+                        help='выключить кэш страниц для анонимов')
+    parser.add_argument('--compare', help='файл прошлого прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=10,
+                        help='рост p95/запросов в процентах, считающийся регрессией')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--no-save', action='store_true', help='не сохранять результат')
+    parser.add_argument('--output', help='файл результата (по умолчанию — в bench/results/)')
+    args = parser.parse_args()
+    args.server = args.server or bool(args.url)
+    return args
+
+
+args = parse_args()
+db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='tj-routes-'), 'bench.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(db_path)
+# хэши паролей — в потоке запроса: пул процессов тут только мешает замерам
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+
+from sqlalchemy import insert, select  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+import app as tj  # noqa: E402
+
+app = tj.create_app()
+
+
+# ---------- данные ----------
+
+def scale_of(args):
+    return {key: getattr(args, key) for key in SCALE_KEYS}
+
+
+def seed(args, batch=10000):
+    rnd = random.Random(args.seed)
+    password_hash = tj.hasher.hash(PASSWORD)
+    now = datetime.datetime.utcnow()
+
+    users = [dict(name='Модератор', email='moderator@bench.local', role='moderator',
+                  password_hash=password_hash)]
+    for i in range(args.employers):
+        users.append(dict(name=f'Компания {i}', email=f'employer{i}@bench.local',
+                          role='employer', password_hash=password_hash))
+    for i in range(args.workers):
+        users.append(dict(name=f'Соискатель {i}', email=f'worker{i}@bench.local',
+                          role='worker', password_hash=password_hash,
+                          phone=f'+7900{i:07d}', exp_years=rnd.randint(0, 20)))
+    for start in range(0, len(users), batch):
+        tj.db.session.execute(insert(tj.User), users[start:start + batch])
+
+    employer_ids = tj.db.session.scalars(
+        select(tj.User.id).where(tj.User.role == 'employer').order_by(tj.User.id)).all()
+    worker_ids = tj.db.session.scalars(
+        select(tj.User.id).where(tj.User.role == 'worker').order_by(tj.User.id)).all()
+
+    rows = []
+    for i in range(args.jobs):
+        rows.append(dict(
+            employer_id=rnd.choice(employer_ids),
+            title=rnd.choice(TITLES),
+            city=rnd.choice(CITIES),
+            specialization=rnd.choice(SPECS),
+            description=' '.join(rnd.choices(WORDS, k=25)),
+            wage=rnd.randrange(800, 4000, 100),
+            pay_type=rnd.choice(['shift', 'hourly']),
+            duration_days=rnd.randint(1, 30),
+            status='approved' if rnd.random() < 0.9 else rnd.choice(['pending', 'rejected']),
+            created_at=now - datetime.timedelta(minutes=i),
+        ))
+        if len(rows) >= batch:
+            tj.db.session.execute(insert(tj.Job), rows)
+            rows = []
+    if rows:
+        tj.db.session.execute(insert(tj.Job), rows)
+    job_ids = tj.db.session.scalars(select(tj.Job.id)).all()
+
+    # отклики распределены по соискателям поровну; пара (job, worker) уникальна
+    per_worker, extra = divmod(args.applications, max(len(worker_ids), 1))
+    rows = []
+    for n, worker_id in enumerate(worker_ids):
+        count = min(per_worker + (n < extra), len(job_ids))
+        for job_id in rnd.sample(job_ids, count):
+            rows.append(dict(job_id=job_id, worker_id=worker_id,
+                             status=rnd.choice(['applied'] * 8 + ['accepted', 'rejected']),
+                             created_at=now - datetime.timedelta(minutes=rnd.randint(0, 10 ** 5))))
+            if len(rows) >= batch:
+                tj.db.session.execute(insert(tj.Application), rows)
+                rows = []
+    if rows:
+        tj.db.session.execute(insert(tj.Application), rows)
+    tj.db.session.commit()
+
+    tj.recount_user_counters()
+    tj.recount_job_counters()
+    tj.rebuild_facets()
+    tj.job_search.create_index()
+
+
+def prepare_db(args):
+    meta_path = db_path + '.json'
+    if os.path.exists(db_path) and os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            if json.load(f) == scale_of(args):
+                print(f'База {db_path}: данные уже засеяны')
+                with app.app_context():
+                    tj.init_db()
+                return
+    for path in (db_path, db_path + '-wal', db_path + '-shm', meta_path):
+        if os.path.exists(path):
+            os.remove(path)
+    t0 = time.perf_counter()
+    with app.app_context():
+        tj.init_db()
+        seed(args)
+    print(f'Засев: {args.jobs} вакансий, {args.applications} откликов, '
+          f'{args.workers + args.employers + 1} пользователей за '
+          f'{time.perf_counter() - t0:.1f} с')
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(scale_of(args), f)
+
+
+def bench_fixtures(args):
+    """Идентификаторы, из которых сценарии выбирают адреса запросов."""
+    rnd = random.Random(args.seed + 1)
+    with app.app_context():
+        approved = tj.db.session.scalars(
+            select(tj.Job.id).where(tj.Job.status == 'approved')).all()
+        worker_id = tj.db.session.scalar(
+            select(tj.User.id).where(tj.User.email == 'worker0@bench.local'))
+        applied = set(tj.db.session.scalars(
+            select(tj.Application.job_id).where(tj.Application.worker_id == worker_id)))
+        employer_jobs = tj.db.session.scalars(
+            select(tj.Job.id).join(tj.User, tj.Job.employer_id == tj.User.id)
+            .where(tj.User.email == 'employer0@bench.local')).all()
+    # вакансии, на которые worker0 ещё не откликался, — для apply
+    fresh = [job_id for job_id in approved if job_id not in applied]
+    rnd.shuffle(fresh)
+    return dict(approved=approved, fresh=itertools.cycle(fresh or approved),
+                employer_jobs=employer_jobs or approved)
+
+
+# ---------- клиенты ----------
+
+class TestClient:
+    """Запросы через test_client приложения."""
+
+    def __init__(self):
+        self.client = app.test_client()
+
+    def request(self, method, url, data=None):
+        t0 = time.perf_counter()
+        response = self.client.open(url, method=method, data=data)
+        response.get_data()
+        elapsed = time.perf_counter() - t0
+        return response.status_code, elapsed, int(response.headers.get('X-Query-Count', 0))
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class HttpClient:
+    """Запросы по HTTP к локальному серверу; cookie сессии общие для потоков."""
+
+    def __init__(self, base):
+        self.base = base
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect)
+
+    def request(self, method, url, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base + url, body, method=method)
+        t0 = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=60) as resp:
+                resp.read()
+                status, headers = resp.status, resp.headers
+        except urllib.error.HTTPError as e:
+            e.read()
+            status, headers = e.code, e.headers
+        elapsed = time.perf_counter() - t0
+        return status, elapsed, int(headers.get('X-Query-Count', 0))
+
+
+def login(client, email):
+    status, _, _ = client.request('POST', '/login', {'email': email, 'password': PASSWORD})
+    if status != 302:
+        raise SystemExit(f'Не удалось войти как {email}: {status}')
+    return client
+
+
+# ---------- сценарии ----------
+
+def scenarios(fx):
+    """(имя, роль, метод, функция rnd -> (адрес, данные формы))."""
+    def detail(rnd):
+        return f'/vacancies/{rnd.choice(fx["approved"])}', None
+
+    def search(rnd):
+        return '/vacancies?' + urllib.parse.urlencode({'search': rnd.choice(QUERIES)}), None
+
+    def filtered(rnd):
+        return '/vacancies?' + urllib.parse.urlencode({'city': rnd.choice(CITIES)}), None
+
+    def apply(rnd):
+        return f'/vacancies/{next(fx["fresh"])}/apply', {'note': 'Готов выйти завтра'}
+
+    def applicants(rnd):
+        return (f'/manage/job/{rnd.choice(fx["employer_jobs"])}/applications?'
+                + urllib.parse.urlencode({'sort': rnd.choice(['date', 'rating', 'experience'])}),
+                None)
+
+    def fixed(url):
+        return lambda rnd: (url, None)
+
+    return [
+        ('index', 'anon', 'GET', fixed('/')),
+        ('vacancies', 'anon', 'GET', fixed('/vacancies')),
+        ('vacancies_filter', 'anon', 'GET', filtered),
+        ('vacancies_search', 'anon', 'GET', search),
+        ('vacancy_detail', 'anon', 'GET', detail),
+        ('vacancies_worker', 'worker', 'GET', fixed('/vacancies')),
+        ('vacancy_detail_worker', 'worker', 'GET', detail),
+        ('apply', 'worker', 'POST', apply),
+        ('profile', 'worker', 'GET', fixed('/profile')),
+        ('my_applications', 'worker', 'GET', fixed('/my-applications')),
+        ('manage_employer', 'employer', 'GET', fixed('/manage')),
+        ('job_applicants', 'employer', 'GET', applicants),
+        ('manage_moderator', 'moderator', 'GET', fixed('/manage')),
+        ('api_vacancies', 'anon', 'GET', fixed('/api/v1/vacancies')),
+    ]
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0
+
+
+def run_route(client, method, make_request, args, rnd):
+    for _ in range(args.warmup):
+        url, data = make_request(rnd)
+        client.request(method, url, data)
+
+    latencies, queries, statuses = [], [], {}
+    lock = threading.Lock()
+    plan = [make_request(rnd) for _ in range(args.requests)]
+    jobs = iter(plan)
+
+    def worker():
+        while True:
+            with lock:
+                item = next(jobs, None)
+            if item is None:
+                return
+            status, elapsed, count = client.request(method, *item)
+            with lock:
+                latencies.append(elapsed * 1000)
+                queries.append(count)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    threads = args.concurrency if args.server else 1
+    t0 = time.perf_counter()
+    if threads == 1:
+        worker()
+    else:
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+    wall = time.perf_counter() - t0
+    return dict(
+        requests=len(latencies),
+        p50_ms=round(percentile(latencies, 0.5), 3),
+        p95_ms=round(percentile(latencies, 0.95), 3),
+        p99_ms=round(percentile(latencies, 0.99), 3),
+        rps=round(len(latencies) / wall, 1) if wall else 0,
+        queries=round(sum(queries) / len(queries), 2) if queries else 0,
+        statuses={str(k): v for k, v in sorted(statuses.items())},
+    )
+
+
+# ---------- результаты ----------
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    cwd=ROOT, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, dirty
+
+
+def find_baseline(args, result):
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            return args.compare, json.load(f)
+    for path in sorted(glob.glob(os.path.join(RESULTS_DIR, 'routes-*.json')), reverse=True):
+        with open(path, encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get('scale') == result['scale'] and \
+                previous.get('mode') == result['mode']:
+            return path, previous
+    return None, None
+
+
+def compare(result, baseline, threshold):
+    """Печатает изменения относительно baseline; возвращает список регрессий."""
+    regressions = []
+    print(f'\n{"маршрут":<24}{"p95 было":>10}{"стало":>10}{"Δ%":>8}'
+          f'{"SQL было":>10}{"стало":>8}')
+    for name, now in result['routes'].items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            continue
+        delta = (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 \
+            if before['p95_ms'] else 0
+        mark = ''
+        if delta > threshold:
+            regressions.append(f'{name}: p95 {before["p95_ms"]} -> {now["p95_ms"]} мс')
+            mark = '  !'
+        if now['queries'] > before['queries'] * (1 + threshold / 100):
+            regressions.append(f'{name}: SQL {before["queries"]} -> {now["queries"]}')
+            mark = '  !'
+        print(f'{name:<24}{before["p95_ms"]:>10.2f}{now["p95_ms"]:>10.2f}{delta:>+8.1f}'
+              f'{before["queries"]:>10}{now["queries"]:>8}{mark}')
+    return regressions
+
+
+def main():
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    prepare_db(args)
+    app.config['QUERY_COUNT_HEADER'] = True
+    if args.no_page_cache:
+        app.config['PAGE_CACHE_TTL'] = 0
+
+    if args.seed_only:
+        return
+
+    server = None
+    if args.url:
+        def new_client():
+            return HttpClient(args.url.rstrip('/'))
+    elif args.server:
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_port}'
+
+        def new_client():
+            return HttpClient(base)
+    else:
+        new_client = TestClient
+
+    fx = bench_fixtures(args)
+    clients = dict(
+        anon=new_client(),
+        worker=login(new_client(), 'worker0@bench.local'),
+        employer=login(new_client(), 'employer0@bench.local'),
+        moderator=login(new_client(), 'moderator@bench.local'),
+    )
+
+    commit, dirty = git_revision()
+    result = dict(
+        created=datetime.datetime.now().isoformat(timespec='seconds'),
+        commit=commit, dirty=dirty,
+        python=sys.version.split()[0],
+        mode=(f'{args.url} x{args.concurrency}' if args.url else
+              f'server x{args.concurrency}' if args.server else 'test_client'),
+        page_cache=not args.no_page_cache,
+        scale=scale_of(args),
+        requests=args.requests,
+        routes={},
+    )
+
+    rnd = random.Random(args.seed + 2)
+    print(f'\n{"маршрут":<24}{"p50, мс":>9}{"p95":>9}{"p99":>9}{"req/s":>9}'
+          f'{"SQL/req":>9}   ответы')
+    for name, role, method, make_request in scenarios(fx):
+        if args.routes and name not in args.routes:
+            continue
+        stats = run_route(clients[role], method, make_request, args, rnd)
+        result['routes'][name] = stats
+        codes = ', '.join(f'{k}: {v}' for k, v in stats['statuses'].items())
+        print(f'{name:<24}{stats["p50_ms"]:>9.2f}{stats["p95_ms"]:>9.2f}'
+              f'{stats["p99_ms"]:>9.2f}{stats["rps"]:>9.1f}{stats["queries"]:>9}   {codes}')
+
+    if server is not None:
+        server.shutdown()
+
+    baseline_path, baseline = find_baseline(args, result)
+    regressions = []
+    if baseline is not None:
+        print(f'\nСравнение с {os.path.relpath(baseline_path, ROOT)} '
+              f'(коммит {baseline.get("commit")})')
+        regressions = compare(result, baseline, args.threshold)
+        for line in regressions:
+            print('Регрессия:', line)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = args.output or os.path.join(
+            RESULTS_DIR, f'routes-{stamp}-{commit}{"-dirty" if dirty else ""}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+        print(f'\nРезультат: {os.path.relpath(path, ROOT)}')
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
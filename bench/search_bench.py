@@ -0,0 +1,115 @@
+# bench/search_bench.py
+# Сравнение задержки поиска /vacancies: ILIKE по четырём колонкам против FTS5.
+#
+#   python bench/search_bench.py                       # 10k и 100k вакансий
+#   python bench/search_bench.py --sizes 10000 100000 1000000
+#
+# Для каждого размера создаётся отдельная временная sqlite-база.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import db, Job, User, job_search  # noqa: E402
+
+TITLES = ['Разнорабочий', 'Маляр-штукатур', 'Укладчик плитки', 'Электрик', 'Сантехник',
+          'Каменщик', 'Плотник', 'Кровельщик', 'Сварщик', 'Монтажник гипсокартона',
+          'Бетонщик', 'Грузчик', 'Отделочник', 'Фасадчик', 'Арматурщик']
+CITIES = ['Москва', 'Санкт-Петербург', 'Казань', 'Новосибирск', 'Екатеринбург',
+          'Нижний Новгород', 'Самара', 'Омск', 'Ростов-на-Дону', 'Уфа']
+SPECS = ['отделка', 'электромонтаж', 'сантехника', 'кладка', 'кровля', 'сварка',
+         'демонтаж', 'благоустройство', 'фасадные работы', 'погрузка']
+WORDS = ('требуется опытный специалист работа на строительном объекте ответственность '
+         'пунктуальность оплата ежедневно инструмент предоставляется питание проживание '
+         'возможна подработка выходные новостройка коттедж ремонт квартиры бригада '
+         'график сменный срочно без опыта обучение спецодежда').split()
+
+QUERIES = ['плиточник', 'Казань', 'сварщик кровля', 'электромонтаж Москва', 'проживание',
+           'штукатур']
+
+
+def seed(n, batch=10000):
+    rnd = random.Random(42)
+    db.session.execute(insert(User), [dict(name='Bench', email='bench@tj.local',
+                                           password_hash='-', role='employer')])
+    employer_id = db.session.query(User.id).scalar()
+    now = datetime.datetime.utcnow()
+    rows = []
+    for i in range(n):
+        rows.append(dict(
+            employer_id=employer_id,
+            title=rnd.choice(TITLES),
+            city=rnd.choice(CITIES),
+            specialization=rnd.choice(SPECS),
+            description=' '.join(rnd.choices(WORDS, k=25)),
+            wage=rnd.randrange(800, 4000, 100),
+            pay_type=rnd.choice(['shift', 'hourly']),
+            duration_days=rnd.randint(1, 30),
+            status='approved' if rnd.random() < 0.9 else 'pending',
+            created_at=now - datetime.timedelta(minutes=i),
+        ))
+        if len(rows) >= batch:
+            db.session.execute(insert(Job), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Job), rows)
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def run(n, repeat, limit):
+    path = os.path.join(tempfile.mkdtemp(prefix='tj-bench-'), 'bench.db')
+    bench_app = Flask('search_bench')
+    bench_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    db.init_app(bench_app)
+    with bench_app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        seed(n)
+        seed_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        job_search.create_index()
+        index_s = time.perf_counter() - t0
+        print(f'\n{n} вакансий: заполнение {seed_s:.1f} с, индексация {index_s:.1f} с')
+        print(f'{"запрос":<24}{"ILIKE, мс":>12}{"FTS5, мс":>12}{"найдено":>10}')
+        for q in QUERIES:
+            base = Job.query.filter_by(status='approved')
+            ilike = timed(lambda: job_search.filter_ilike(base, q).limit(limit).all(), repeat)
+            fts = timed(lambda: job_search.filter_fts(base, q).limit(limit).all(), repeat)
+            found = job_search.filter_fts(base, q).order_by(None).count()
+            print(f'{q:<24}{ilike:>12.2f}{fts:>12.2f}{found:>10}')
+        db.session.remove()
+        db.engine.dispose()
+    os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=50,
+                        help='сколько строк забирать (как одна страница выдачи)')
+    args = parser.parse_args()
+    for n in args.sizes:
+        run(n, args.repeat, args.limit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+# bench/serve_bench.py
+# Сервер разработки против боевого запуска на маршрутах routes_bench.py.
+#
+#   python bench/serve_bench.py                              # dev и gunicorn 2x4
+#   python bench/serve_bench.py --workers 1 2 4 --threads 4 --concurrency 16
+#   python bench/serve_bench.py --hup                        # kill -HUP под нагрузкой
+#
+# Засевает базу один раз (routes_bench.py --seed-only), для каждого режима
+# поднимает сервер отдельным процессом на своей копии базы и гоняет по нему
+# routes_bench.py --url. Режимы:
+#   dev          flask run --debug — то же, что python app.py: один процесс,
+#                поток на запрос, отладчик и перезапуск при изменении кода
+#   gunicorn WxT python serve.py с WEB_WORKERS=W, WEB_THREADS=T
+# Клиент работает на той же машине и делит с сервером процессор — сравнивать
+# режимы между собой, а не с числами на другом железе.
+import argparse
+import json
+import os
+import secrets
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ROUTES_BENCH = os.path.join(ROOT, 'bench', 'routes_bench.py')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[2],
+                        help='варианты WEB_WORKERS для gunicorn')
+    parser.add_argument('--threads', type=int, default=4, help='WEB_THREADS')
+    parser.add_argument('--concurrency', type=int, default=8, help='потоков клиента')
+    parser.add_argument('--requests', type=int, default=300, help='запросов на маршрут')
+    parser.add_argument('--routes', nargs='+', help='только эти маршруты')
+    parser.add_argument('--no-dev', action='store_true', help='без сервера разработки')
+    parser.add_argument('--hup', action='store_true',
+                        help='посреди прогона gunicorn перезагрузить воркеры (kill -HUP)')
+    parser.add_argument('--db', help='засеянная база (по умолчанию — временная)')
+    parser.add_argument('bench_args', nargs=argparse.REMAINDER,
+                        help='после -- : параметры засева для routes_bench.py')
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(base, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f'Сервер завершился с кодом {proc.returncode}')
+        try:
+            with urllib.request.urlopen(base + '/healthz', timeout=1) as resp:
+                if resp.status == 200:
+                    return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    raise SystemExit('Сервер не ответил на /healthz')
+
+
+def copy_db(src, dst):
+    for suffix in ('', '.json'):
+        shutil.copyfile(src + suffix, dst + suffix)
+
+
+def server_command(mode, workers, port):
+    if mode == 'dev':
+        return [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--debug',
+                '--port', str(port)], {}
+    return [sys.executable, 'serve.py'], {
+        'WEB_BIND': f'127.0.0.1:{port}', 'WEB_WORKERS': str(workers),
+        'WEB_MIGRATE': '0',
+    }
+
+
+def run_mode(name, mode, workers, args, seed_db, tmp, bench_args):
+    slug = name.replace(' ', '-')
+    db = os.path.join(tmp, f'{slug}.db')
+    copy_db(seed_db, db)
+    port = free_port()
+    command, extra = server_command(mode, workers, port)
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + db,
+               TASK_QUEUE_PATH=os.path.join(tmp, f'{slug}-tasks.db'),
+               SECRET_KEY=secrets.token_hex(16), WEB_THREADS=str(args.threads),
+               PASSWORD_HASH_WORKERS='0', **extra)
+    log = open(os.path.join(tmp, f'{slug}.log'), 'w')
+    proc = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+                            start_new_session=True)
+    base = f'http://127.0.0.1:{port}'
+    output = os.path.join(tmp, f'{slug}.json')
+    try:
+        wait_ready(base, proc)
+        hup = None
+        if args.hup and mode == 'gunicorn':
+            # перезагрузка через пару секунд после начала замера
+            hup = threading.Timer(3, os.kill, (proc.pid, signal.SIGHUP))
+            hup.start()
+        command = [sys.executable, ROUTES_BENCH, '--db', db, '--url', base,
+                   '--concurrency', str(args.concurrency), '--requests', str(args.requests),
+                   '--output', output, *bench_args]
+        if args.routes:
+            command += ['--routes', *args.routes]
+        print(f'\n=== {name} ===', flush=True)
+        subprocess.run(command, check=True)
+        if hup is not None:
+            hup.join()
+    finally:
+        # gunicorn: плавная остановка; сервер разработки — вместе с перезапускателем
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=60)
+        log.close()
+    with open(output, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    args = parse_args()
+    bench_args = [a for a in args.bench_args if a != '--']
+    tmp = tempfile.mkdtemp(prefix='tj-serve-')
+    seed_db = args.db or os.path.join(tmp, 'seed.db')
+    subprocess.run([sys.executable, ROUTES_BENCH, '--db', seed_db, '--seed-only', *bench_args],
+                   check=True)
+
+    modes = [] if args.no_dev else [('dev', 'dev', 1)]
+    modes += [(f'gunicorn {w}x{args.threads}', 'gunicorn', w) for w in args.workers]
+    results = {name: run_mode(name, mode, workers, args, seed_db, tmp, bench_args)
+               for name, mode, workers in modes}
+
+    names = list(results)
+    routes = list(results[names[0]]['routes'])
+    print(f'\nreq/s и p95, мс ({args.concurrency} потоков клиента, {os.cpu_count()} CPU)')
+    print(f'{"маршрут":<24}' + ''.join(f'{name:>22}' for name in names))
+    totals = dict.fromkeys(names, 0.0)
+    for route in routes:
+        cells = []
+        for name in names:
+            stats = results[name]['routes'].get(route)
+            if stats is None:
+                cells.append(f'{"—":>22}')
+                continue
+            totals[name] += stats['rps']
+            errors = sum(n for code, n in stats['statuses'].items() if int(code) >= 500)
+            mark = f' 5xx:{errors}' if errors else ''
+            cells.append(f'{stats["rps"]:>10.1f} {stats["p95_ms"]:>8.1f}{mark:>3}')
+        print(f'{route:<24}' + ''.join(cells))
+    print(f'{"сумма req/s":<24}' + ''.join(f'{totals[name]:>10.1f}{"":>12}' for name in names))
+    print(f'\nЛоги серверов и результаты: {tmp}')
+
+
+if __name__ == '__main__':
+    main()
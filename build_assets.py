@@ -0,0 +1,362 @@
+# build_assets.py
+# Сборка статики для продакшена:
+#   - CSS минифицируется, неиспользуемые в шаблонах селекторы выкидываются;
+#   - url() картинок в CSS переписываются на .webp, если рядом есть такой файл
+#     (или если установлен Pillow и webp можно сделать из png);
+#   - все файлы копируются в static/dist/ с хэшем содержимого в имени,
+#     карта «исходное имя -> имя с хэшем» пишется в static/dist/manifest.json;
+#   - для текстовых файлов рядом кладутся .gz и .br (если есть пакет brotli).
+#
+#   python build_assets.py
+#
+# Приложение берёт имена из манифеста через asset_url() и отдаёт
+# static/dist/ с заголовками «кэшировать навсегда».
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+
+# где искать используемые классы и id
+SOURCE_GLOBS = ['templates/**/*.html', 'index.html', 'static/js/**/*.js', '*.py']
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.html', '.txt')
+# внутри этих at-правил лежат обычные правила, которые тоже можно чистить
+GROUPING_AT_RULES = ('@media', '@supports', '@layer', '@container', '@document')
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+# ---------- разбор CSS ----------
+
+def _skip_string(css, i):
+    quote = css[i]
+    i += 1
+    while i < len(css) and css[i] != quote:
+        i += 2 if css[i] == '\\' else 1
+    return i + 1
+
+
+def strip_comments(css):
+    out = []
+    i = 0
+    while i < len(css):
+        ch = css[i]
+        if ch in '"\'':
+            j = _skip_string(css, i)
+            out.append(css[i:j])
+            i = j
+        elif css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            i = len(css) if end == -1 else end + 2
+        else:
+            out.append(ch)
+            i += 1
+    return ''.join(out)
+
+
+def _read_until(css, i, stops):
+    """Читает до одного из символов stops (вне строк и скобок)."""
+    depth = 0
+    start = i
+    while i < len(css):
+        ch = css[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch in '"\'':
+            i = _skip_string(css, i)
+            continue
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif depth == 0 and ch in stops:
+            break
+        i += 1
+    return css[start:i], i
+
+
+def _read_block(css, i):
+    """i указывает на символ после '{'; возвращает тело до парной '}'."""
+    depth = 1
+    start = i
+    while i < len(css):
+        ch = css[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch in '"\'':
+            i = _skip_string(css, i)
+            continue
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return css[start:i], i + 1
+        i += 1
+    return css[start:], i
+
+
+def parse(css, i=0):
+    """Список узлов: ('stmt', text) | ('rule', prelude, body) |
+    ('group', prelude, children)."""
+    nodes = []
+    while i < len(css):
+        prelude, i = _read_until(css, i, '{};')
+        prelude = prelude.strip()
+        if i >= len(css):
+            break
+        ch = css[i]
+        if ch == '}':
+            return nodes, i + 1
+        if ch == ';':
+            if prelude:
+                nodes.append(('stmt', prelude))
+            i += 1
+            continue
+        if prelude.lower().startswith(GROUPING_AT_RULES):
+            children, i = parse(css, i + 1)
+            nodes.append(('group', prelude, children))
+        else:
+            body, i = _read_block(css, i + 1)
+            nodes.append(('rule', prelude, body))
+    return nodes, i
+
+
+# ---------- минификация ----------
+
+_PROTECTED_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|url\([^)]*\)', re.S)
+
+
+def _protect(text):
+    saved = []
+
+    def keep(m):
+        saved.append(m.group(0))
+        return f'\0{len(saved) - 1}\0'
+    return _PROTECTED_RE.sub(keep, text), saved
+
+
+def _restore(text, saved):
+    return re.sub(r'\0(\d+)\0', lambda m: saved[int(m.group(1))], text)
+
+
+def minify_selector(selector):
+    text, saved = _protect(selector)
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = re.sub(r'\s*([,>~+])\s*', r'\1', text)
+    return _restore(text, saved)
+
+
+def minify_body(body):
+    text, saved = _protect(body)
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = re.sub(r'\s*([:;,{}])\s*', r'\1', text)
+    text = re.sub(r'\s*!important', '!important', text)
+    text = re.sub(r';+(?=}|$)', '', text)
+    return _restore(text, saved)
+
+
+def serialize(nodes):
+    out = []
+    for node in nodes:
+        if node[0] == 'stmt':
+            out.append(re.sub(r'\s+', ' ', node[1]) + ';')
+        elif node[0] == 'group':
+            inner = serialize(node[2])
+            if inner:
+                prelude = re.sub(r'\s+', ' ', node[1])
+                out.append(f'{prelude}{{{inner}}}')
+        else:
+            prelude = node[1]
+            if not prelude.startswith('@'):
+                prelude = minify_selector(prelude)
+            else:
+                prelude = re.sub(r'\s+', ' ', prelude)
+            out.append(f'{prelude}{{{minify_body(node[2])}}}')
+    return ''.join(out)
+
+
+# ---------- удаление неиспользуемых селекторов ----------
+
+_TOKEN_RE = re.compile(r'[^\s"\'<>=`{}(),;]+')
+_NAME_RE = r'((?:\\.|[\w-])+)'
+
+
+def used_tokens():
+    tokens = set()
+    for pattern in SOURCE_GLOBS:
+        for path in glob.glob(os.path.join(BASE_DIR, pattern), recursive=True):
+            with open(path, encoding='utf-8', errors='ignore') as f:
+                tokens.update(_TOKEN_RE.findall(f.read()))
+    return tokens
+
+
+def split_selectors(prelude):
+    parts, depth, start = [], 0, 0
+    escaped = False
+    for i, ch in enumerate(prelude):
+        if escaped:
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(prelude[start:i])
+            start = i + 1
+    parts.append(prelude[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def selector_used(selector, tokens):
+    # содержимое :not(), :is(), :has() и т.п. не проверяем — оставляем как есть
+    # экранированные скобки (.w-\[20px\]) — часть имени класса
+    text = re.sub(r'(?<!\\):[\w-]+\([^()]*\)', '', selector)
+    # scoped-стили Vue: [data-v-xxxx] совпадает только с размеченными элементами
+    for attr in re.findall(r'(?<!\\)\[(data-v-[\w-]+)\]', text):
+        if attr not in tokens:
+            return False
+    text = re.sub(r'(?<!\\)\[[^\]]*\]', '', text)
+    for name in re.findall(r'[.#]' + _NAME_RE, text):
+        if re.sub(r'\\(.)', r'\1', name) not in tokens:
+            return False
+    return True
+
+
+def purge(nodes, tokens):
+    result = []
+    for node in nodes:
+        if node[0] == 'group':
+            children = purge(node[2], tokens)
+            if children:
+                result.append(('group', node[1], children))
+        elif node[0] == 'rule' and not node[1].startswith('@'):
+            selectors = [s for s in split_selectors(node[1]) if selector_used(s, tokens)]
+            if selectors:
+                result.append(('rule', ','.join(selectors), node[2]))
+        else:
+            result.append(node)
+    return result
+
+
+# ---------- сборка ----------
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def write_asset(rel_path, data, manifest):
+    root, ext = os.path.splitext(rel_path)
+    hashed = f'{root}.{content_hash(data)}{ext}'
+    target = os.path.join(DIST_DIR, hashed)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(data)
+    if ext.lower() in COMPRESSIBLE:
+        gz = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(gz) < len(data):
+            with open(target + '.gz', 'wb') as f:
+                f.write(gz)
+        if brotli is not None:
+            br = brotli.compress(data, quality=11)
+            if len(br) < len(data):
+                with open(target + '.br', 'wb') as f:
+                    f.write(br)
+    manifest[rel_path.replace(os.sep, '/')] = hashed.replace(os.sep, '/')
+    return hashed
+
+
+def webp_variant(rel_path):
+    """Относительный путь .webp-версии картинки, если она есть или её можно
+    сделать; иначе None."""
+    root, ext = os.path.splitext(rel_path)
+    if ext.lower() not in ('.png', '.jpg', '.jpeg'):
+        return None
+    webp = root + '.webp'
+    if os.path.isfile(os.path.join(STATIC_DIR, webp)):
+        return webp
+    if Image is None:
+        return None
+    target = os.path.join(DIST_DIR, '_webp', webp)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with Image.open(os.path.join(STATIC_DIR, rel_path)) as img:
+        img.save(target, 'WEBP', quality=85, method=6)
+    return os.path.join('_webp', webp)
+
+
+def rewrite_urls(css, manifest):
+    def replace(m):
+        url = m.group(2)
+        if not url.startswith('/static/'):
+            return m.group(0)
+        rel = url[len('/static/'):]
+        rel = webp_variant(rel) or rel
+        hashed = manifest.get(rel.replace(os.sep, '/'))
+        if hashed is None:
+            return m.group(0)
+        return f'url("/static/dist/{hashed}")'
+    return re.sub(r'url\((["\']?)([^"\')]+)\1\)', replace, css)
+
+
+def build():
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+    manifest = {}
+    tokens = used_tokens()
+    sizes = []
+
+    files = []
+    for path in glob.glob(os.path.join(STATIC_DIR, '**', '*'), recursive=True):
+        rel = os.path.relpath(path, STATIC_DIR)
+        if os.path.isfile(path) and not rel.startswith('dist' + os.sep):
+            files.append(rel)
+
+    # сначала всё, кроме CSS: в CSS нужны уже готовые имена картинок
+    for rel in sorted(files, key=lambda r: r.endswith('.css')):
+        with open(os.path.join(STATIC_DIR, rel), 'rb') as f:
+            data = f.read()
+        if rel.endswith('.css'):
+            css = strip_comments(data.decode('utf-8'))
+            nodes, _ = parse(css)
+            out = rewrite_urls(serialize(purge(nodes, tokens)), manifest)
+            hashed = write_asset(rel, out.encode('utf-8'), manifest)
+            sizes.append((rel, len(data), len(out.encode('utf-8')), hashed))
+        else:
+            write_asset(rel, data, manifest)
+            webp = webp_variant(rel)
+            if webp and webp.startswith('_webp'):
+                with open(os.path.join(DIST_DIR, webp), 'rb') as f:
+                    write_asset(webp, f.read(), manifest)
+
+    with open(os.path.join(DIST_DIR, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    for rel, before, after, hashed in sizes:
+        gz = os.path.join(DIST_DIR, hashed + '.gz')
+        gz_size = os.path.getsize(gz) if os.path.exists(gz) else after
+        print(f'{rel}: {before / 1024:.1f} КБ -> {after / 1024:.1f} КБ '
+              f'(gzip {gz_size / 1024:.1f} КБ)')
+    print(f'Файлов в манифесте: {len(manifest)}')
+
+
+if __name__ == '__main__':
+    build()
@@ -0,0 +1,275 @@
+# cache.py
+# Простой кэш с TTL: в памяти процесса или в Redis (общий для всех воркеров).
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class MemoryBackend:
+    """Кэш в памяти текущего процесса.
+
+    max_entries ограничивает число ключей: при переполнении сначала
+    выбрасываются просроченные, затем самые старые записи.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires < time.monotonic():
+            with self._lock:
+                self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires)
+            if self.max_entries and len(self._data) > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        self._data = {k: v for k, v in self._data.items()
+                      if v[1] is None or v[1] >= now}
+        # dict хранит порядок вставки — первыми идут самые старые записи
+        for key in list(self._data)[:len(self._data) - self.max_entries]:
+            del self._data[key]
+
+    def incr(self, key, delta=1):
+        """Увеличивает значение, только если ключ уже есть в кэше."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            self._data[key] = (value + delta, expires)
+            return value + delta
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class RedisBackend:
+    """Общий кэш для нескольких процессов. Нужен пакет redis."""
+
+    _INCR_IF_EXISTS = (
+        "if redis.call('exists', KEYS[1]) == 1 then "
+        "return redis.call('incrby', KEYS[1], ARGV[1]) end"
+    )
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self.client.get(key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, json.dumps(value), ex=ttl or None)
+
+    def incr(self, key, delta=1):
+        return self.client.eval(self._INCR_IF_EXISTS, 1, key, delta)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+
+def create_backend(url=None, max_entries=None):
+    if not url or url == 'memory://':
+        return MemoryBackend(max_entries)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    raise ValueError(f'Неизвестный backend кэша: {url}')
+
+
+class StatsCache:
+    """Счётчики для главной страницы.
+
+    Значения считаются loader'ом только при промахе (или после истечения
+    TTL), а между ними поддерживаются инкрементально: регистрация и смена
+    статуса вакансии сдвигают нужный счётчик на ±1.
+    """
+
+    KEYS = ('active_jobs', 'workers', 'employers')
+
+    def __init__(self, backend=None, loader=None, ttl=300, prefix='stats:'):
+        self.backend = backend or MemoryBackend()
+        self.loader = loader
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.backend = create_backend(app.config['CACHE_URL'])
+        self.ttl = app.config['STATS_CACHE_TTL']
+
+    def _key(self, name):
+        return self.prefix + name
+
+    def get(self):
+        values = [self.backend.get(self._key(name)) for name in self.KEYS]
+        if None not in values:
+            self.hits += 1
+            return dict(zip(self.KEYS, values))
+        self.misses += 1
+        stats = self.loader()
+        for name in self.KEYS:
+            self.backend.set(self._key(name), stats[name], self.ttl)
+        return stats
+
+    def incr(self, name, delta=1):
+        self.backend.incr(self._key(name), delta)
+
+    def invalidate(self):
+        self.backend.delete(*[self._key(name) for name in self.KEYS])
+
+    def info(self):
+        return dict(hits=self.hits, misses=self.misses)
+
+    # --- события ---
+
+    def user_registered(self, role):
+        if role == 'worker':
+            self.incr('workers')
+        elif role == 'employer':
+            self.incr('employers')
+
+    def job_status_changed(self, old, new):
+        if old == new:
+            return
+        if new == 'approved':
+            self.incr('active_jobs')
+        elif old == 'approved':
+            self.incr('active_jobs', -1)
+
+
+class PageCache:
+    """Отрендеренные страницы и фрагменты (карточки вакансий).
+
+    Все ключи включают версию вакансий — метку времени последнего
+    изменения в миллисекундах. Любая правка вакансии (jobs_changed) даёт
+    новую версию, и старые записи просто перестают читаться, а потом
+    вытесняются по TTL. Из версии же получаются ETag и Last-Modified.
+
+    Версию должны видеть все процессы, иначе воркер, не заметивший правку
+    из другого процесса (соседнего воркера, flask run-tasks), отдаёт старые
+    страницы до конца TTL. С Redis она лежит в общем кэше, а с кэшем в
+    памяти — в mtime файла version_path: его видят все процессы машины.
+    """
+
+    def __init__(self, backend=None, ttl=300, prefix='page:', version_path=None):
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.prefix = prefix
+        self.version_path = version_path
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.backend = create_backend(app.config['CACHE_URL'],
+                                      max_entries=app.config['PAGE_CACHE_MAX_ENTRIES'])
+        self.ttl = app.config['PAGE_CACHE_TTL']
+        self.version_path = None if isinstance(self.backend, RedisBackend) \
+            else app.config['PAGE_CACHE_VERSION_FILE']
+
+    def version(self):
+        if self.version_path:
+            version = self._file_version()
+        else:
+            version = self.backend.get(self.prefix + 'version')
+        if version is None:
+            version = self.jobs_changed()
+        return version
+
+    def jobs_changed(self):
+        # метка времени, а не счётчик с нуля: после рестарта или вытеснения
+        # ключа версия не повторит уже выданные клиентам ETag
+        if self.version_path:
+            version = max(int(time.time() * 1000), (self._file_version() or 0) + 1)
+            self._touch(version)
+            return version
+        version = max(int(time.time() * 1000),
+                      (self.backend.get(self.prefix + 'version') or 0) + 1)
+        self.backend.set(self.prefix + 'version', version)
+        return version
+
+    def _file_version(self):
+        # один stat() на запрос, файл не открывается
+        try:
+            return os.stat(self.version_path).st_mtime_ns // 1000000
+        except FileNotFoundError:
+            return None
+
+    def _touch(self, version):
+        directory = os.path.dirname(os.path.abspath(self.version_path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.version_path, 'a'):
+            pass
+        os.utime(self.version_path, ns=(version * 1000000, version * 1000000))
+
+    def _key(self, version, key):
+        return f'{self.prefix}{version}:{key}'
+
+    def get(self, version, key):
+        value = self.backend.get(self._key(version, key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, version, key, value):
+        self.backend.set(self._key(version, key), value, self.ttl)
+
+    @staticmethod
+    def etag(version, key):
+        return hashlib.sha1(f'{version}:{key}'.encode()).hexdigest()[:20]
+
+    @staticmethod
+    def modified_at(version):
+        return datetime.datetime.fromtimestamp(version / 1000, datetime.timezone.utc)
+
+    def info(self):
+        return dict(hits=self.hits, misses=self.misses)
+
+
+class IdentityCache:
+    """Снимки пользователей для current_user по id: авторизованные страницы
+    не делают SELECT по первичному ключу на каждый запрос. С CACHE_URL кэш
+    общий для воркеров, и forget() сбрасывает запись во всех сразу."""
+
+    def __init__(self, backend=None, ttl=30, prefix='user:'):
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def init_app(self, app):
+        self.backend = create_backend(app.config['CACHE_URL'],
+                                      max_entries=app.config['IDENTITY_CACHE_MAX_ENTRIES'])
+        self.ttl = app.config['IDENTITY_CACHE_TTL']
+
+    def get(self, user_id):
+        return self.backend.get(f'{self.prefix}{user_id}')
+
+    def set(self, user_id, data):
+        self.backend.set(f'{self.prefix}{user_id}', data, self.ttl)
+
+    def forget(self, *user_ids):
+        self.backend.delete(*[f'{self.prefix}{user_id}' for user_id in user_ids])
@@ -1,8 +1,200 @@
-import os
 # config.py
 import os
 
+from dotenv import load_dotenv
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# переменные окружения можно положить в .env рядом с приложением
+load_dotenv(os.path.join(BASE_DIR, '.env'))
+
+
+def database_url(url=None):
+    url = url or os.environ.get('DATABASE_URL') or \
+        'sqlite:///' + os.path.join(BASE_DIR, 'time_jobs.db')
+    # postgres:// (старый формат) SQLAlchemy 1.4+ не понимает, а для
+    # postgresql:// новые версии выбирают psycopg 3 — у нас же psycopg2
+    for prefix in ('postgres://', 'postgresql://'):
+        if url.startswith(prefix):
+            url = 'postgresql+psycopg2://' + url[len(prefix):]
+    return url
+
+
+def engine_options(url):
+    """Настройки движка SQLAlchemy под конкретную СУБД."""
+    if url.startswith('sqlite'):
+        # sqlite: ждём освобождения блокировки вместо "database is locked";
+        # WAL и прочие PRAGMA выставляются при подключении (см. SQLITE_PRAGMAS)
+        return {
+            'connect_args': {
+                'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)) / 1000,
+                'check_same_thread': False,
+            },
+        }
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        # соединения старше получаса пересоздаются (обрывы со стороны сервера/pgbouncer)
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+
+def replica_binds():
+    """Реплики из DATABASE_REPLICA_URLS (через запятую) для SQLALCHEMY_BINDS."""
+    binds = {}
+    for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(','):
+        if url.strip():
+            url = database_url(url.strip())
+            binds[f'replica{len(binds)}'] = dict(url=url, **engine_options(url))
+    return binds
+
+
+# ключ по умолчанию годится только для разработки: wsgi.py с ним не запускается
+DEV_SECRET_KEY = 'dev-secret-key-change-in-production'
+
+
 class Config:
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///timejobs.db'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SECRET_KEY = os.environ.get('SECRET_KEY') or DEV_SECRET_KEY
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # реплики только для чтения: страницы с @read_replica читают с живой
+    # реплики, отстающей не больше REPLICA_MAX_LAG с (проверка раз в
+    # REPLICA_CHECK_INTERVAL с), иначе — с основной базы. После своей записи
+    # пользователь REPLICA_PIN_SECONDS с читает с основной (видит свои изменения)
+    SQLALCHEMY_BINDS = replica_binds()
+    REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 10))
+    REPLICA_CHECK_INTERVAL = float(os.environ.get('REPLICA_CHECK_INTERVAL', 2))
+    REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
+    # выполняются на каждом новом соединении с sqlite
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',  # читатели не блокируют писателя
+        'synchronous': 'NORMAL',  # в режиме WAL безопасно и намного быстрее FULL
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'temp_store': 'MEMORY',
+    }
+
+    JOBS_PER_PAGE = 30
+    # дальше этого смещения выдачу поиска не листаем: курсор с большим
+    # числом считается испорченным и страница начинается с первой
+    SEARCH_MAX_OFFSET = 10000
+    # отдавать список вакансий потоком: первые карточки уходят в браузер
+    # до того, как отрендерена вся страница
+    STREAM_TEMPLATES = False
+    # добавлять к ответу заголовок X-Query-Count с числом SQL-запросов
+    QUERY_COUNT_HEADER = False
+    # кэш: None — в памяти процесса, 'redis://host:6379/0' — общий для воркеров
+    CACHE_URL = os.environ.get('CACHE_URL')
+    STATS_CACHE_TTL = 300
+    # страницы для анонимов и карточки вакансий (0 — не кэшировать страницы)
+    PAGE_CACHE_TTL = 300
+    # предел записей, если кэш в памяти процесса
+    PAGE_CACHE_MAX_ENTRIES = 5000
+    # без CACHE_URL версия кэша страниц хранится в mtime этого файла — так
+    # правки вакансий видят все воркеры и flask run-tasks на этой машине;
+    # если процессы на разных серверах, нужен общий CACHE_URL (Redis)
+    PAGE_CACHE_VERSION_FILE = os.environ.get('PAGE_CACHE_VERSION_FILE') or os.path.join(BASE_DIR, 'cache', 'page-version')
+    # метод werkzeug вместе с параметрами; при смене хэши пересчитываются при входе
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:600000'
+    # процессов для хэширования (0 — считать в потоке запроса)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    # больше ожидающих хэширования — сразу 503, а не очередь
+    PASSWORD_HASH_MAX_PENDING = 32
+    # попыток входа/регистрации за окно AUTH_LIMIT_WINDOW секунд
+    AUTH_LIMIT_PER_IP = 20
+    AUTH_LIMIT_PER_EMAIL = 5
+    AUTH_LIMIT_WINDOW = 60
+
+    # вакансий на странице очереди модерации
+    MODERATION_PAGE_SIZE = 50
+    # откликов на странице вакансии у работодателя
+    APPLICANTS_PER_PAGE = 50
+    # автоодобрение: работодатель с не менее чем N одобренными вакансиями
+    # и долей отклонённых/закрытых не выше заданной (0 — выключено)
+    AUTO_APPROVE_MIN_APPROVED = 10
+    AUTO_APPROVE_MAX_REJECTED_SHARE = 0.1
+
+    # массовый импорт вакансий: строк в одной транзакции, предел строк
+    # в загружаемом через сайт файле, его размер и сколько ошибок показывать
+    IMPORT_CHUNK_SIZE = 1000
+    IMPORT_MAX_ROWS = 10000
+    IMPORT_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+    IMPORT_MAX_ERRORS = 100
+
+    # рекомендации вакансий (flask recommend, recommend.py): сколько хранить
+    # на соискателя, сколько показывать над лентой и где лежит модель для
+    # добавления новых вакансий без полного пересчёта
+    RECOMMEND_TOP_N = 30
+    RECOMMEND_SHOW = 6
+    RECOMMEND_MODEL_PATH = os.environ.get('RECOMMEND_MODEL_PATH') or os.path.join(BASE_DIR, 'recommend.npz')
+    # фоновые задачи: файл очереди (sqlite), потоков-обработчиков в каждом
+    # процессе приложения (0 — только отдельный процесс flask run-tasks),
+    # попыток до пометки dead и первая пауза между попытками, с
+    TASK_QUEUE_PATH = os.environ.get('TASK_QUEUE_PATH') or os.path.join(BASE_DIR, 'tasks.db')
+    TASK_WORKERS = int(os.environ.get('TASK_WORKERS', 2))
+    TASK_MAX_ATTEMPTS = 5
+    TASK_RETRY_BACKOFF = 5
+
+    # flask sweep-jobs: опубликованные вакансии старше created_at + duration_days
+    # становятся expired; снятые (ARCHIVE_STATUSES) старше ARCHIVE_AFTER_DAYS
+    # вместе с откликами уходят в архивные таблицы. Строк за одну транзакцию:
+    SWEEP_BATCH_SIZE = 500
+    ARCHIVE_AFTER_DAYS = 90
+    ARCHIVE_STATUSES = ('expired', 'rejected')
+
+    # боевой запуск (serve.py, gunicorn.conf.py): адрес, процессов-воркеров
+    # и потоков в каждом. Воркер, зависший дольше WEB_TIMEOUT с, убивается;
+    # при остановке и kill -HUP начатым запросам даётся WEB_GRACEFUL_TIMEOUT с;
+    # после WEB_MAX_REQUESTS запросов воркер заменяется новым (0 — никогда).
+    # WEB_PRELOAD — импортировать приложение в мастере до fork: меньше памяти,
+    # но kill -HUP перезапускает воркеры со старым кодом.
+    # WEB_MIGRATE — flask migrate в мастере перед запуском воркеров и при
+    # kill -HUP (выключить, если миграции — отдельный шаг выкладки)
+    WEB_BIND = os.environ.get('WEB_BIND') or '0.0.0.0:8000'
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS') or os.cpu_count() or 1)
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 30))
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+    WEB_MAX_REQUESTS = int(os.environ.get('WEB_MAX_REQUESTS', 10000))
+    WEB_PRELOAD = os.environ.get('WEB_PRELOAD') == '1'
+    WEB_MIGRATE = os.environ.get('WEB_MIGRATE', '1') == '1'
+    # сколько прокси (nginx и т.п.) стоит перед приложением: их заголовки
+    # X-Forwarded-For/-Proto/-Host считаются настоящими — иначе лимиты
+    # попыток входа по IP видят один адрес прокси на всех (0 — прокси нет)
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+
+    # сколько секунд current_user берётся из кэша (CACHE_URL) без запроса в БД
+    IDENTITY_CACHE_TTL = 30
+    # предел записей, если кэш в памяти процесса
+    IDENTITY_CACHE_MAX_ENTRIES = 10000
+
+    # SQL-запросы дольше стольких миллисекунд пишутся в лог tj.sql.slow
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+    # если задан, /metrics требует заголовок "Authorization: Bearer <токен>"
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # ?_profile=1 отдаёт вместо страницы профиль запроса (pyinstrument или
+    # cProfile) — только для разработки и стенда, не для продакшена
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED') == '1'
+
+    # манифест build_assets.py; без него шаблоны ссылаются на исходники в static/
+    ASSET_MANIFEST = os.path.join(BASE_DIR, 'static', 'dist', 'manifest.json')
+    # файлы из static/dist/ с хэшем в имени — кэшируются на год
+    ASSET_MAX_AGE = 365 * 24 * 3600
+    # аватары /avatar/<id>.svg|png: готовые картинки на диске (старые
+    # вытесняются при превышении объёма), размеры миниатюр, срок кэша
+    # в браузере для ссылок с версией; загруженные фото хранятся в
+    # AVATAR_UPLOAD_DIR, не больше AVATAR_MAX_UPLOAD_BYTES
+    AVATAR_CACHE_DIR = os.environ.get('AVATAR_CACHE_DIR') or os.path.join(BASE_DIR, 'cache', 'avatars')
+    AVATAR_CACHE_MAX_BYTES = int(os.environ.get('AVATAR_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    AVATAR_UPLOAD_DIR = os.environ.get('AVATAR_UPLOAD_DIR') or os.path.join(BASE_DIR, 'uploads', 'avatars')
+    AVATAR_MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+    AVATAR_SIZES = (32, 64, 128, 256)
+    AVATAR_MAX_AGE = 365 * 24 * 3600
+
+    # тело запроса больше этого werkzeug не читает (413): самая большая
+    # загрузка плюс запас на поля формы
+    MAX_CONTENT_LENGTH = max(AVATAR_MAX_UPLOAD_BYTES, IMPORT_MAX_UPLOAD_BYTES) + 64 * 1024
@@ -0,0 +1,51 @@
+# gunicorn.conf.py
+# Настройки gunicorn для python serve.py (или gunicorn -c gunicorn.conf.py wsgi:app).
+# Значения — WEB_* из config.py / окружения.
+#
+# Воркеры gthread: процессов WEB_WORKERS, в каждом WEB_THREADS потоков.
+# Процессы обходят GIL, потоки закрывают ожидание БД и диска. У каждого
+# воркера свои пул соединений, кэш в памяти, потоки фоновых задач и пул
+# хэширования паролей; общий кэш для всех — CACHE_URL (Redis).
+import subprocess
+import sys
+
+from config import Config
+from serve import run_migrations
+
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+worker_class = 'gthread'
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+keepalive = 5
+# воркер перезапускается после стольких запросов (разброс — чтобы не все сразу)
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = Config.WEB_MAX_REQUESTS // 10
+preload_app = Config.WEB_PRELOAD
+
+
+def on_starting(server):
+    # до запуска воркеров; при ошибке миграции сервер не стартует
+    if Config.WEB_MIGRATE:
+        run_migrations()
+
+
+def on_reload(server):
+    # kill -HUP: схема под новый код до того, как его загрузят новые воркеры
+    if not Config.WEB_MIGRATE:
+        return
+    try:
+        run_migrations()
+    except subprocess.CalledProcessError:
+        server.log.exception('Миграции при перезагрузке не применились')
+
+
+def worker_exit(server, worker):
+    # дождаться начатых фоновых задач, остановить проверку реплик
+    # и закрыть пул хэширования паролей
+    app = sys.modules.get('app')
+    if app is not None:
+        app.task_queue.stop()
+        app.replica_router.stop()
+        app.hasher.shutdown()
@@ -0,0 +1,150 @@
+# importer.py
+# Разбор файлов с вакансиями для массового импорта: CSV (как сохраняет
+# Excel — с ";" или "," и BOM) и JSON Lines (объект на строку).
+# Файл читается потоком, строка за строкой, без загрузки целиком в память;
+# вставкой в базу пачками занимается import_jobs() в app.py.
+import codecs
+import csv
+import io
+import itertools
+import json
+import math
+import os
+
+FIELDS = ('title', 'description', 'city', 'specialization', 'wage', 'pay_type',
+          'duration_days')
+PAY_TYPES = ('shift', 'hourly')
+FORMATS = ('csv', 'jsonl')
+
+# заголовки, которые встречаются в таблицах работодателей
+HEADER_ALIASES = {
+    'название': 'title', 'вакансия': 'title', 'должность': 'title',
+    'описание': 'description',
+    'город': 'city',
+    'специализация': 'specialization',
+    'ставка': 'wage', 'оплата': 'wage', 'зарплата': 'wage',
+    'тип оплаты': 'pay_type',
+    'срок': 'duration_days', 'дней': 'duration_days', 'срок (дней)': 'duration_days',
+}
+PAY_TYPE_ALIASES = {
+    'за смену': 'shift', 'смена': 'shift',
+    'почасовая': 'hourly', 'почасово': 'hourly', 'в час': 'hourly',
+}
+MAX_LENGTHS = {'title': 200, 'city': 120, 'specialization': 120}
+# верхние пределы чисел: больше — явная ошибка в таблице, а в базе
+# (INTEGER, numeric) такое значение ещё и не помещается
+MAX_VALUES = {'wage': 10 ** 9, 'duration_days': 3650}
+
+
+def detect_format(filename):
+    """Формат по расширению файла: csv, jsonl (.json/.ndjson тоже) или None."""
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext in ('.csv', '.txt'):
+        return 'csv'
+    if ext in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    return None
+
+
+def _text_stream(stream):
+    # utf-8-sig срезает BOM, который Excel пишет в начало CSV
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return codecs.getreader('utf-8-sig')(stream, errors='strict')
+
+
+def _field_name(header):
+    name = ' '.join((header or '').split()).lower()
+    return HEADER_ALIASES.get(name, name)
+
+
+def read_csv(stream):
+    """(номер строки, dict) для каждой строки CSV после заголовка."""
+    lines = iter(_text_stream(stream))
+    first = next(lines, '')
+    delimiter = ';' if first.count(';') > first.count(',') else ','
+    reader = csv.reader(itertools.chain([first], lines), delimiter=delimiter)
+    header = [_field_name(h) for h in next(reader, [])]
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        yield reader.line_num, dict(zip(header, row))
+
+
+def read_jsonl(stream):
+    """(номер строки, dict) для каждой непустой строки JSON Lines."""
+    for line_no, line in enumerate(_text_stream(stream), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_no, None
+            continue
+        if isinstance(data, dict):
+            data = {_field_name(k): v for k, v in data.items()}
+        yield line_no, data
+
+
+def read_rows(stream, fmt):
+    if fmt == 'csv':
+        return read_csv(stream)
+    if fmt == 'jsonl':
+        return read_jsonl(stream)
+    raise ValueError(f'неизвестный формат: {fmt}')
+
+
+def _text(raw, name):
+    value = raw.get(name)
+    value = '' if value is None else str(value).strip()
+    limit = MAX_LENGTHS.get(name)
+    if limit and len(value) > limit:
+        raise ValueError(f'{name}: длиннее {limit} символов')
+    return value
+
+
+def _number(raw, name, cast, default):
+    value = raw.get(name)
+    if value is None or str(value).strip() == '':
+        return default
+    try:
+        # "1 500,50" из русской таблицы -> 1500.50
+        number = cast(str(value).replace('\xa0', '').replace(' ', '').replace(',', '.'))
+    except ValueError:
+        raise ValueError(f'{name}: не число ({value!r})') from None
+    # float() понимает "nan" и "inf" — в базе это NULL или бесконечная ставка
+    if not math.isfinite(number):
+        raise ValueError(f'{name}: не число ({value!r})')
+    limit = MAX_VALUES.get(name)
+    if limit is not None and number > limit:
+        raise ValueError(f'{name}: больше {limit}')
+    return number
+
+
+def clean_row(raw):
+    """Проверенная строка с полями FIELDS; ошибка — ValueError с текстом."""
+    if not isinstance(raw, dict):
+        raise ValueError('строка не разбирается как объект')
+    title = _text(raw, 'title')
+    if not title:
+        raise ValueError('title: не указано название')
+    wage = _number(raw, 'wage', float, 0.0)
+    if wage < 0:
+        raise ValueError('wage: отрицательная ставка')
+    duration_days = _number(raw, 'duration_days', int, 1)
+    if duration_days < 1:
+        raise ValueError('duration_days: должно быть не меньше 1')
+    pay_type = _text(raw, 'pay_type').lower() or 'shift'
+    pay_type = PAY_TYPE_ALIASES.get(pay_type, pay_type)
+    if pay_type not in PAY_TYPES:
+        raise ValueError(f'pay_type: ожидается {" или ".join(PAY_TYPES)}')
+    return dict(
+        title=title,
+        description=_text(raw, 'description'),
+        city=_text(raw, 'city'),
+        specialization=_text(raw, 'specialization'),
+        wage=wage,
+        pay_type=pay_type,
+        duration_days=duration_days,
+    )
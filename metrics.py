@@ -0,0 +1,236 @@
+# metrics.py
+# Метрики запросов в формате Prometheus (/metrics) и лог медленных SQL.
+#
+# Считаются в памяти процесса: при нескольких воркерах каждый отдаёт свои
+# значения, Prometheus собирает их по отдельности (instance) и суммирует.
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+slow_query_log = logging.getLogger('tj.sql.slow')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.doc}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labels, values)} {total}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # значения меток -> [счётчики корзин..., сумма, количество]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.doc}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                bounds = [f'le="{bound}"' for bound in self.buckets] + ['le="+Inf"']
+                counts = series[:len(self.buckets)] + [series[-1]]
+                for bound, count in zip(bounds, counts):
+                    lines.append(f'{self.name}_bucket{_labels(self.labels, values, bound)} {count}')
+                lines.append(f'{self.name}_sum{_labels(self.labels, values)} {series[-2]:.6f}')
+                lines.append(f'{self.name}_count{_labels(self.labels, values)} {series[-1]}')
+        return lines
+
+
+class Metrics:
+    """Расширение Flask: время ответа по endpoint, число и время SQL-запросов,
+    время рендеринга шаблонов, лог медленных запросов, /metrics и профилировщик
+    по запросу (?_profile=1 при PROFILER_ENABLED)."""
+
+    def __init__(self, app=None):
+        self.requests = Histogram(
+            'tj_http_request_duration_seconds', 'Время обработки запроса',
+            ('endpoint', 'method', 'status'))
+        self.request_queries = Histogram(
+            'tj_http_request_sql_queries', 'SQL-запросов на один HTTP-запрос',
+            ('endpoint',), COUNT_BUCKETS)
+        self.queries = Histogram(
+            'tj_sql_query_duration_seconds', 'Время выполнения SQL-запроса',
+            ('endpoint',), SQL_BUCKETS)
+        self.slow_queries = Counter(
+            'tj_sql_slow_queries_total', 'SQL-запросы дольше SLOW_QUERY_MS', ('endpoint',))
+        self.templates = Histogram(
+            'tj_template_render_seconds', 'Время рендеринга шаблона', ('template',))
+        self._collectors = []
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def add_collector(self, fn):
+        """fn() -> список строк в формате Prometheus, добавляется к /metrics."""
+        self._collectors.append(fn)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_MS', 200)
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.config.setdefault('PROFILER_ENABLED', False)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if not self._listening:
+            # слушатели на все движки процесса — одни на все приложения
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._listening = True
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    # --- HTTP ---
+
+    @staticmethod
+    def _endpoint():
+        if has_request_context():
+            return request.endpoint or 'unknown'
+        return 'none'
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+        if current_app.config['PROFILER_ENABLED'] and request.args.get('_profile'):
+            if Profiler is not None:
+                g._metrics_profiler = Profiler(interval=0.001)
+                g._metrics_profiler.start()
+            else:
+                g._metrics_profiler = cProfile.Profile()
+                g._metrics_profiler.enable()
+
+    def _after_request(self, response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            endpoint = self._endpoint()
+            self.requests.observe(time.perf_counter() - start,
+                                  endpoint, request.method, response.status_code)
+            # g.query_count ведёт count_query в app.py (он же X-Query-Count)
+            self.request_queries.observe(g.get('query_count', 0), endpoint)
+        profiler = g.pop('_metrics_profiler', None)
+        if profiler is not None:
+            response = self._profile_response(profiler)
+        return response
+
+    def _teardown_request(self, exc):
+        # view упал и after_request не вызывался — профилировщик надо остановить
+        profiler = g.pop('_metrics_profiler', None)
+        if profiler is not None:
+            if Profiler is not None and isinstance(profiler, Profiler):
+                profiler.stop()
+            else:
+                profiler.disable()
+
+    def _profile_response(self, profiler):
+        if Profiler is not None and isinstance(profiler, Profiler):
+            profiler.stop()
+            return current_app.response_class(profiler.output_html(), mimetype='text/html')
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(40)
+        return current_app.response_class(out.getvalue(), mimetype='text/plain')
+
+    # --- SQL ---
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context,
+                               executemany):
+        conn.info.setdefault('_metrics_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context,
+                              executemany):
+        stack = conn.info.get('_metrics_query_start')
+        if not stack:
+            return
+        duration = time.perf_counter() - stack.pop()
+        endpoint = self._endpoint()
+        self.queries.observe(duration, endpoint)
+        threshold = current_app.config['SLOW_QUERY_MS'] if has_app_context() else None
+        if threshold and duration * 1000 >= threshold:
+            self.slow_queries.inc(endpoint)
+            # параметры не пишем: в них бывают персональные данные
+            slow_query_log.warning('%.1f мс [%s] %s', duration * 1000, endpoint,
+                                   ' '.join(statement.split())[:1000])
+
+    # --- шаблоны ---
+
+    def _before_render(self, sender, template, context, **extra):
+        if has_request_context():
+            g.setdefault('_metrics_templates', []).append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        stack = g.get('_metrics_templates') if has_request_context() else None
+        if stack:
+            self.templates.observe(time.perf_counter() - stack.pop(),
+                                   template.name or 'string')
+
+    # --- /metrics ---
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.request_queries, self.queries,
+                       self.slow_queries, self.templates):
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    def view(self):
+        token = current_app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return current_app.response_class('forbidden\n', status=403, mimetype='text/plain')
+        return current_app.response_class(self.render(),
+                                          mimetype='text/plain; version=0.0.4')
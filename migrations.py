@@ -0,0 +1,179 @@
+# migrations.py
+# Версионные миграции схемы. Применённые версии хранятся в schema_version.
+#
+# Новая (пустая) база создаётся сразу по моделям, и все миграции помечаются
+# применёнными. Для существующей базы выполняются только недостающие шаги,
+# по порядку. Новый шаг — функция с декоратором @migration(<следующий номер>).
+import datetime
+
+from sqlalchemy import inspect, text
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+# ---------- вспомогательные операции (идемпотентные) ----------
+
+def has_column(conn, table, column):
+    return column in {c['name'] for c in inspect(conn).get_columns(table)}
+
+
+def has_index(conn, table, name):
+    return name in {i['name'] for i in inspect(conn).get_indexes(table)}
+
+
+def add_column(conn, table, column, ddl):
+    if not has_column(conn, table, column):
+        conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {ddl}'))
+
+
+def create_index(conn, name, table, *columns, unique=False):
+    if not has_index(conn, table, name):
+        conn.execute(text(
+            f'CREATE {"UNIQUE " if unique else ""}INDEX "{name}" '
+            f'ON "{table}" ({", ".join(columns)})'
+        ))
+
+
+# ---------- миграции ----------
+
+@migration(1, 'счётчики вакансий и откликов в user')
+def add_user_counters(conn):
+    for column in ('jobs_count', 'applications_count', 'responses_count'):
+        add_column(conn, 'user', column, "INTEGER DEFAULT '0' NOT NULL")
+    conn.execute(text("""
+        UPDATE "user" SET
+            jobs_count = (SELECT count(*) FROM job WHERE job.employer_id = "user".id),
+            applications_count = (SELECT count(*) FROM application
+                                  WHERE application.worker_id = "user".id),
+            responses_count = (SELECT count(*) FROM application
+                               JOIN job ON application.job_id = job.id
+                               WHERE job.employer_id = "user".id)
+    """))
+
+
+@migration(2, 'created_at с микросекундами (sqlite)')
+def normalize_created_at(conn):
+    # строки, добавленные руками, хранят время без микросекунд, а SQLAlchemy
+    # сравнивает с '... .000000' — курсор (created_at, id) перескакивал их
+    if conn.dialect.name != 'sqlite':
+        return
+    for table in ('job', 'application'):
+        conn.execute(text(
+            f"UPDATE {table} SET created_at = created_at || '.000000' "
+            f"WHERE length(created_at) = 19"
+        ))
+
+
+@migration(3, 'индексы под фильтры и сортировки страниц')
+def add_hot_indexes(conn):
+    create_index(conn, 'ix_job_status_created_id', 'job', 'status', 'created_at', 'id')
+    create_index(conn, 'ix_job_employer_created', 'job', 'employer_id', 'created_at')
+    create_index(conn, 'ix_user_role', 'user', 'role')
+    create_index(conn, 'ix_application_worker_created', 'application',
+                 'worker_id', 'created_at')
+
+
+@migration(4, 'версия вакансии для оптимистичной блокировки')
+def add_job_version(conn):
+    add_column(conn, 'job', 'version', "INTEGER DEFAULT '1' NOT NULL")
+
+
+@migration(5, 'индексы фильтров ленты и таблица счётчиков job_facet')
+def add_job_filters(conn):
+    create_index(conn, 'ix_job_status_city_created', 'job', 'status', 'city', 'created_at', 'id')
+    create_index(conn, 'ix_job_status_spec_created', 'job',
+                 'status', 'specialization', 'created_at', 'id')
+    create_index(conn, 'ix_job_status_wage', 'job', 'status', 'wage')
+    if not inspect(conn).has_table('job_facet'):
+        conn.execute(text(
+            'CREATE TABLE job_facet (facet VARCHAR(20) NOT NULL, value VARCHAR(120) NOT NULL, '
+            'count INTEGER NOT NULL, PRIMARY KEY (facet, value))'
+        ))
+    conn.execute(text('DELETE FROM job_facet'))
+    for facet in ('city', 'specialization'):
+        conn.execute(text(
+            f"INSERT INTO job_facet (facet, value, count) "
+            f"SELECT '{facet}', {facet}, count(*) FROM job "
+            f"WHERE status = 'approved' AND {facet} IS NOT NULL AND {facet} <> '' "
+            f"GROUP BY {facet}"
+        ))
+
+
+@migration(6, 'ключ идемпотентности отклика')
+def add_application_idempotency_key(conn):
+    add_column(conn, 'application', 'idempotency_key', 'VARCHAR(64)')
+
+
+@migration(7, 'счётчики откликов вакансии по статусам')
+def add_job_application_counters(conn):
+    for status in ('applied', 'accepted', 'rejected'):
+        add_column(conn, 'job', f'{status}_count', "INTEGER DEFAULT '0' NOT NULL")
+        conn.execute(text(f"""
+            UPDATE job SET {status}_count = (
+                SELECT count(*) FROM application
+                WHERE application.job_id = job.id AND application.status = '{status}')
+        """))
+    create_index(conn, 'ix_application_job_status_created', 'application',
+                 'job_id', 'status', 'created_at', 'id')
+
+
+# ---------- запуск ----------
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_version ('
+        'version INTEGER PRIMARY KEY, description VARCHAR(255), applied_at VARCHAR(32))'
+    ))
+
+
+def applied_versions(conn):
+    _ensure_version_table(conn)
+    return {row[0] for row in conn.execute(text('SELECT version FROM schema_version'))}
+
+
+def _mark_applied(conn, version, description):
+    conn.execute(
+        text('INSERT INTO schema_version (version, description, applied_at) '
+             'VALUES (:v, :d, :t)'),
+        {'v': version, 'd': description,
+         't': datetime.datetime.utcnow().isoformat(timespec='seconds')}
+    )
+
+
+def upgrade(db):
+    """Приводит схему к текущей версии. Возвращает список применённых шагов."""
+    engine = db.engine
+    fresh = not inspect(engine).has_table('user')
+    if fresh:
+        db.metadata.create_all(engine)
+
+    done = []
+    with engine.begin() as conn:
+        applied = applied_versions(conn)
+    for version, description, fn in MIGRATIONS:
+        if version in applied:
+            continue
+        # каждая миграция — отдельная транзакция вместе с отметкой о ней
+        with engine.begin() as conn:
+            if not fresh:
+                fn(conn)
+            _mark_applied(conn, version, description)
+        done.append((version, description))
+
+    # таблицы, появившиеся в моделях без отдельной миграции
+    db.metadata.create_all(engine)
+    return done
+
+
+def status(db):
+    with db.engine.begin() as conn:
+        applied = applied_versions(conn)
+    return [(v, d, v in applied) for v, d, _ in MIGRATIONS]
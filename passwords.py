@@ -0,0 +1,113 @@
+# passwords.py
+# Хэширование паролей в отдельном пуле процессов и ограничение частоты
+# попыток входа: всплеск логинов не должен занимать весь CPU веб-воркера.
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Очередь на хэширование переполнена или пул не ответил за timeout."""
+
+
+class PasswordHasher:
+    """Хэширует и проверяет пароли в ProcessPoolExecutor.
+
+    method — строка метода werkzeug вместе с параметрами, например
+    'pbkdf2:sha256:600000' или 'scrypt:32768:8:1'. Хэши, сделанные другим
+    методом, считаются устаревшими (needs_rehash) и пересчитываются при
+    входе. workers=0 — считать прямо в потоке запроса.
+    """
+
+    def __init__(self, method='pbkdf2:sha256:600000', workers=2, max_pending=32,
+                 timeout=10):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._prefixes = {}  # method -> как werkzeug пишет его в хэш
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Настройки из PASSWORD_HASH_* приложения."""
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self._slots = threading.BoundedSemaphore(app.config['PASSWORD_HASH_MAX_PENDING'])
+
+    def _executor(self):
+        if self.workers <= 0:
+            return None
+        # после fork (gunicorn и т.п.) у каждого процесса свой пул
+        if self._pool is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _run(self, fn, *args):
+        executor = self._executor()
+        if executor is None:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            return executor.submit(fn, *args).result(timeout=self.timeout)
+        except TimeoutError:
+            raise HasherBusy() from None
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        # 'scrypt' или 'pbkdf2:sha256' werkzeug дополняет параметрами по
+        # умолчанию, поэтому префикс берётся из настоящего хэша
+        prefix = self._prefixes.get(self.method)
+        if prefix is None:
+            prefix = self._prefixes[self.method] = self.hash('').split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != prefix
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+class RateLimiter:
+    """Счётчик попыток в фиксированном окне, в памяти процесса."""
+
+    def __init__(self, window=60):
+        self.window = window
+        self._hits = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.window = app.config['AUTH_LIMIT_WINDOW']
+
+    def hit(self, key, limit):
+        """Учитывает попытку; False — лимит для key в этом окне исчерпан."""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._hits) > 10000:
+                self._hits = {k: v for k, v in self._hits.items()
+                              if now - v[0] < self.window}
+            start, count = self._hits.get(key, (now, 0))
+            if now - start >= self.window:
+                start, count = now, 0
+            count += 1
+            self._hits[key] = (start, count)
+            return count <= limit
+
+    def reset(self):
+        with self._lock:
+            self._hits.clear()
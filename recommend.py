@@ -0,0 +1,380 @@
+# recommend.py
+# Подбор вакансий соискателю: оценка пар (соискатель, вакансия) по признакам
+# и top-N лучших вакансий на каждого. Считается пачками в NumPy; модуль
+# ничего не знает о базе — данные загружает и результат сохраняет app.py.
+#
+# Оценка = предпочтения соискателя к группе вакансии + бонус самой вакансии:
+#   город, специализация, тип оплаты — доли в истории откликов соискателя
+#     (и совпадение специализации со словами из «Образование / о себе»);
+#   уровень оплаты (нижняя/средняя/верхняя треть внутри типа оплаты) —
+#     по опыту (exp_years) и рейтингу: опытным — дорогие смены;
+#   бонус вакансии — оплата относительно медианы и свежесть.
+# Первая часть зависит только от группы (город, специализация, тип, уровень),
+# поэтому для каждого соискателя сначала выбираются лучшие группы, и только
+# внутри них — лучшие вакансии; вакансий в расчёте 100k, групп — тысячи.
+#
+# NumPy — необязательная зависимость: без неё available() == False,
+# рекомендации не пересчитываются (готовые списки продолжают показываться).
+import io
+import math
+import os
+import tempfile
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from search import tokenize
+
+# веса признаков (в единицах оценки)
+WEIGHTS = dict(city=3.0, specialization=2.0, education=1.5, pay_type=0.5,
+               level=1.0, wage=1.0, fresh=1.0)
+# за сколько дней бонус свежести падает в e раз
+FRESH_DAYS = 14
+# уровней оплаты внутри типа оплаты
+LEVELS = 3
+# различных городов/специализаций в модели; редкие значения идут в общую
+# последнюю колонку без предпочтений
+VOCAB_SIZE = 512
+PAY_TYPES = ('shift', 'hourly')
+# соискателей в одной пачке расчёта
+BLOCK = 512
+
+
+def available():
+    return np is not None
+
+
+def _vocab(values, limit=VOCAB_SIZE):
+    """Самые частые значения (без пустых), по убыванию частоты."""
+    counts = {}
+    for value in values:
+        if value:
+            counts[value] = counts.get(value, 0) + 1
+    return sorted(counts, key=lambda v: (-counts[v], v))[:limit]
+
+
+def _codes(values, index):
+    """Коды значений по словарю index; неизвестные — len(index)."""
+    unknown = len(index)
+    return np.fromiter((index.get(v, unknown) for v in values), dtype=np.int32,
+                       count=len(values))
+
+
+def _csr(rows, codes, weights, n_rows, width):
+    """Разреженная матрица (indptr, codes, weights) с суммой повторов."""
+    key = rows.astype(np.int64) * width + codes
+    uniq, inverse = np.unique(key, return_inverse=True)
+    summed = np.bincount(inverse, weights=weights).astype(np.float32)
+    uniq_rows = uniq // width
+    indptr = np.searchsorted(uniq_rows, np.arange(n_rows + 1)).astype(np.int64)
+    return indptr, (uniq % width).astype(np.int32), summed
+
+
+def _dense_block(csr, start, stop, width):
+    indptr, codes, weights = csr
+    lo, hi = indptr[start], indptr[stop]
+    block = np.zeros((stop - start, width), dtype=np.float32)
+    rows = np.repeat(np.arange(stop - start), np.diff(indptr[start:stop + 1]))
+    block[rows, codes[lo:hi]] = weights[lo:hi]
+    return block
+
+
+def _column(csr, code, n_rows):
+    """Одна колонка разреженной матрицы — вектор по всем строкам."""
+    indptr, codes, weights = csr
+    column = np.zeros(n_rows, dtype=np.float32)
+    hit = np.flatnonzero(codes == code)
+    if len(hit):
+        column[np.searchsorted(indptr, hit, side='right') - 1] = weights[hit]
+    return column
+
+
+class Jobs:
+    """Вакансии в виде массивов признаков (коды по словарям модели)."""
+
+    def __init__(self, model, ids, cities, specializations, pay_types, wages, ages):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.city = _codes(cities, model.city_index)
+        self.spec = _codes(specializations, model.spec_index)
+        self.pay = _codes(pay_types, model.pay_index)
+        wages = np.asarray([w or 0 for w in wages], dtype=np.float64)
+        self.level = np.zeros(len(self.ids), dtype=np.int32)
+        median = np.ones(len(self.ids))
+        for code in range(len(PAY_TYPES) + 1):
+            mask = self.pay == code
+            self.level[mask] = np.searchsorted(model.wage_edges[code], wages[mask], side='right')
+            median[mask] = model.wage_median[code]
+        ratio = np.clip(wages / np.maximum(median, 1), 0.25, 4)
+        ages = np.maximum(np.asarray(ages, dtype=np.float64), 0)
+        self.bonus = (WEIGHTS['wage'] * np.log2(ratio) / 2
+                      + WEIGHTS['fresh'] * np.exp(-ages / FRESH_DAYS)).astype(np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class Model:
+    """Признаки соискателей и словари, по которым кодируются вакансии.
+
+    Строится по всем опубликованным вакансиям и истории откликов
+    (build), сохраняется в .npz — по нему оцениваются только что
+    опубликованные вакансии без перечитывания всей истории.
+    """
+
+    def __init__(self, cities, specializations, wage_edges, wage_median, worker_ids,
+                 city_pref, spec_pref, pay_pref, level_pref):
+        self.cities = list(cities)
+        self.specializations = list(specializations)
+        self.city_index = {v: i for i, v in enumerate(self.cities)}
+        self.spec_index = {v: i for i, v in enumerate(self.specializations)}
+        self.pay_index = {v: i for i, v in enumerate(PAY_TYPES)}
+        self.wage_edges = wage_edges      # (типов оплаты + 1, LEVELS - 1)
+        self.wage_median = wage_median    # (типов оплаты + 1,)
+        self.worker_ids = worker_ids      # по возрастанию
+        self.city_pref = city_pref        # разреженные (indptr, codes, weights)
+        self.spec_pref = spec_pref
+        self.pay_pref = pay_pref          # (соискателей, типов оплаты + 1)
+        self.level_pref = level_pref      # (соискателей, LEVELS)
+
+    @classmethod
+    def build(cls, job_cities, job_specializations, job_pay_types, job_wages,
+              workers, history):
+        """job_* — признаки опубликованных вакансий (для словарей и уровней
+        оплаты); workers — (id, образование, опыт, рейтинг);
+        history — (worker_id, город, специализация, тип оплаты) откликов."""
+        cities = _vocab(list(job_cities) + [h[1] for h in history])
+        specializations = _vocab(list(job_specializations) + [h[2] for h in history])
+
+        pay = _codes(job_pay_types, {v: i for i, v in enumerate(PAY_TYPES)})
+        wages = np.asarray([w or 0 for w in job_wages], dtype=np.float64)
+        quantiles = np.linspace(0, 1, LEVELS + 1)[1:-1]
+        wage_edges = np.zeros((len(PAY_TYPES) + 1, LEVELS - 1))
+        wage_median = np.ones(len(PAY_TYPES) + 1)
+        for code in range(len(PAY_TYPES) + 1):
+            sample = wages[pay == code] if (pay == code).any() else wages
+            if len(sample):
+                wage_edges[code] = np.quantile(sample, quantiles)
+                wage_median[code] = max(np.median(sample), 1)
+
+        workers = sorted(workers, key=lambda w: w[0])
+        model = cls(cities, specializations, wage_edges, wage_median,
+                    np.asarray([w[0] for w in workers], dtype=np.int64),
+                    None, None, None, None)
+        model._build_workers(workers, history)
+        return model
+
+    def _build_workers(self, workers, history):
+        n = len(workers)
+        width_city = len(self.cities) + 1
+        width_spec = len(self.specializations) + 1
+        width_pay = len(PAY_TYPES) + 1
+
+        # отклики тех, кого нет среди workers, пропускаем
+        history_ids = np.fromiter((h[0] for h in history), dtype=np.int64, count=len(history))
+        rows = np.searchsorted(self.worker_ids, history_ids)
+        known = rows < n
+        known[known] = self.worker_ids[rows[known]] == history_ids[known]
+        rows = rows[known]
+        history = [h for h, k in zip(history, known.tolist()) if k]
+        # доля откликов соискателя в каждом городе / специализации / типе оплаты
+        share = 1.0 / np.maximum(np.bincount(rows, minlength=n), 1)[rows]
+
+        self.city_pref = _csr(rows, _codes([h[1] for h in history], self.city_index),
+                              WEIGHTS['city'] * share, n, width_city)
+
+        # специализации, слова которых встречаются в «Образование / о себе»
+        spec_by_stem = {}
+        for code, value in enumerate(self.specializations):
+            for word in tokenize(value):
+                spec_by_stem.setdefault(word, set()).add(code)
+        edu_rows, edu_codes = [], []
+        for row, worker in enumerate(workers):
+            matched = set()
+            for word in tokenize(worker[1]):
+                matched |= spec_by_stem.get(word, set())
+            edu_rows.extend([row] * len(matched))
+            edu_codes.extend(matched)
+        spec_codes = _codes([h[2] for h in history], self.spec_index)
+        self.spec_pref = _csr(
+            np.concatenate([rows, np.asarray(edu_rows, dtype=np.int64)]),
+            np.concatenate([spec_codes, np.asarray(edu_codes, dtype=np.int32)]),
+            np.concatenate([WEIGHTS['specialization'] * share,
+                            np.full(len(edu_rows), WEIGHTS['education'])]),
+            n, width_spec)
+
+        self.pay_pref = np.zeros((n, width_pay), dtype=np.float32)
+        pay_codes = _codes([h[3] for h in history], self.pay_index)
+        np.add.at(self.pay_pref, (rows, pay_codes), WEIGHTS['pay_type'] * share)
+
+        # желаемый уровень оплаты: 0 — новичок, LEVELS - 1 — опытный
+        exp = np.asarray([w[2] or 0 for w in workers], dtype=np.float32)
+        rating = np.asarray([w[3] or 0 for w in workers], dtype=np.float32)
+        target = (0.7 * np.clip(exp / 5, 0, 1) + 0.3 * np.clip(rating / 5, 0, 1)) * (LEVELS - 1)
+        distance = np.abs(np.arange(LEVELS, dtype=np.float32)[None, :] - target[:, None])
+        self.level_pref = WEIGHTS['level'] * (1 - distance / max(LEVELS - 1, 1))
+
+    def jobs(self, ids, cities, specializations, pay_types, wages, ages):
+        return Jobs(self, ids, cities, specializations, pay_types, wages, ages)
+
+    def __len__(self):
+        return len(self.worker_ids)
+
+    # --- расчёт ---
+
+    def top_n(self, jobs, n, exclude=None, block=BLOCK):
+        """Для каждого соискателя — до n лучших вакансий.
+
+        exclude — {worker_id: множество job_id}, которые не предлагать (уже
+        откликался). Отдаёт (worker_id, [job_id, ...], [оценка, ...])
+        по убыванию оценки.
+        """
+        exclude = exclude or {}
+        if not len(jobs) or not len(self):
+            for worker_id in self.worker_ids.tolist():
+                yield worker_id, [], []
+            return
+        width_city = len(self.cities) + 1
+        width_spec = len(self.specializations) + 1
+
+        # группы вакансий; внутри группы — по убыванию бонуса
+        key = ((jobs.city.astype(np.int64) * width_spec + jobs.spec)
+               * (len(PAY_TYPES) + 1) + jobs.pay) * LEVELS + jobs.level
+        groups, group_of = np.unique(key, return_inverse=True)
+        g_level = (groups % LEVELS).astype(np.int32)
+        g_pay = (groups // LEVELS % (len(PAY_TYPES) + 1)).astype(np.int32)
+        g_spec = (groups // LEVELS // (len(PAY_TYPES) + 1) % width_spec).astype(np.int32)
+        g_city = (groups // LEVELS // (len(PAY_TYPES) + 1) // width_spec).astype(np.int32)
+
+        # сколько кандидатов держать: n плюс запас на исключения
+        most_excluded = max((len(v) for v in exclude.values()), default=0)
+        depth = n + min(most_excluded, 4 * n)
+        order = np.lexsort((-jobs.bonus, group_of))
+        sorted_groups = group_of[order]
+        starts = np.searchsorted(sorted_groups, np.arange(len(groups)))
+        rank = np.arange(len(order)) - starts[sorted_groups]
+        keep = rank < depth
+        cand_job = np.full((len(groups), depth), -1, dtype=np.int64)
+        cand_bonus = np.full((len(groups), depth), -np.inf, dtype=np.float32)
+        cand_job[sorted_groups[keep], rank[keep]] = order[keep]
+        cand_bonus[sorted_groups[keep], rank[keep]] = jobs.bonus[order[keep]]
+        group_best = cand_bonus[:, 0]
+
+        top_groups = min(depth, len(groups))
+        for start in range(0, len(self), block):
+            stop = min(start + block, len(self))
+            score = (_dense_block(self.city_pref, start, stop, width_city)[:, g_city]
+                     + _dense_block(self.spec_pref, start, stop, width_spec)[:, g_spec]
+                     + self.pay_pref[start:stop][:, g_pay]
+                     + self.level_pref[start:stop][:, g_level])
+            # лучшая вакансия группы не выше score + group_best, поэтому
+            # top-N целиком лежит в top-N группах по этой границе
+            bound = score + group_best
+            if top_groups < len(groups):
+                best = np.argpartition(-bound, top_groups - 1, axis=1)[:, :top_groups]
+            else:
+                best = np.broadcast_to(np.arange(len(groups)), (stop - start, len(groups)))
+            total = (np.take_along_axis(score, best, axis=1)[:, :, None]
+                     + cand_bonus[best]).reshape(stop - start, -1)
+            candidates = cand_job[best].reshape(stop - start, -1)
+            k = min(depth, total.shape[1])
+            pick = np.argpartition(-total, k - 1, axis=1)[:, :k]
+            picked = np.take_along_axis(total, pick, axis=1)
+            pick = np.take_along_axis(pick, np.argsort(-picked, axis=1), axis=1)
+            job_rows = np.take_along_axis(candidates, pick, axis=1)
+            job_scores = np.round(np.take_along_axis(total, pick, axis=1).astype(np.float64), 4)
+            job_ids = np.where(job_rows >= 0, jobs.ids[job_rows], -1)
+
+            # пустые места и вакансии из exclude выкидываем, оставляем первые n
+            valid = (job_rows >= 0) & np.isfinite(job_scores)
+            worker_ids = self.worker_ids[start:stop].tolist()
+            skipped = [(i, job_id) for i, worker_id in enumerate(worker_ids)
+                       for job_id in exclude.get(worker_id, ())]
+            if skipped:
+                pairs = np.asarray(skipped, dtype=np.int64)
+                span = int(max(jobs.ids.max(), pairs[:, 1].max())) + 1
+                keys = np.arange(stop - start, dtype=np.int64)[:, None] * span + job_ids
+                valid &= ~np.isin(keys, pairs[:, 0] * span + pairs[:, 1])
+            valid &= np.cumsum(valid, axis=1) <= n
+
+            for i, worker_id in enumerate(worker_ids):
+                yield worker_id, job_ids[i][valid[i]].tolist(), job_scores[i][valid[i]].tolist()
+
+    def score(self, jobs):
+        """Оценки вакансий для всех соискателей модели: (соискателей, вакансий)."""
+        n = len(self)
+        result = np.empty((n, len(jobs)), dtype=np.float32)
+        for j in range(len(jobs)):
+            result[:, j] = (_column(self.city_pref, jobs.city[j], n)
+                            + _column(self.spec_pref, jobs.spec[j], n)
+                            + self.pay_pref[:, jobs.pay[j]]
+                            + self.level_pref[:, jobs.level[j]]
+                            + jobs.bonus[j])
+        return result
+
+    def better_than(self, jobs, thresholds):
+        """Вакансии, которые лучше последней в списке соискателя:
+        {worker_id: [(job_id, оценка), ...]}. thresholds — {worker_id:
+        оценка последней вакансии или None}; при None (список неполный),
+        как и без записи в thresholds, подходит любая."""
+        n = len(self)
+        limit = np.full(n, -np.inf, dtype=np.float32)
+        if thresholds:
+            ids = np.fromiter(thresholds, dtype=np.int64, count=len(thresholds))
+            values = np.asarray([-np.inf if v is None else v for v in thresholds.values()],
+                                dtype=np.float32)
+            rows = np.searchsorted(self.worker_ids, ids)
+            known = rows < n
+            known[known] = self.worker_ids[rows[known]] == ids[known]
+            limit[rows[known]] = values[known]
+        scores = self.score(jobs)
+        result = {}
+        for row, col in zip(*(a.tolist() for a in np.nonzero(scores > limit[:, None]))):
+            result.setdefault(int(self.worker_ids[row]), []).append(
+                (int(jobs.ids[col]), round(float(scores[row, col]), 4)))
+        return result
+
+    # --- хранение ---
+
+    def save(self, path):
+        """Атомарно записывает модель в path (.npz)."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez(buffer, cities=np.asarray(self.cities, dtype=str),
+                 specializations=np.asarray(self.specializations, dtype=str),
+                 wage_edges=self.wage_edges, wage_median=self.wage_median,
+                 worker_ids=self.worker_ids,
+                 city_indptr=self.city_pref[0], city_codes=self.city_pref[1],
+                 city_weights=self.city_pref[2],
+                 spec_indptr=self.spec_pref[0], spec_codes=self.spec_pref[1],
+                 spec_weights=self.spec_pref[2],
+                 pay_pref=self.pay_pref, level_pref=self.level_pref)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['cities'].tolist(), data['specializations'].tolist(),
+                       data['wage_edges'], data['wage_median'], data['worker_ids'],
+                       (data['city_indptr'], data['city_codes'], data['city_weights']),
+                       (data['spec_indptr'], data['spec_codes'], data['spec_weights']),
+                       data['pay_pref'], data['level_pref'])
+
+
+def merge(current, new, n):
+    """Сливает два списка (job_id, оценка) в top-n по убыванию оценки."""
+    best = {}
+    for job_id, score in list(current) + list(new):
+        if score > best.get(job_id, -math.inf):
+            best[job_id] = score
+    return sorted(best.items(), key=lambda item: -item[1])[:n]
@@ -0,0 +1,179 @@
+# replicas.py
+# Чтение с реплик: страницы, отмеченные @read_replica в app.py, выполняют
+# SELECT на одной из живых реплик, всё остальное (запись, CLI, фоновые
+# задачи, обычные view) — на основной базе.
+#
+# Отставание меряется по «пульсу»: раз в interval секунд строка
+# replica_heartbeat на основной базе получает текущее время, поток проверки
+# читает её с каждой реплики. Реплика, где пульс старше max_lag секунд или
+# которая не отвечает, из выбора исключается до следующей удачной проверки;
+# пока живых реплик нет, всё читается с основной.
+#
+# То, что кладётся в общий кэш (страницы для анонимов, счётчики главной),
+# читается с основной базы (use_primary): кэш живёт под версией, выданной
+# основной базой, и отставшая реплика не должна попасть в него.
+#
+# Стенд без настоящей репликации — копия основной sqlite, обновляемая
+# flask replica-copy <путь> (snapshot); PostgreSQL — обычная потоковая реплика.
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.sql.dml import UpdateBase
+
+log = logging.getLogger('tj.replicas')
+
+
+class RoutingSession(Session):
+    """Сессия db.session: выбирает реплику, если её назначил @read_replica
+    (g.db_replica). Запись (flush, INSERT/UPDATE/DELETE) всегда идёт на
+    основную базу, и после неё до конца запроса туда же идёт и чтение."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info['primary'] = True
+                if has_request_context():
+                    g.db_wrote = True
+            elif not self.info.get('primary') and has_request_context():
+                key = g.get('db_replica')
+                if key is not None:
+                    return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def use_primary():
+    """Внутри блока запросы идут на основную базу даже на странице
+    @read_replica — для всего, что потом кладётся в общий кэш."""
+    key = g.pop('db_replica', None) if has_request_context() else None
+    try:
+        yield
+    finally:
+        if key is not None:
+            g.db_replica = key
+
+
+class ReplicaRouter:
+    def __init__(self, db, heartbeat, keys=(), max_lag=10, interval=2, context=None):
+        self.db = db
+        self.heartbeat = heartbeat  # таблица (id, at) на основной базе
+        self.keys = list(keys)  # ключи реплик в SQLALCHEMY_BINDS
+        self.max_lag = max_lag
+        self.interval = interval
+        self.context = context  # app.app_context: движки Flask-SQLAlchemy
+        self.lag = {}  # ключ -> отставание в секундах, None — не ответила
+        self._healthy = []  # реплики, прошедшие последнюю проверку
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Реплики — все SQLALCHEMY_BINDS приложения, пороги — REPLICA_*."""
+        self.keys = list(app.config['SQLALCHEMY_BINDS'])
+        self.max_lag = app.config['REPLICA_MAX_LAG']
+        self.interval = app.config['REPLICA_CHECK_INTERVAL']
+        self.context = app.app_context
+
+    def choose(self):
+        """Ключ живой реплики или None — читать с основной базы."""
+        healthy = self._healthy
+        return random.choice(healthy) if healthy else None
+
+    # --- проверка ---
+
+    def beat(self, now):
+        """Обновляет пульс на основной базе; из нескольких процессов за
+        interval пишет только первый, остальным UPDATE ничего не меняет."""
+        table = self.heartbeat
+        with self.db.engine.begin() as conn:
+            changed = conn.execute(update(table)
+                                   .where(table.c.id == 1, table.c.at < now - self.interval / 2)
+                                   .values(at=now)).rowcount
+            if changed or conn.execute(select(table.c.id)).first() is not None:
+                return
+        try:
+            with self.db.engine.begin() as conn:
+                conn.execute(insert(table).values(id=1, at=now))
+        except IntegrityError:
+            pass  # строку только что вставил другой процесс
+
+    def measure(self, key, now):
+        try:
+            with self.db.engines[key].connect() as conn:
+                at = conn.execute(select(self.heartbeat.c.at)
+                                  .where(self.heartbeat.c.id == 1)).scalar()
+        except SQLAlchemyError as e:
+            log.warning('Реплика %s недоступна: %s', key, e.__class__.__name__)
+            return None
+        return now - at if at is not None else None
+
+    def check(self):
+        """Один круг: пульс на основной базе и отставание каждой реплики."""
+        now = time.time()
+        try:
+            self.beat(now)
+        except SQLAlchemyError:
+            log.exception('Не удалось обновить пульс реплик на основной базе')
+        healthy = []
+        for key in self.keys:
+            lag = self.lag[key] = self.measure(key, now)
+            if lag is not None and lag <= self.max_lag:
+                healthy.append(key)
+            elif key in self._healthy:
+                log.warning('Реплика %s: %s, читаем с основной базы', key,
+                            'нет ответа' if lag is None else f'отставание {lag:.1f} с')
+        self._healthy = healthy
+        return dict(self.lag)
+
+    # --- поток проверки ---
+
+    def _worker(self):
+        while not self._stop.is_set():
+            with self.context():
+                self.check()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Запускает поток проверки в этом процессе (после fork — заново)."""
+        if not self.keys or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # после fork унаследованный список не проверен этим процессом
+                self._healthy = []
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._worker, daemon=True,
+                                            name='tj-replicas')
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._pid = None
+
+
+def copy_sqlite(source, target):
+    """Снимок sqlite-базы source в target через backup API: файл target
+    обновляется на месте, открытые к нему соединения видят новые данные."""
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
@@ -0,0 +1,331 @@
+# search.py
+# Полнотекстовый поиск вакансий: индекс SQLite FTS5 + русский стеммер.
+# Если FTS5 недоступен (другая СУБД или sqlite без FTS5) — откат на ILIKE.
+import re
+from functools import lru_cache
+
+from sqlalchemy import text, func, literal_column, table, column, or_, bindparam
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_CYRILLIC_RE = re.compile(r'[а-яё]')
+
+# ---------- Стеммер (алгоритм Портера для русского языка, Snowball) ----------
+
+_VOWELS = 'аеиоуыэюя'
+
+_PERFECTIVE_GERUND_1 = ('вшись', 'вши', 'в')  # после а/я
+_PERFECTIVE_GERUND_2 = ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+_REFLEXIVE = ('ся', 'сь')
+_ADJECTIVE = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому',
+    'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+    'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+)
+_PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')  # после а/я
+_PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+_VERB_1 = (
+    'ете', 'йте', 'ешь', 'нно',
+    'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н',
+)  # после а/я
+_VERB_2 = (
+    'ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено',
+    'ует', 'уют', 'ены', 'ить', 'ыть', 'ишь',
+    'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю',
+)
+_NOUN = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях',
+    'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом',
+    'ах', 'ях', 'ию', 'ью', 'ия', 'ья',
+    'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я',
+)
+
+
+def _strip(rv, endings, after_a=False):
+    """Отрезает самое длинное подходящее окончание, либо возвращает None.
+    Окончания в кортежах уже упорядочены по убыванию длины."""
+    for ending in endings:
+        if rv.endswith(ending):
+            rest = rv[:-len(ending)]
+            if after_a and not (rest and rest[-1] in 'ая'):
+                continue
+            return rest
+    return None
+
+
+def _by_length(*groups):
+    return [tuple(sorted(g, key=len, reverse=True)) for g in groups]
+
+
+(_PERFECTIVE_GERUND_1, _PERFECTIVE_GERUND_2, _REFLEXIVE, _ADJECTIVE,
+ _PARTICIPLE_1, _PARTICIPLE_2, _VERB_1, _VERB_2, _NOUN) = _by_length(
+    _PERFECTIVE_GERUND_1, _PERFECTIVE_GERUND_2, _REFLEXIVE, _ADJECTIVE,
+    _PARTICIPLE_1, _PARTICIPLE_2, _VERB_1, _VERB_2, _NOUN)
+
+
+def _strip_group(rv, group_1, group_2):
+    res1 = _strip(rv, group_1, after_a=True)
+    res2 = _strip(rv, group_2)
+    if res1 is None:
+        return res2
+    if res2 is None:
+        return res1
+    # берём то окончание, которое длиннее
+    return min(res1, res2, key=len)
+
+
+def _r2_start(word):
+    def next_region(start):
+        for i in range(start + 1, len(word)):
+            if word[i - 1] in _VOWELS and word[i] not in _VOWELS:
+                return i + 1
+        return len(word)
+    return next_region(next_region(0))
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not _CYRILLIC_RE.search(word):
+        return word
+
+    for i, ch in enumerate(word):
+        if ch in _VOWELS:
+            break
+    else:
+        return word
+    prefix, rv = word[:i + 1], word[i + 1:]
+    r2 = max(_r2_start(word) - len(prefix), 0)
+
+    # шаг 1
+    res = _strip_group(rv, _PERFECTIVE_GERUND_1, _PERFECTIVE_GERUND_2)
+    if res is not None:
+        rv = res
+    else:
+        res = _strip(rv, _REFLEXIVE)
+        if res is not None:
+            rv = res
+        res = _strip(rv, _ADJECTIVE)
+        if res is not None:
+            rv = res
+            res = _strip_group(rv, _PARTICIPLE_1, _PARTICIPLE_2)
+            if res is not None:
+                rv = res
+        else:
+            res = _strip_group(rv, _VERB_1, _VERB_2)
+            if res is None:
+                res = _strip(rv, _NOUN)
+            if res is not None:
+                rv = res
+
+    # шаг 2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # шаг 3: словообразовательные окончания в R2
+    for ending in ('ость', 'ост'):
+        if rv.endswith(ending) and len(rv) - len(ending) >= r2:
+            rv = rv[:-len(ending)]
+            break
+
+    # шаг 4
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        for ending in ('ейше', 'ейш'):
+            if rv.endswith(ending):
+                rv = rv[:-len(ending)]
+                if rv.endswith('нн'):
+                    rv = rv[:-1]
+                break
+        else:
+            if rv.endswith('ь'):
+                rv = rv[:-1]
+
+    return prefix + rv
+
+
+def tokenize(value):
+    return [stem(w) for w in _WORD_RE.findall((value or '').lower())]
+
+
+def normalize(value):
+    return ' '.join(tokenize(value))
+
+
+# ---------- Индекс ----------
+
+class JobSearch:
+    """Поисковый индекс по опубликованным вакансиям.
+
+    В таблице job_search хранятся уже простеммированные title/city/
+    specialization/description, rowid совпадает с job.id. В индекс попадают
+    только вакансии со статусом approved.
+    """
+
+    TABLE = 'job_search'
+    COLUMNS = ('title', 'city', 'specialization', 'description')
+    # веса колонок для bm25: совпадение в названии важнее, чем в описании
+    WEIGHTS = (10.0, 3.0, 5.0, 1.0)
+
+    def __init__(self, db=None, model=None):
+        self.db = db
+        self.model = model
+        self._available = {}
+        self._fts = table(self.TABLE, column('rowid'))
+
+    # --- служебное ---
+
+    def _engine_key(self):
+        return str(self.db.engine.url)
+
+    def fts_supported(self):
+        engine = self.db.engine
+        if engine.dialect.name != 'sqlite':
+            return False
+        with engine.connect() as conn:
+            return bool(conn.execute(
+                text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            ).scalar())
+
+    def available(self):
+        """FTS5 поддерживается и индекс создан."""
+        key = self._engine_key()
+        if key not in self._available:
+            ok = self.fts_supported()
+            if ok:
+                with self.db.engine.connect() as conn:
+                    ok = conn.execute(
+                        text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                        {'name': self.TABLE}
+                    ).first() is not None
+            self._available[key] = ok
+        return self._available[key]
+
+    # --- построение и синхронизация ---
+
+    def create_index(self):
+        """Создаёт FTS-таблицу (если можно) и заполняет её. Возвращает True,
+        если полнотекстовый поиск включён."""
+        if not self.fts_supported():
+            self._available[self._engine_key()] = False
+            return False
+        exists = self.db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+            {'name': self.TABLE}
+        ).first() is not None
+        if not exists:
+            self.db.session.execute(text(
+                f"CREATE VIRTUAL TABLE {self.TABLE} USING fts5("
+                f"{', '.join(self.COLUMNS)}, "
+                f"tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+            self.db.session.commit()
+            self._available[self._engine_key()] = True
+            self.rebuild()
+        self._available[self._engine_key()] = True
+        return True
+
+    def _row(self, job):
+        return {
+            'rowid': job.id,
+            **{name: normalize(getattr(job, name)) for name in self.COLUMNS}
+        }
+
+    def _insert(self, rows):
+        self.db.session.execute(
+            text(f"INSERT INTO {self.TABLE} (rowid, {', '.join(self.COLUMNS)}) "
+                 f"VALUES (:rowid, {', '.join(':' + c for c in self.COLUMNS)})"),
+            rows
+        )
+
+    def rebuild(self, batch_size=1000):
+        """Полностью переиндексирует опубликованные вакансии."""
+        if not self.available():
+            return 0
+        Job = self.model
+        self.db.session.execute(text(f"DELETE FROM {self.TABLE}"))
+        total = 0
+        batch = []
+        query = (self.db.session.query(Job.id, *[getattr(Job, c) for c in self.COLUMNS])
+                 .filter(Job.status == 'approved')
+                 .execution_options(yield_per=batch_size))
+        for job in query:
+            batch.append(self._row(job))
+            if len(batch) >= batch_size:
+                self._insert(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            self._insert(batch)
+            total += len(batch)
+        self.db.session.commit()
+        return total
+
+    def sync(self, job):
+        """Приводит запись индекса в соответствие со статусом вакансии.
+        Вызывается до commit, в той же транзакции, что и изменение job."""
+        if not self.available():
+            return
+        if job.id is None:
+            self.db.session.flush()
+        self.db.session.execute(
+            text(f"DELETE FROM {self.TABLE} WHERE rowid = :id"), {'id': job.id}
+        )
+        if job.status == 'approved':
+            self._insert([self._row(job)])
+
+    def sync_ids(self, ids, batch_size=500):
+        """sync() для набора вакансий после массового UPDATE статусов:
+        записи перечитываются из базы пачками."""
+        if not self.available() or not ids:
+            return
+        Job = self.model
+        ids = list(ids)
+        delete = text(f"DELETE FROM {self.TABLE} WHERE rowid IN :ids") \
+            .bindparams(bindparam('ids', expanding=True))
+        for start in range(0, len(ids), batch_size):
+            part = ids[start:start + batch_size]
+            self.db.session.execute(delete, {'ids': part})
+            rows = (self.db.session.query(Job.id, *[getattr(Job, c) for c in self.COLUMNS])
+                    .filter(Job.id.in_(part), Job.status == 'approved'))
+            batch = [self._row(row) for row in rows]
+            if batch:
+                self._insert(batch)
+
+    # --- поиск ---
+
+    @staticmethod
+    def match_expression(term):
+        """Строка запроса FTS5: все слова обязательны, сравнение по префиксу
+        основы, чтобы «строит» находило «строительство»."""
+        tokens = [t for t in tokenize(term) if t]
+        return ' '.join(f'"{t}"*' for t in tokens)
+
+    def filter_ilike(self, query, term):
+        Job = self.model
+        like = f"%{term}%"
+        return query.filter(
+            or_(
+                Job.title.ilike(like),
+                Job.city.ilike(like),
+                Job.specialization.ilike(like),
+                Job.description.ilike(like)
+            )
+        ).order_by(Job.created_at.desc())
+
+    def filter_fts(self, query, term):
+        Job = self.model
+        expr = self.match_expression(term)
+        if not expr:
+            return query.filter(False)
+        fts = literal_column(self.TABLE)
+        return (query.join(self._fts, self._fts.c.rowid == Job.id)
+                     .filter(fts.op('MATCH')(expr))
+                     .order_by(func.bm25(fts, *self.WEIGHTS), Job.created_at.desc()))
+
+    def filter(self, query, term):
+        """Фильтрует query (по Job) поисковой строкой и сортирует по
+        релевантности; без FTS — старый поиск через ILIKE."""
+        if self.available():
+            return self.filter_fts(query, term)
+        return self.filter_ilike(query, term)
@@ -0,0 +1,63 @@
+# serve.py
+# Боевой запуск: python serve.py [параметры gunicorn]
+#
+# gunicorn с настройками из gunicorn.conf.py: WEB_WORKERS процессов, в каждом
+# WEB_THREADS потоков, миграции один раз в мастере до запуска воркеров.
+#   kill -HUP <pid мастера>   плавная перезагрузка: миграции, новые воркеры
+#                             с новым кодом, старые дорабатывают свои запросы
+#   kill -TERM <pid мастера>  плавная остановка
+#
+# Там, где gunicorn не работает (Windows), — многопоточный сервер werkzeug
+# в одном процессе, без отладчика. Для разработки — python app.py.
+#
+# Мастер приложение не импортирует (разве что WEB_PRELOAD=1), поэтому
+# после kill -HUP воркеры загружают код заново.
+import os
+import subprocess
+import sys
+
+from config import Config
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+GUNICORN_CONF = os.path.join(BASE_DIR, 'gunicorn.conf.py')
+
+
+def run_migrations():
+    """flask migrate в отдельном процессе: мастер не импортирует приложение."""
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'migrate'],
+                   cwd=BASE_DIR, check=True)
+
+
+def run_gunicorn(argv):
+    from gunicorn.app.wsgiapp import run
+    os.chdir(BASE_DIR)
+    sys.argv = ['gunicorn', '-c', GUNICORN_CONF, *argv, 'wsgi:app']
+    run()
+
+
+def run_werkzeug():
+    from werkzeug.serving import run_simple
+    if Config.WEB_MIGRATE:
+        run_migrations()
+    sys.path.insert(0, BASE_DIR)
+    from wsgi import app
+    host, port = Config.WEB_BIND.rsplit(':', 1)
+    print(f'gunicorn недоступен: один процесс werkzeug на http://{host}:{port}')
+    run_simple(host, int(port), app, threaded=True)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        import gunicorn  # noqa: F401
+        import fcntl  # noqa: F401 (на Windows gunicorn не работает)
+    except ImportError:
+        if argv:
+            sys.exit('Параметры командной строки передаются только gunicorn')
+        run_werkzeug()
+    else:
+        run_gunicorn(argv)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,8 +9,12 @@ def install_requirements():
         'Flask-Login==0.6.3',
         'psycopg2-binary==2.9.7',
         'Werkzeug==2.3.7',
-        'python-dotenv==1.0.0'
+        'python-dotenv==1.0.0',
+        'numpy==2.4.6'  # recommend.py: рекомендации
     ]
+    if sys.platform != 'win32':
+        # боевой сервер (serve.py); на Windows serve.py обходится werkzeug
+        packages.append('gunicorn==26.2.0')
     
     for package in packages:
         print(f"Устанавливаю {package}...")
@@ -0,0 +1,247 @@
+# tasks.py
+# Фоновые задачи: очередь в отдельном файле sqlite и пул потоков в процессе
+# приложения.
+#
+# Задача — зарегистрированная функция и JSON-сериализуемые аргументы.
+# Записи в очереди переживают перезапуск: поток берёт задачу «в аренду»
+# (locked_until); если процесс умер посреди выполнения, по истечении аренды
+# задачу возьмёт кто-то другой. Поэтому задачи должны быть идемпотентными —
+# выполнение «хотя бы один раз», а не «ровно один».
+#
+# Ошибка в задаче — повтор через backoff * 2^(попытка-1) секунд; после
+# max_attempts попыток задача помечается dead и ждёт retry_dead().
+# Один файл очереди могут разбирать несколько процессов (воркеры gunicorn,
+# flask run-tasks).
+import atexit
+import contextlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import traceback
+
+log = logging.getLogger('tj.tasks')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS task (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    locked_until REAL NOT NULL DEFAULT 0,
+    dead INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_task_ready ON task (dead, run_at);
+'''
+
+
+class TaskQueue:
+    def __init__(self, path=None, workers=2, max_attempts=5, backoff=5, max_backoff=3600,
+                 lease=300, poll_interval=1.0, context=None):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease  # секунд на выполнение, потом задачу возьмёт другой поток
+        self.poll_interval = poll_interval
+        self.context = context  # фабрика контекста вокруг задачи (app.app_context)
+        self.tasks = {}
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self._atexit = False
+
+    def init_app(self, app):
+        """Настройки из TASK_* приложения; задачи выполняются в его контексте."""
+        path = app.config['TASK_QUEUE_PATH']
+        if path != self.path:
+            # соединения потоков открыты к прежнему файлу
+            self.path = path
+            self._local = threading.local()
+            self._schema_ready = False
+        self.workers = app.config['TASK_WORKERS']
+        self.max_attempts = app.config['TASK_MAX_ATTEMPTS']
+        self.backoff = app.config['TASK_RETRY_BACKOFF']
+        self.context = app.app_context
+
+    # --- хранилище ---
+
+    def _conn(self):
+        # соединение на поток; после fork — новое
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    # --- постановка ---
+
+    def task(self, fn):
+        """Декоратор: регистрирует функцию как задачу (по имени функции)."""
+        self.tasks[fn.__name__] = fn
+        return fn
+
+    def enqueue(self, fn, *args, **kwargs):
+        self.enqueue_many([(fn, args, kwargs)])
+
+    def enqueue_many(self, items, delay=0):
+        """items — (функция или имя, args, kwargs); всё одной транзакцией."""
+        now = time.time()
+        rows = []
+        for fn, args, kwargs in items:
+            name = fn if isinstance(fn, str) else fn.__name__
+            if name not in self.tasks:
+                raise LookupError(f'Задача {name} не зарегистрирована')
+            rows.append((name, json.dumps([list(args), kwargs], ensure_ascii=False),
+                         now + delay, now))
+        if not rows:
+            return
+        with self._transaction() as conn:
+            conn.executemany('INSERT INTO task (name, payload, run_at, created_at) '
+                             'VALUES (?, ?, ?, ?)', rows)
+        with self._wakeup:
+            self._wakeup.notify(len(rows))
+
+    # --- выполнение ---
+
+    def _claim(self):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT id, name, payload, attempts FROM task '
+                'WHERE dead = 0 AND run_at <= ? AND locked_until <= ? '
+                'ORDER BY run_at, id LIMIT 1', (now, now)).fetchone()
+            if row is not None:
+                conn.execute('UPDATE task SET locked_until = ? WHERE id = ?',
+                             (now + self.lease, row[0]))
+        return row
+
+    def _run(self, row):
+        task_id, name, payload, attempts = row
+        try:
+            fn = self.tasks.get(name)
+            if fn is None:
+                raise LookupError(f'Задача {name} не зарегистрирована')
+            args, kwargs = json.loads(payload)
+            with self.context() if self.context else contextlib.nullcontext():
+                fn(*args, **kwargs)
+        except Exception:
+            self._failed(task_id, name, attempts + 1, traceback.format_exc())
+        else:
+            with self._transaction() as conn:
+                conn.execute('DELETE FROM task WHERE id = ?', (task_id,))
+
+    def _failed(self, task_id, name, attempts, error):
+        with self._transaction() as conn:
+            if attempts >= self.max_attempts:
+                conn.execute('UPDATE task SET attempts = ?, dead = 1, locked_until = 0, '
+                             'last_error = ? WHERE id = ?', (attempts, error, task_id))
+                log.error('Задача %s #%s не выполнена за %s попыток:\n%s',
+                          name, task_id, attempts, error)
+                return
+            # разброс ±20%, чтобы упавшие вместе задачи не повторялись залпом
+            delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+            delay *= random.uniform(0.8, 1.2)
+            conn.execute('UPDATE task SET attempts = ?, run_at = ?, locked_until = 0, '
+                         'last_error = ? WHERE id = ?',
+                         (attempts, time.time() + delay, error, task_id))
+        log.warning('Задача %s #%s: попытка %s не удалась, повтор через %.0f с',
+                    name, task_id, attempts, delay)
+
+    def run_pending(self):
+        """Выполняет готовые задачи в текущем потоке; возвращает их число."""
+        done = 0
+        while not self._stop.is_set():
+            row = self._claim()
+            if row is None:
+                break
+            self._run(row)
+            done += 1
+        return done
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_pending():
+                    continue
+            except sqlite3.Error:
+                log.exception('Ошибка очереди задач')
+            with self._wakeup:
+                self._wakeup.wait(self.poll_interval)
+
+    def work(self):
+        """Разбор очереди в текущем потоке до остановки (flask run-tasks)."""
+        self._stop.clear()
+        try:
+            self._worker()
+        except KeyboardInterrupt:
+            pass
+
+    # --- пул потоков ---
+
+    def start(self):
+        """Запускает потоки-обработчики (повторный вызов ничего не делает)."""
+        if self.workers <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._threads = [threading.Thread(target=self._worker, daemon=True,
+                                              name=f'tj-task-{i}')
+                             for i in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+            if not self._atexit:
+                atexit.register(self.stop)
+                self._atexit = True
+            self._pid = os.getpid()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+    # --- обслуживание ---
+
+    def stats(self):
+        counts = dict(self._conn().execute(
+            'SELECT dead, count(*) FROM task GROUP BY dead').fetchall())
+        return dict(queued=counts.get(0, 0), dead=counts.get(1, 0))
+
+    def retry_dead(self):
+        with self._transaction() as conn:
+            return conn.execute('UPDATE task SET dead = 0, attempts = 0, run_at = ? '
+                                'WHERE dead = 1', (time.time(),)).rowcount
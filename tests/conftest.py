@@ -0,0 +1,79 @@
+# tests/conftest.py
+# Приложение на временной sqlite-базе: create_app() с настройками поверх config.py.
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import app as tj  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    tmp = tempfile.mkdtemp(prefix='tj-tests-')
+    app = tj.create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'tests.db'),
+        'SQLALCHEMY_BINDS': {},
+        'CACHE_URL': None,
+        'PAGE_CACHE_VERSION_FILE': os.path.join(tmp, 'page-version'),
+        'TASK_QUEUE_PATH': os.path.join(tmp, 'tasks.db'),
+        'TASK_WORKERS': 0,
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'PASSWORD_HASH_WORKERS': 0,
+        'RECOMMEND_MODEL_PATH': os.path.join(tmp, 'recommend.npz'),
+        'AVATAR_CACHE_DIR': os.path.join(tmp, 'avatars'),
+        'AVATAR_UPLOAD_DIR': os.path.join(tmp, 'uploads'),
+        'QUERY_COUNT_HEADER': True,
+    })
+    with app.app_context():
+        tj.init_db()
+    return app
+
+
+PASSWORD = 'secret'
+
+
+@pytest.fixture
+def make_user(app):
+    """make_user(role, **поля) -> id нового пользователя с паролем PASSWORD."""
+    def make(role='worker', **fields):
+        with app.app_context():
+            number = tj.db.session.query(tj.db.func.max(tj.User.id)).scalar() or 0
+            user = tj.User(name=fields.pop('name', f'{role} {number + 1}'),
+                           email=f'{role}{number + 1}@test.local', role=role,
+                           password_hash=tj.hasher.hash(PASSWORD), **fields)
+            tj.db.session.add(user)
+            tj.db.session.commit()
+            return user.id
+    return make
+
+
+@pytest.fixture
+def login(app):
+    """login(user_id) -> test_client, вошедший под этим пользователем."""
+    def do_login(user_id):
+        with app.app_context():
+            email = tj.db.session.get(tj.User, user_id).email
+        client = app.test_client()
+        response = client.post('/login', data={'email': email, 'password': PASSWORD})
+        assert response.status_code == 302
+        return client
+    return do_login
+
+
+@pytest.fixture
+def make_job(app):
+    """make_job(employer_id, **поля) -> id вакансии (по умолчанию pending)."""
+    def make(employer_id, **fields):
+        with app.app_context():
+            job = tj.Job(employer_id=employer_id, title=fields.pop('title', 'Смена'),
+                         description=fields.pop('description', 'Описание'), **fields)
+            tj.db.session.add(job)
+            tj.db.session.commit()
+            return job.id
+    return make
@@ -0,0 +1,37 @@
+# tests/test_apply_race.py
+# Одновременные отклики одного соискателя на одну вакансию: ровно одна
+# строка и счётчики сдвинуты один раз. Замеры под нагрузкой —
+# bench/apply_race.py.
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import app as tj
+
+THREADS = 8
+
+
+def test_concurrent_add_application(app, make_user, make_job):
+    employer = make_user('employer')
+    worker = make_user('worker')
+    job_id = make_job(employer, status='approved')
+    barrier = threading.Barrier(THREADS)
+
+    def apply(n):
+        with app.app_context():
+            job = tj.db.session.get(tj.Job, job_id)
+            barrier.wait()
+            row, created = tj.add_application(job, worker, note=f'попытка {n}')
+            tj.db.session.commit()
+            return row.id, created
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(apply, range(THREADS)))
+
+    assert sum(created for _, created in results) == 1
+    assert len({application_id for application_id, _ in results}) == 1
+    with app.app_context():
+        assert tj.Application.query.filter_by(job_id=job_id, worker_id=worker).count() == 1
+        job = tj.db.session.get(tj.Job, job_id)
+        assert job.applied_count == 1
+        assert tj.db.session.get(tj.User, worker).applications_count == 1
+        assert tj.db.session.get(tj.User, employer).responses_count == 1
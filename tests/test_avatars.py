@@ -0,0 +1,27 @@
+# tests/test_avatars.py
+# Аватар из загруженного фото без Pillow: инициалы в SVG вместо 500.
+import os
+
+import avatars
+
+import app as tj
+
+
+def test_upload_without_pillow_falls_back_to_svg(app, make_user, monkeypatch):
+    user_id = make_user('worker', name='Анна Петрова', avatar_url='a' * 64 + '.png')
+    directory = app.config['AVATAR_UPLOAD_DIR']
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'a' * 64 + '.png'), 'wb') as f:
+        f.write(b'\x89PNG')
+    monkeypatch.setattr(avatars, 'Image', None)
+
+    client = app.test_client()
+    response = client.get(f'/avatar/{user_id}.png?s=64')
+    assert response.status_code == 302
+    assert f'/avatar/{user_id}.svg' in response.headers['Location']
+    response = client.get(response.headers['Location'])
+    assert response.status_code == 200
+    assert b'>\xd0\x90\xd0\x9f</text>' in response.data  # «АП»
+    with app.app_context():
+        assert avatars.thumbnail(os.path.join(directory, 'a' * 64 + '.png'), 64) is None
+        assert tj.avatar_cache.get(tj.avatar_cache.digest('upload', 'a' * 64 + '.png', 64)) is None
@@ -0,0 +1,51 @@
+# tests/test_import.py
+# Массовый импорт вакансий: проверка строк и вставка пачками.
+import io
+
+import importer
+
+import app as tj
+
+
+def upload(client, text, filename='jobs.csv'):
+    return client.post('/vacancies/import',
+                       data={'file': (io.BytesIO(text.encode('utf-8')), filename)})
+
+
+def employer_titles(app, employer_id):
+    with app.app_context():
+        return sorted(title for title, in tj.db.session.query(tj.Job.title)
+                      .filter_by(employer_id=employer_id))
+
+
+def test_bad_numbers_are_row_errors(app, make_user, login):
+    employer = make_user('employer')
+    csv_text = ('title;wage;duration_days\n'
+                'Нет ставки;nan;1\n'
+                'Бесконечная;inf;1\n'
+                'Длинная;100;99999999999999999999999\n'
+                'Дорогая;1e30;1\n'
+                'Нормальная;1 500,50;3\n')
+    response = upload(login(employer), csv_text)
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert 'wage: не число' in page
+    assert 'duration_days: больше 3650' in page
+    assert 'wage: больше 1000000000' in page
+    assert employer_titles(app, employer) == ['Нормальная']
+
+
+def test_chunk_falls_back_to_single_rows(app, make_user, login, monkeypatch):
+    # значение, которое проверка пропустила, а база не приняла
+    monkeypatch.setattr(importer, 'MAX_VALUES', {})
+    employer = make_user('employer')
+    csv_text = ('title;duration_days\n'
+                'Первая;1\n'
+                'Слишком длинная;99999999999999999999999\n'
+                'Третья;2\n')
+    response = upload(login(employer), csv_text)
+    assert response.status_code == 200
+    assert 'Строка не сохранена' in response.get_data(as_text=True)
+    assert employer_titles(app, employer) == ['Первая', 'Третья']
+    with app.app_context():
+        assert tj.db.session.get(tj.User, employer).jobs_count == 2
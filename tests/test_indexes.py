@@ -0,0 +1,16 @@
+# tests/test_indexes.py
+# Основные запросы страниц идут по индексам: ни одна таблица не читается
+# полным сканированием (то же, что flask check-indexes).
+import pytest
+
+import app as tj
+
+
+def test_view_queries_use_indexes(app):
+    with app.app_context():
+        if tj.db.engine.dialect.name != 'sqlite':
+            pytest.skip('EXPLAIN QUERY PLAN есть только в sqlite')
+        results = tj.explain_view_queries()
+    assert results
+    full_scans = {name: plan for name, plan, ok in results if not ok}
+    assert full_scans == {}
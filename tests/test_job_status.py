@@ -0,0 +1,33 @@
+# tests/test_job_status.py
+# Смена статуса вакансии модератором при одновременной правке.
+from sqlalchemy import update
+
+import app as tj
+
+
+def test_concurrent_status_change_is_reported(app, make_user, make_job, login, monkeypatch):
+    moderator = make_user('moderator')
+    job_id = make_job(make_user('employer'), status='pending')
+    with app.app_context():
+        version = tj.db.session.get(tj.Job, job_id).version
+    client = login(moderator)
+
+    # второй модератор успевает между чтением вакансии и её UPDATE
+    sync = tj.job_search.sync
+
+    def racing_sync(job):
+        with tj.db.engine.begin() as conn:
+            conn.execute(update(tj.Job).where(tj.Job.id == job_id)
+                         .values(status='rejected', version=tj.Job.version + 1))
+        return sync(job)
+
+    monkeypatch.setattr(tj.job_search, 'sync', racing_sync)
+    response = client.post(f'/manage/job/{job_id}/status/approve', data={'version': version})
+
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        messages = [message for _, message in session.get('_flashes', [])]
+    assert 'Вакансию уже изменили, пока страница была открыта' in messages
+    with app.app_context():
+        job = tj.db.session.get(tj.Job, job_id)
+        assert (job.status, job.version) == ('rejected', version + 1)
@@ -0,0 +1,36 @@
+# tests/test_moderation_api.py
+# Пакетная модерация через API: меняются только вакансии на модерации.
+import app as tj
+
+
+def job_statuses(app, ids):
+    with app.app_context():
+        return {job.id: job.status for job in tj.Job.query.filter(tj.Job.id.in_(ids))}
+
+
+def test_approves_pending_jobs(app, make_user, make_job, login):
+    employer = make_user('employer')
+    ids = [make_job(employer, status='pending') for _ in range(2)]
+    client = login(make_user('moderator'))
+    response = client.post('/api/v1/moderation/status', json={'ids': ids + [10 ** 9],
+                                                              'status': 'approved'})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert sorted(body['updated']) == ids
+    assert body['conflicts'] == [] and body['missing'] == [10 ** 9]
+    assert job_statuses(app, ids) == {i: 'approved' for i in ids}
+
+
+def test_not_pending_jobs_conflict(app, make_user, make_job, login):
+    employer = make_user('employer')
+    pending = make_job(employer, status='pending')
+    approved = make_job(employer, status='approved')
+    expired = make_job(employer, status='expired')
+    client = login(make_user('moderator'))
+    response = client.post('/api/v1/moderation/status', json={
+        'ids': [pending, approved, expired], 'status': 'rejected'})
+    assert response.status_code == 409
+    assert sorted(response.get_json()['ids']) == [approved, expired]
+    # пакет не применяется частично
+    assert job_statuses(app, [pending, approved, expired]) == {
+        pending: 'pending', approved: 'approved', expired: 'expired'}
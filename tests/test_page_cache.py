@@ -0,0 +1,24 @@
+# tests/test_page_cache.py
+# Версия кэша страниц без Redis общая для процессов: правка в одном
+# (например, flask run-tasks) сбрасывает страницы во всех воркерах.
+from cache import PageCache
+
+
+def test_version_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'cache' / 'page-version')
+    # у каждого процесса свой кэш в памяти, общий только файл версии
+    web, tasks = PageCache(version_path=path), PageCache(version_path=path)
+    version = web.version()
+    web.set(version, '/vacancies', 'старая страница')
+    assert tasks.version() == version
+
+    tasks.jobs_changed()
+    assert web.version() > version
+    assert web.get(web.version(), '/vacancies') is None
+
+
+def test_version_only_grows(tmp_path):
+    cache = PageCache(version_path=str(tmp_path / 'page-version'))
+    versions = [cache.jobs_changed() for _ in range(5)]
+    assert versions == sorted(set(versions))
+    assert cache.version() == versions[-1]
@@ -0,0 +1,30 @@
+# tests/test_pagination.py
+# Курсоры ленты вакансий: испорченный курсор открывает первую страницу.
+import pytest
+
+import app as tj
+
+
+@pytest.mark.parametrize('offset', ['9' * 30, '9' * 5000, '10001', '-5', '²'])
+def test_bad_search_cursor_starts_from_first_page(app, offset):
+    response = app.test_client().get('/vacancies', query_string={
+        'search': 'смена', 'cursor': tj.encode_cursor(offset)})
+    assert response.status_code == 200
+
+
+def test_search_cursor_stops_at_max_offset(app, make_user, make_job):
+    employer = make_user('employer')
+    for i in range(3):
+        make_job(employer, title=f'Курсор {i}', status='approved')
+    with app.test_request_context():
+        query = tj.Job.query.filter_by(employer_id=employer).order_by(tj.Job.id)
+        jobs, next_cursor = tj.paginate_jobs(query, None, ranked=True, per_page=2)
+        assert len(jobs) == 2 and tj.decode_cursor(next_cursor) == ['2']
+        app.config['SEARCH_MAX_OFFSET'] = 1
+        try:
+            jobs, next_cursor = tj.paginate_jobs(query, next_cursor, ranked=True, per_page=2)
+        finally:
+            app.config['SEARCH_MAX_OFFSET'] = tj.Config.SEARCH_MAX_OFFSET
+        # смещение 2 больше предела — снова первая страница и без продолжения
+        assert [job.title for job in jobs] == ['Курсор 0', 'Курсор 1']
+        assert next_cursor is None
@@ -0,0 +1,96 @@
+# tests/test_query_counts.py
+# Число SQL-запросов на страницу не зависит от объёма данных: база
+# засевается N строками, затем ещё N, и X-Query-Count должен совпасть
+# и не превышать предела страницы.
+import pytest
+from sqlalchemy import insert, select
+
+import app as tj
+
+PASSWORD = 'secret'
+BATCH = 10  # меньше APPLICANTS_PER_PAGE и JOBS_PER_PAGE: всё на одной странице
+
+
+def add_batch(app, n):
+    """Ещё n вакансий компании (основной соискатель откликается на каждую)
+    и n соискателей с откликом на первую вакансию."""
+    with app.app_context():
+        session = tj.db.session
+        employer_id = session.scalar(select(tj.User.id).where(tj.User.email == 'employer@test.local'))
+        worker_id = session.scalar(select(tj.User.id).where(tj.User.email == 'worker@test.local'))
+        start = session.scalar(select(tj.db.func.count(tj.User.id)))
+        session.execute(insert(tj.User), [
+            dict(name=f'Соискатель {start + i}', email=f'batch{start + i}@test.local',
+                 role='worker', password_hash='-', phone='+79000000000')
+            for i in range(n)
+        ])
+        new_workers = session.scalars(select(tj.User.id).order_by(tj.User.id.desc()).limit(n)).all()
+        session.execute(insert(tj.Job), [
+            dict(employer_id=employer_id, title=f'Смена {start + i}', city='Москва',
+                 description='Описание', status='approved')
+            for i in range(n)
+        ])
+        new_jobs = session.scalars(select(tj.Job.id).order_by(tj.Job.id.desc()).limit(n)).all()
+        first_job = session.scalar(select(tj.db.func.min(tj.Job.id))
+                                   .where(tj.Job.employer_id == employer_id))
+        session.execute(insert(tj.Application), [
+            dict(job_id=job_id, worker_id=worker_id, status='applied') for job_id in new_jobs
+        ] + [
+            dict(job_id=first_job, worker_id=w, status='applied') for w in new_workers
+        ])
+        session.commit()
+        tj.recount_user_counters()
+        tj.recount_job_counters()
+        tj.page_cache.jobs_changed()
+        return first_job
+
+
+def login(app, email):
+    client = app.test_client()
+    response = client.post('/login', data={'email': email, 'password': PASSWORD})
+    assert response.status_code == 302
+    return client
+
+
+def query_count(client, url):
+    client.get(url)  # прогрев: кэш current_user, версия страниц
+    response = client.get(url)
+    assert response.status_code == 200, url
+    return int(response.headers['X-Query-Count'])
+
+
+# страница: (кто смотрит, адрес по id первой вакансии, предел запросов)
+PAGES = {
+    'manage': ('employer', lambda job_id: '/manage', 2),
+    'job_applications': ('employer', lambda job_id: f'/manage/job/{job_id}/applications', 3),
+    'my_applications': ('worker', lambda job_id: '/my-applications', 2),
+    'vacancy_detail': ('worker', lambda job_id: f'/vacancies/{job_id}', 2),
+}
+
+
+@pytest.fixture(scope='module')
+def counts(app):
+    with app.app_context():
+        password_hash = tj.hasher.hash(PASSWORD)
+        tj.db.session.execute(insert(tj.User), [
+            dict(name='Компания', email='employer@test.local', role='employer',
+                 password_hash=password_hash),
+            dict(name='Соискатель', email='worker@test.local', role='worker',
+                 password_hash=password_hash, phone='+79000000001'),
+        ])
+        tj.db.session.commit()
+    clients = {'employer': login(app, 'employer@test.local'),
+               'worker': login(app, 'worker@test.local')}
+    result = {name: [] for name in PAGES}
+    for _ in range(2):
+        job_id = add_batch(app, BATCH)
+        for name, (role, url, _) in PAGES.items():
+            result[name].append(query_count(clients[role], url(job_id)))
+    return result
+
+
+@pytest.mark.parametrize('page', sorted(PAGES))
+def test_query_count_does_not_grow_with_data(counts, page):
+    small, large = counts[page]
+    assert small == large, f'{page}: {small} запросов на {BATCH} строк, {large} на {2 * BATCH}'
+    assert large <= PAGES[page][2]
@@ -0,0 +1,53 @@
+# tests/test_recommend.py
+# Подбор вакансий на игрушечных данных: top_n совпадает с полным перебором
+# оценок и не предлагает исключённые вакансии.
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import recommend
+
+JOBS = dict(ids=[11, 12, 13, 14],
+            cities=['Москва', 'Казань', 'Москва', 'Казань'],
+            specializations=['Повар', 'Грузчик', 'Грузчик', 'Повар'],
+            pay_types=['shift', 'hourly', 'shift', 'shift'],
+            wages=[3000, 400, 2500, 2000],
+            ages=[0, 1, 2, 30])
+WORKERS = [(1, 'Повар, колледж', 5, 4.8), (2, '', 0, 0), (3, '', 1, 3.0)]
+HISTORY = [(1, 'Москва', 'Повар', 'shift'),
+           (2, 'Казань', 'Грузчик', 'hourly'),
+           (2, 'Казань', 'Грузчик', 'hourly')]
+
+
+@pytest.fixture
+def model():
+    return recommend.Model.build(JOBS['cities'], JOBS['specializations'],
+                                 JOBS['pay_types'], JOBS['wages'], WORKERS, HISTORY)
+
+
+def test_top_n_matches_full_scoring(model):
+    jobs = model.jobs(**JOBS)
+    scores = model.score(jobs)
+    result = {worker_id: job_ids for worker_id, job_ids, _ in model.top_n(jobs, 2, block=2)}
+    assert sorted(result) == [1, 2, 3]
+    for row, worker_id in enumerate(model.worker_ids.tolist()):
+        expected = [JOBS['ids'][i] for i in np.argsort(-scores[row], kind='stable')[:2]]
+        assert result[worker_id] == expected
+    assert result[1][0] == 11
+    assert result[2][0] == 12
+
+
+def test_top_n_skips_excluded(model):
+    jobs = model.jobs(**JOBS)
+    result = {worker_id: job_ids
+              for worker_id, job_ids, _ in model.top_n(jobs, 4, exclude={1: {11}})}
+    assert sorted(result[1]) == [12, 13, 14]
+    assert sorted(result[2]) == [11, 12, 13, 14]
+
+
+def test_save_and_load(model, tmp_path):
+    path = str(tmp_path / 'model.npz')
+    model.save(path)
+    loaded = recommend.Model.load(path)
+    jobs = model.jobs(**JOBS)
+    assert np.allclose(loaded.score(loaded.jobs(**JOBS)), model.score(jobs))
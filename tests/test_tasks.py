@@ -0,0 +1,73 @@
+# tests/test_tasks.py
+# Очередь фоновых задач: повторы с backoff и пометка dead; поисковый
+# индекс догоняет смену статусов после commit.
+import pytest
+
+import app as tj
+from tasks import TaskQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = TaskQueue(str(tmp_path / 'tasks.db'), workers=0, max_attempts=3, backoff=0)
+    calls = []
+
+    @queue.task
+    def flaky(n):
+        calls.append(n)
+        raise RuntimeError('сбой')
+
+    queue.calls = calls
+    return queue
+
+
+def test_failing_task_is_retried_then_dead(queue):
+    queue.enqueue('flaky', 7)
+    # backoff=0: повтор готов сразу, run_pending доходит до max_attempts
+    assert queue.run_pending() == 3
+    assert queue.calls == [7, 7, 7]
+    assert queue.stats() == dict(queued=0, dead=1)
+    error, = queue._conn().execute('SELECT last_error FROM task').fetchone()
+    assert 'RuntimeError: сбой' in error
+
+    assert queue.retry_dead() == 1
+    assert queue.stats() == dict(queued=1, dead=0)
+
+
+def test_retry_waits_for_backoff(queue):
+    queue.backoff = 60
+    queue.enqueue('flaky', 1)
+    assert queue.run_pending() == 1
+    # следующая попытка не раньше чем через 60 ± 20% секунд
+    assert queue.run_pending() == 0
+    assert queue.stats() == dict(queued=1, dead=0)
+    attempts, = queue._conn().execute('SELECT attempts FROM task').fetchone()
+    assert attempts == 1
+
+
+def index_hits(app, word):
+    """id вакансий, найденных по слову в поисковом индексе (без учёта статуса)."""
+    with app.app_context():
+        if not tj.job_search.available():
+            pytest.skip('нет FTS5')
+        return [job.id for job in tj.job_search.filter(tj.Job.query, word)]
+
+
+def test_search_index_follows_status_changes(app, make_user, make_job, login):
+    employer = make_user('employer')
+    job_id = make_job(employer, title='Витражист', status='pending')
+    client = login(make_user('moderator'))
+    assert index_hits(app, 'витражист') == []
+
+    # массовая модерация: индекс обновляет задача reindex_jobs после commit
+    response = client.post('/api/v1/moderation/status',
+                           json={'ids': [job_id], 'status': 'approved'})
+    assert response.get_json()['updated'] == [job_id]
+    assert index_hits(app, 'витражист') == []
+    tj.task_queue.run_pending()
+    assert index_hits(app, 'витражист') == [job_id]
+
+    # одиночная смена статуса синхронизирует индекс в той же транзакции
+    response = login(employer).post(f'/manage/job/{job_id}/status/close')
+    assert response.status_code == 302
+    assert index_hits(app, 'витражист') == []
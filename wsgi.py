@@ -0,0 +1,6 @@
+# wsgi.py
+# Точка входа WSGI-сервера: gunicorn -c gunicorn.conf.py wsgi:app
+# (удобнее — python serve.py). Настройки — config.py и окружение.
+from app import check_production_config, create_app
+
+app = check_production_config(create_app())